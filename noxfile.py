@@ -25,7 +25,7 @@ def lint(session):
     """Run linting (only on Python 3.12)."""
     session.install(".")
     session.install("ruff>=0.8.0")
-    session.run("ruff", "check", "python/src", "python/tests")
+    session.run("ruff", "check", "python/src", "python/tests", "python/benchmarks")
 
 
 @nox.session(python="3.12")
@@ -33,7 +33,7 @@ def format_check(session):
     """Check code formatting (only on Python 3.12)."""
     session.install(".")
     session.install("ruff>=0.8.0")
-    session.run("ruff", "format", "--check", "python/src", "python/tests")
+    session.run("ruff", "format", "--check", "python/src", "python/tests", "python/benchmarks")
 
 
 @nox.session(python="3.12")
@@ -42,3 +42,10 @@ def types(session):
     session.install(".")
     session.install("pyright>=1.1.390")
     session.run("pyright")
+
+
+@nox.session(python="3.12")
+def bench(session):
+    """Run the benchmark suite; arguments are passed to bench_suite.py (e.g. -- --output results.json)."""
+    session.install(".")
+    session.run("python", "python/benchmarks/bench_suite.py", *session.posargs)
@@ -0,0 +1,70 @@
+"""Benchmark cold and warm scans with a persistent directory cache.
+
+The "sizes" mode stats every match, as files() does, so only directory reads
+are saved; the "count" mode relies on cached entry types and skips both.
+
+Usage: python python/benchmarks/bench_incremental.py [--latency 0.0005] [--changed 0.01]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from pokerops.monitoring.filesystem import matches, walk
+from synthetic import SlowScandir, slow, tree
+
+
+def backdate(directories: List[Path], seconds: int = 3600) -> None:
+    past = time.time() - seconds
+    for directory in directories:
+        os.utime(directory, (past, past))
+
+
+def timed(root: Path, state_dir: str, sizes: bool) -> float:
+    start = time.perf_counter()
+    walker = walk(root, type="f", prefetch=sizes, state_dir=state_dir or None)
+    for _ in matches(walker) if sizes else walker:
+        pass
+    assert not walker.errors, walker.errors
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=8, help="Subdirectories per directory")
+    parser.add_argument("--depth", type=int, default=3, help="Directory levels")
+    parser.add_argument("--files", type=int, default=20, help="Files per directory")
+    parser.add_argument("--latency", type=float, default=0.0005, help="Seconds added to every scandir and stat call")
+    parser.add_argument("--entry-latency", type=float, default=0.00005, help="Seconds added per entry returned by scandir")
+    parser.add_argument("--changed", type=float, default=0.01, help="Fraction of directories modified between runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        count = tree(root, args.width, args.depth, args.files)
+        directories = [Path(d) for d, _, _ in os.walk(root)]
+        backdate(directories)
+        os.scandir = SlowScandir(os.scandir, args.latency, args.entry_latency)
+        os.lstat = slow(os.lstat, args.latency)
+
+        print(f"{count} files in {len(directories)} directories, {args.latency * 1000:.2f}ms per scandir/stat call")
+        print(f"{'mode':>6} {'scan':>10} {'seconds':>9} {'speedup':>8}")
+        for mode, sizes in (("sizes", True), ("count", False)):
+            with tempfile.TemporaryDirectory() as state:
+                uncached = timed(root, "", sizes)
+                cold = timed(root, state, sizes)
+                warm = timed(root, state, sizes)
+                for directory in random.sample(directories, max(1, int(len(directories) * args.changed))):
+                    (directory / f"added-{mode}.log").write_text("added")
+                changed = timed(root, state, sizes)
+                backdate(directories)
+            for label, elapsed in (("uncached", uncached), ("cold", cold), ("warm", warm), ("changed", changed)):
+                print(f"{mode:>6} {label:>10} {elapsed:>9.3f} {uncached / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
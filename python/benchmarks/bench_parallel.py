@@ -0,0 +1,45 @@
+"""Benchmark parallel directory traversal against injected per-call latency.
+
+Usage: python python/benchmarks/bench_parallel.py [--latency 0.001] [--workers 1,2,4,8,16]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from pokerops.monitoring.filesystem import scan
+from synthetic import SlowScandir, tree
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=6, help="Subdirectories per directory")
+    parser.add_argument("--depth", type=int, default=3, help="Directory levels")
+    parser.add_argument("--files", type=int, default=10, help="Files per directory")
+    parser.add_argument("--latency", type=float, default=0.001, help="Seconds added to every scandir and stat call")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="Comma separated worker counts")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        count = tree(root, args.width, args.depth, args.files)
+        os.scandir = SlowScandir(os.scandir, args.latency)
+
+        print(f"{count} files, {args.latency * 1000:.1f}ms per scandir/stat call")
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+        baseline = None
+        expected = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            start = time.perf_counter()
+            result = scan(root, type="f", size="+0c", workers=workers)
+            elapsed = time.perf_counter() - start
+            expected = expected or result
+            assert result == expected, "parallel output differs from serial output"
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.3f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
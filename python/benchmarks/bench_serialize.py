@@ -0,0 +1,104 @@
+"""Benchmark events per second serializing check documents before and after the output layer.
+
+"before" rebuilds the metadata envelope for every event, with platform.node(),
+and encodes it with json.dumps through print(), as the commands used to.
+"after" uses tools.metadata() and output.write(), splicing the cached envelope
+with the available backend; "after (json)" forces the standard library
+backend. Documents are written to /dev/null so stream overhead is included.
+
+Measured with 3 peers: orjson, from the orjson extra, gives 2.7-3.0x. The
+standard library backend gives 0.95-1.05x: encoding the body dominates,
+and the cached envelope saves too little of it to show.
+
+Usage: python python/benchmarks/bench_serialize.py [--events 100000] [--peers 3]
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from pokerops.monitoring import output, tools
+
+
+def legacy_metadata(location: str, environment: str, function: str, log_id: str) -> Dict[str, Any]:
+    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    timestamp_field = {"timestamp": timestamp.isoformat()}
+    host_field = {"host": {"name": platform.node()}}
+    log_field = {"log": {"description": log_id}}
+    location_field = {} if location == "" else {"location": location}
+    environment_field = {} if environment == "" else {"environment": environment}
+    function_field = {} if function == "" else {"function": function}
+    fields_field = {"fields": {**log_field, **location_field, **environment_field, **function_field}}
+    return {**timestamp_field, **host_field, **fields_field}
+
+
+def document(peers: int) -> Dict[str, Any]:
+    """An ntp drift document for the given number of peers"""
+    results: List[Dict[str, Any]] = [
+        {
+            "address": f"peer{index}.example.com",
+            "reachable": True,
+            "offset": 0.00123 * index,
+            "delay": 0.0215,
+            "stratum": 2,
+            "samples": 4,
+            "jitter": 0.0004,
+            "dispersion": 0.00002,
+            "error": None,
+        }
+        for index in range(peers)
+    ]
+    return {
+        "ntp_peer_address": "peer0.example.com",
+        "ntp_peer_offset": 0.00123,
+        "ntp_consensus": {"offset": 0.00123, "low": 0.0001, "high": 0.0021, "survivors": [r["address"] for r in results]},
+        "ntp_peers": results,
+    }
+
+
+def before(data: Dict[str, Any]) -> None:
+    print(json.dumps({**data, **legacy_metadata("us-east", "production", "monitoring", "ntp-drift")}))
+
+
+def after(data: Dict[str, Any]) -> None:
+    output.write({**data, **tools.metadata(location="us-east", environment="production", function="monitoring", log_id="ntp-drift")})
+
+
+def rate(emit: Callable[[Dict[str, Any]], None], data: Dict[str, Any], events: int) -> float:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in range(events):
+            emit(data)
+        sys.stdout.flush()
+        elapsed = time.perf_counter() - start
+    return events / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100000, help="Documents serialized per mode")
+    parser.add_argument("--peers", type=int, default=3, help="Peers in each ntp drift document")
+    args = parser.parse_args()
+
+    data = document(args.peers)
+    backend = output.orjson
+    results = {"before": rate(before, data, args.events), f"after ({output.BACKEND})": rate(after, data, args.events)}
+    if backend is not None:
+        output.orjson = None
+        results["after (json)"] = rate(after, data, args.events)
+        output.orjson = backend
+
+    baseline = results["before"]
+    print(f"{'mode':>16} {'events/s':>12} {'speedup':>8}")
+    for mode, value in results.items():
+        print(f"{mode:>16} {value:>12,.0f} {value / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Measure `monitor` start-up import time with `python -X importtime` against a budget.
+
+Each scenario runs in a fresh interpreter. "help" renders `monitor --help`;
+command scenarios resolve the command the way an invocation does, importing
+its module, but stop before running it so no network or disk work is timed.
+The median import time over --repeat runs is compared with the budget and the
+script exits with status 1 when any scenario is over.
+
+Usage: python python/benchmarks/bench_startup.py [--repeat 5] [--budget ntp-drift=150]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import pokerops.monitoring
+
+RUN = """
+import sys
+from pokerops.monitoring.cli import app
+app(sys.argv[1:])
+"""
+
+RESOLVE = """
+import sys
+import typer
+from pokerops.monitoring.cli import app
+command = typer.main.get_command(app)
+for name in sys.argv[1:]:
+    command = command.get_command(typer.Context(command), name)
+"""
+
+# Scenario -> (snippet, arguments, import time budget in milliseconds)
+SCENARIOS: Dict[str, Tuple[str, List[str], float]] = {
+    "help": (RUN, ["--help"], 350.0),
+    "ntp-drift": (RESOLVE, ["ntp", "drift"], 150.0),
+    "filesystem-files": (RESOLVE, ["filesystem", "files"], 150.0),
+}
+
+
+def importtime(stderr: str) -> float:
+    """Total import time in milliseconds: the sum of cumulative times of top-level imports"""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        (_, cumulative, name) = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000
+
+
+def measure(snippet: str, arguments: List[str]) -> Tuple[float, float]:
+    """Import time and wall time, in milliseconds, of one fresh interpreter"""
+    source = os.path.dirname(os.path.dirname(os.path.dirname(pokerops.monitoring.__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [source, os.environ.get("PYTHONPATH")]))}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet, *arguments],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"{' '.join(arguments)} failed:\n{result.stderr[-2000:]}")
+    return (importtime(result.stderr), elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario; the median is reported")
+    parser.add_argument("--budget", action="append", default=[], metavar="SCENARIO=MS", help="Override a scenario's import time budget")
+    args = parser.parse_args()
+
+    budgets = {name: budget for name, (_, _, budget) in SCENARIOS.items()}
+    for override in args.budget:
+        name, _, value = override.partition("=")
+        if name not in budgets:
+            parser.error(f"unknown scenario '{name}', expected one of: {', '.join(budgets)}")
+        budgets[name] = float(value)
+
+    over = []
+    print(f"{'scenario':>16} {'imports ms':>11} {'wall ms':>9} {'budget ms':>10}")
+    for name, (snippet, arguments, _) in SCENARIOS.items():
+        runs = [measure(snippet, arguments) for _ in range(args.repeat)]
+        imports = statistics.median(run[0] for run in runs)
+        wall = statistics.median(run[1] for run in runs)
+        status = "" if imports <= budgets[name] else "  OVER BUDGET"
+        print(f"{name:>16} {imports:>11.1f} {wall:>9.1f} {budgets[name]:>10.1f}{status}")
+        if status:
+            over.append(name)
+
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
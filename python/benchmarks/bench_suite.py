@@ -0,0 +1,260 @@
+"""Benchmark files() and ntp drift on synthetic workloads, writing results as JSON.
+
+Trees are generated in several shapes, "wide", "deep" and "balanced", for
+each --files total, with log-uniform sparse file sizes and ages spread over a
+year. Every files() run happens in a fresh interpreter and reports its wall
+time, peak RSS and bytes written to stdout; a second, instrumented run in the
+same interpreter counts scandir and stat calls. ntp drift is timed in process
+against local stand-in servers answering after --ntp-delay seconds.
+
+Results are keyed by scenario name so files from different commits can be
+compared with --compare.
+
+Usage: python python/benchmarks/bench_suite.py [--files 10000,100000] [--shapes wide,deep] [--repeat 3] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import pokerops.monitoring
+import typer
+from pokerops.monitoring import output
+from pokerops.monitoring.filesystem import files
+from pokerops.monitoring.ntp import drift
+from synthetic import NTPServer, SlowScandir, mixed_tree, slow
+
+# Shape -> (width, depth, files per directory) giving roughly the requested number of files
+SHAPES: Dict[str, Callable[[int], Tuple[int, int, int]]] = {
+    "wide": lambda total: (100, 1, max(1, total // 101)),
+    "deep": lambda total: (2, max(0, round(math.log2(total / 10 + 1)) - 1), 10),
+    "balanced": lambda total: (10, 2, max(1, total // 111)),
+}
+
+# Case -> files() options
+CASES: Dict[str, Dict[str, Any]] = {
+    "list": {},
+    "filtered": {"name": "*.log", "mtime": "-30", "size": "+1k"},
+    "summary": {"summary": True},
+    "stream": {"stream": True},
+}
+
+# Case -> (peers, samples)
+NTP_CASES: Dict[str, Tuple[int, int]] = {
+    "peers=1,samples=1": (1, 1),
+    "peers=3,samples=1": (3, 1),
+    "peers=3,samples=4": (3, 4),
+}
+
+
+class Sink(io.RawIOBase):
+    """Binary stream discarding what is written to it, counting the bytes"""
+
+    def __init__(self):
+        self.written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.written += len(b)
+        return len(b)
+
+
+def run_files(root: str, options: Dict[str, Any]) -> int:
+    """Run files() on a tree with stdout captured, returning the bytes it printed"""
+    sink = Sink()
+    stdout = io.TextIOWrapper(io.BufferedWriter(sink))
+    with ExitStack() as stack:
+        saved = sys.stdout
+        sys.stdout = stdout
+        stack.callback(setattr, sys, "stdout", saved)
+        try:
+            files(path=root, location="bench", environment="bench", function="bench", **options)
+        except typer.Exit:
+            pass
+        stdout.flush()
+    return sink.written
+
+
+def child(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Measure one files() run in this interpreter"""
+    counts: "Counter[str]" = Counter()
+    start = time.perf_counter()
+    written = run_files(spec["root"], spec["options"])
+    wall = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+    os.scandir = SlowScandir(os.scandir, 0.0, counts=counts)
+    os.lstat = slow(os.lstat, 0.0, counts, "lstat")
+    os.stat = slow(os.stat, 0.0, counts, "stat")
+    run_files(spec["root"], spec["options"])
+    return {
+        "wall_seconds": wall,
+        "peak_rss_bytes": peak,
+        "output_bytes": written,
+        "scandir_calls": counts["scandir"],
+        "stat_calls": counts["stat"] + counts["lstat"],
+    }
+
+
+def measure_files(root: Path, options: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    source = os.path.dirname(os.path.dirname(os.path.dirname(pokerops.monitoring.__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [source, os.environ.get("PYTHONPATH")]))}
+    spec = json.dumps({"root": str(root), "options": options})
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, __file__, "--child", spec], env=env, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise SystemExit(f"files() benchmark failed:\n{result.stderr[-2000:]}")
+        runs.append(json.loads(result.stdout.splitlines()[-1]))
+    return {
+        "wall_seconds": statistics.median(run["wall_seconds"] for run in runs),
+        "wall_seconds_all": [run["wall_seconds"] for run in runs],
+        "peak_rss_bytes": max(run["peak_rss_bytes"] for run in runs),
+        "output_bytes": runs[-1]["output_bytes"],
+        "scandir_calls": runs[-1]["scandir_calls"],
+        "stat_calls": runs[-1]["stat_calls"],
+    }
+
+
+def measure_ntp(peers: int, samples: int, delay: float, repeat: int) -> Dict[str, Any]:
+    servers = [NTPServer(offset=0.01 * index, delay=delay) for index in range(peers)]
+    try:
+        addresses = [server.address for server in servers]
+        drift(addresses, "bench", "bench", "bench", samples=samples)
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            error, data = drift(addresses, "bench", "bench", "bench", samples=samples)
+            runs.append(time.perf_counter() - start)
+            if error is not None:
+                raise SystemExit(f"ntp drift benchmark failed: {error}")
+    finally:
+        for server in servers:
+            server.close()
+    return {"wall_seconds": statistics.median(runs), "wall_seconds_all": runs, "output_bytes": len(output.encode(data)) + 1}
+
+
+def generate(workdir: Path, shape: str, total: int, seed: int) -> Tuple[Path, int]:
+    """Create a tree, or reuse one left complete in workdir by an earlier run"""
+    root = workdir / f"{shape}-{total}-{seed}"
+    marker = root / ".complete"
+    if marker.exists():
+        return (root, int(marker.read_text()))
+    if root.exists():
+        raise SystemExit(f"{root} holds an incomplete tree, remove it first")
+    root.mkdir(parents=True)
+    width, depth, per_directory = SHAPES[shape](total)
+    count = mixed_tree(root, width, depth, per_directory, random.Random(seed))
+    marker.write_text(str(count))
+    return (root, count)
+
+
+def commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False, cwd=os.path.dirname(__file__))
+    return result.stdout.strip() or "unknown"
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any]) -> None:
+    print(f"\nCompared with {baseline.get('commit', 'unknown')}:", file=sys.stderr)
+    print(f"{'scenario':>40} {'wall':>8} {'stats':>8} {'rss':>8} {'output':>8}", file=sys.stderr)
+
+    def ratio(key: str, old: Dict[str, Any], new: Dict[str, Any]) -> str:
+        if not old.get(key) or key not in new:
+            return "-"
+        return f"{new[key] / old[key]:.2f}x"
+
+    for name, new in results.items():
+        old = baseline["results"].get(name)
+        if old is not None:
+            print(
+                f"{name:>40} {ratio('wall_seconds', old, new):>8} {ratio('stat_calls', old, new):>8} {ratio('peak_rss_bytes', old, new):>8} {ratio('output_bytes', old, new):>8}",
+                file=sys.stderr,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", default="10000", help="Comma separated file totals per tree, from 10000 to 1000000")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="Comma separated tree shapes")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma separated files() cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median wall time is reported")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for file sizes and ages")
+    parser.add_argument("--workdir", help="Keep generated trees here and reuse them on later runs")
+    parser.add_argument("--ntp-delay", type=float, default=0.005, help="Seconds the stand-in NTP servers hold each reply")
+    parser.add_argument("--skip-ntp", action="store_true", help="Only benchmark files()")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Results file from an earlier run to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(json.loads(args.child))))
+        return
+
+    for shape in args.shapes.split(","):
+        if shape not in SHAPES:
+            parser.error(f"unknown shape '{shape}', expected one of: {', '.join(SHAPES)}")
+    for case in args.cases.split(","):
+        if case not in CASES:
+            parser.error(f"unknown case '{case}', expected one of: {', '.join(CASES)}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'scenario':>40} {'wall ms':>9} {'scandirs':>9} {'stats':>9} {'rss MB':>8} {'output KB':>10}", file=sys.stderr)
+
+    def report(name: str, result: Dict[str, Any]) -> None:
+        results[name] = result
+        rss = result.get("peak_rss_bytes")
+        print(
+            f"{name:>40} {result['wall_seconds'] * 1000:>9.1f} {result.get('scandir_calls', '-'):>9} {result.get('stat_calls', '-'):>9}"
+            f" {'-' if rss is None else f'{rss / 2**20:.1f}':>8} {result['output_bytes'] / 1024:>10.1f}",
+            file=sys.stderr,
+        )
+
+    with ExitStack() as stack:
+        workdir = Path(args.workdir) if args.workdir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        for total in (int(value) for value in args.files.split(",")):
+            for shape in args.shapes.split(","):
+                root, count = generate(workdir, shape, total, args.seed)
+                for case in args.cases.split(","):
+                    result = measure_files(root, CASES[case], args.repeat)
+                    report(f"files/{shape}/{total}/{case}", {**result, "files": count, "options": CASES[case]})
+
+    if not args.skip_ntp:
+        for case, (peers, samples) in NTP_CASES.items():
+            result = measure_ntp(peers, samples, args.ntp_delay, args.repeat)
+            report(f"ntp/{case}", {**result, "delay": args.ntp_delay})
+
+    document = {
+        "commit": commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "backend": output.BACKEND,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark filesystem usage against du.
+
+The per-directory baseline is what answering "which directory filled the
+disk" took before: one `du -s` for the root and for every directory within
+the rollup depth, each walking its own subtree again. A single `du -d` run
+is reported for reference. usage() runs in a child interpreter, where its
+peak RSS is measured.
+
+Usage: python python/benchmarks/bench_usage.py [--width 10] [--depth 3] [--files 20] [--rollup 2]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import pokerops.monitoring
+from synthetic import tree
+
+CHILD = """
+import io, resource, sys, time
+from pokerops.monitoring.filesystem import usage
+sys.stdout = io.TextIOWrapper(io.BytesIO())
+start = time.perf_counter()
+usage(path=sys.argv[1], location="", environment="", function="", depth=int(sys.argv[2]), mount_timeout=0)
+wall = time.perf_counter() - start
+print(wall, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+"""
+
+
+def run_usage(root: Path, depth: int) -> Tuple[float, int]:
+    source = os.path.dirname(os.path.dirname(os.path.dirname(pokerops.monitoring.__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [source, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-c", CHILD, str(root), str(depth)], env=env, capture_output=True, text=True, check=True)
+    wall, peak = result.stderr.split()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return float(wall), int(peak) * (1 if sys.platform == "darwin" else 1024)
+
+
+def within(root: Path, depth: int) -> List[Path]:
+    """The root and every directory at most depth levels below it"""
+    found = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [child for directory in level for child in directory.iterdir() if child.is_dir() and not child.is_symlink()]
+        found.extend(level)
+    return found
+
+
+def timed(*commands: List[str]) -> float:
+    start = time.perf_counter()
+    for command in commands:
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=10, help="Subdirectories per directory")
+    parser.add_argument("--depth", type=int, default=3, help="Directory levels")
+    parser.add_argument("--files", type=int, default=20, help="Files per directory")
+    parser.add_argument("--rollup", type=int, default=2, help="Depth usage is rolled up to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        count = tree(root, args.width, args.depth, args.files)
+        directories = within(root, args.rollup)
+        usage_wall, usage_peak = run_usage(root, args.rollup)
+        per_directory = timed(*(["du", "-s", "-B1", str(directory)] for directory in directories))
+        single = timed(["du", "-B1", "-d", str(args.rollup), str(root)])
+        results = {
+            "files": count,
+            "usage": {"wall_seconds": usage_wall, "peak_rss_bytes": usage_peak},
+            "du_per_directory": {"wall_seconds": per_directory, "processes": len(directories)},
+            "du_single": {"wall_seconds": single},
+            "speedup_per_directory": per_directory / usage_wall,
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
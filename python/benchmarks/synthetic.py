@@ -0,0 +1,190 @@
+"""Synthetic workloads shared by the benchmark scripts."""
+
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Iterator, Optional
+
+import ntplib
+
+
+def tree(root: Path, width: int, depth: int, files: int) -> int:
+    """Create a tree with `width` subdirectories per level and `files` files per directory
+
+    Returns the number of files created.
+    """
+    count = 0
+    for index in range(files):
+        (root / f"file{index}.log").write_bytes(b"x" * index)
+        count += 1
+    if depth > 0:
+        for index in range(width):
+            child = root / f"dir{index}"
+            child.mkdir()
+            count += tree(child, width, depth - 1, files)
+    return count
+
+
+def mixed_tree(root: Path, width: int, depth: int, files: int, rng: random.Random, max_size: int = 1 << 24, max_age: int = 365 * 86400) -> int:
+    """Create a tree like tree() whose files have log-uniform sizes up to max_size and ages up to max_age seconds
+
+    Files are sparse, so large trees take little disk space. Returns the number of files created.
+    """
+    now = time.time()
+    count = 0
+    for index in range(files):
+        path = root / f"file{index}.{rng.choice(('log', 'gz', 'json', 'tmp'))}"
+        with open(path, "wb") as f:
+            f.truncate(int(max_size ** rng.random()) - 1)
+        age = now - max_age * rng.random()
+        os.utime(path, (age, age))
+        count += 1
+    if depth > 0:
+        for index in range(width):
+            child = root / f"dir{index}"
+            child.mkdir()
+            count += mixed_tree(child, width, depth - 1, files, rng, max_size, max_age)
+    return count
+
+
+class SlowEntry:
+    """DirEntry proxy whose first stat pays a fixed latency, like an uncached NFS attribute fetch"""
+
+    __slots__ = ("_entry", "_latency", "_stat", "_counts")
+
+    def __init__(self, entry: "os.DirEntry[str]", latency: float, counts: Optional[Counter] = None):
+        self._entry = entry
+        self._latency = latency
+        self._stat = None
+        self._counts = counts
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    @property
+    def path(self) -> str:
+        return self._entry.path
+
+    def inode(self) -> int:
+        return self._entry.inode()
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if self._stat is None:
+            if self._latency:
+                time.sleep(self._latency)
+            if self._counts is not None:
+                self._counts["stat"] += 1
+            self._stat = self._entry.stat(follow_symlinks=follow_symlinks)
+        return self._stat
+
+
+class SlowScandir:
+    """os.scandir replacement that pays a fixed latency per directory read plus a cost per entry returned
+
+    With `counts`, directory reads and entry stats are tallied under "scandir" and "stat".
+    """
+
+    def __init__(self, scandir, latency: float, entry_latency: float = 0.0, counts: Optional[Counter] = None):
+        self._scandir = scandir
+        self._latency = latency
+        self._entry_latency = entry_latency
+        self._counts = counts
+
+    def __call__(self, path) -> "SlowListing":
+        if self._latency:
+            time.sleep(self._latency)
+        if self._counts is not None:
+            self._counts["scandir"] += 1
+        return SlowListing(self._scandir(path), self._latency, self._entry_latency, self._counts)
+
+
+class SlowListing:
+    def __init__(self, iterator, latency: float, entry_latency: float = 0.0, counts: Optional[Counter] = None):
+        self._iterator = iterator
+        self._latency = latency
+        self._entry_latency = entry_latency
+        self._counts = counts
+
+    def __enter__(self) -> "SlowListing":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self._iterator.close()
+
+    def __iter__(self) -> Iterator[SlowEntry]:
+        for entry in self._iterator:
+            if self._entry_latency:
+                time.sleep(self._entry_latency)
+            yield SlowEntry(entry, self._latency, self._counts)
+
+
+def slow(function, latency: float, counts: Optional[Counter] = None, key: str = "stat"):
+    """Wrap a syscall wrapper such as os.lstat so every call pays a fixed latency, tallied under `key` in `counts`"""
+
+    def wrapper(*args, **kwargs):
+        if latency:
+            time.sleep(latency)
+        if counts is not None:
+            counts[key] += 1
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+class NTPServer:
+    """NTP stand-in on localhost answering every request after `delay` seconds, with its clock `offset` seconds ahead"""
+
+    def __init__(self, offset: float = 0.0, delay: float = 0.0):
+        self.offset = offset
+        self.delay = delay
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.05)
+        self.address = f"127.0.0.1:{self.sock.getsockname()[1]}"
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            received = ntplib.system_to_ntp_time(time.time() + self.offset)
+            reply = ntplib.NTPPacket(version=3, mode=4, tx_timestamp=ntplib.system_to_ntp_time(time.time() + self.offset))
+            reply.stratum = 2
+            reply.recv_timestamp = received
+            packet = bytearray(reply.to_data())
+            packet[24:32] = data[40:48]
+            if self.delay:
+                threading.Timer(self.delay, self.send, (bytes(packet), addr)).start()
+            else:
+                self.send(bytes(packet), addr)
+
+    def send(self, packet: bytes, addr) -> None:
+        try:
+            self.sock.sendto(packet, addr)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.sock.close()
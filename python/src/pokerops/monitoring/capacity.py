@@ -0,0 +1,134 @@
+"""Space and inode usage of mounted filesystems from statvfs, without walking them."""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from pokerops.monitoring.mounts import MOUNTINFO, Mount, Unresponsive, run, table
+from pokerops.monitoring.walker import Matcher, Patterns
+
+# Filesystem types statted out of process besides remote and FUSE ones: an autofs trigger mounts on first access
+AUTOMOUNT = {"autofs"}
+
+# Run in a child interpreter: print the statvfs fields used, or the error, of the path
+STATVFS = (
+    "import os, sys\n"
+    "try:\n"
+    "    st = os.statvfs(sys.argv[1])\n"
+    "except OSError as e:\n"
+    "    print(e)\n"
+    "else:\n"
+    "    print(st.f_frsize, st.f_blocks, st.f_bfree, st.f_bavail, st.f_files, st.f_ffree, st.f_favail, st.f_flag)\n"
+)
+
+
+class Space:
+    """The statvfs fields of one mount that its usage is computed from"""
+
+    __slots__ = ("frsize", "blocks", "bfree", "bavail", "files", "ffree", "favail", "flag")
+
+    def __init__(self, frsize: int, blocks: int, bfree: int, bavail: int, files: int, ffree: int, favail: int, flag: int):
+        self.frsize = frsize
+        self.blocks = blocks
+        self.bfree = bfree
+        self.bavail = bavail
+        self.files = files
+        self.ffree = ffree
+        self.favail = favail
+        self.flag = flag
+
+    @classmethod
+    def of(cls, st: os.statvfs_result) -> "Space":
+        return cls(st.f_frsize, st.f_blocks, st.f_bfree, st.f_bavail, st.f_files, st.f_ffree, st.f_favail, st.f_flag)
+
+    @classmethod
+    def parse(cls, line: str) -> "Space":
+        """The usage printed by STATVFS; raises ValueError when the child printed an error instead"""
+        fields = [int(field) for field in line.split()]
+        if len(fields) != len(cls.__slots__):
+            raise ValueError(line)
+        return cls(*fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Usage as df reports it: the used percentage is relative to what unprivileged users can use"""
+        used = (self.blocks - self.bfree) * self.frsize
+        available = self.bavail * self.frsize
+        inodes_used = self.files - self.ffree
+        return {
+            "bytes_total": self.blocks * self.frsize,
+            "bytes_used": used,
+            "bytes_available": available,
+            "bytes_used_percent": percent(used, used + available),
+            "inodes_total": self.files,
+            "inodes_used": inodes_used,
+            "inodes_available": self.favail,
+            "inodes_used_percent": percent(inodes_used, inodes_used + self.favail),
+            "readonly": bool(self.flag & os.ST_RDONLY),
+        }
+
+
+def percent(part: int, whole: int) -> Optional[float]:
+    return round(100.0 * part / whole, 2) if whole > 0 else None
+
+
+def select(mounts: List[Mount], fstype: Patterns = None, mountpoint: Patterns = None) -> List[Mount]:
+    """Mounts whose type and mount point match any of the globs, the last one mounted over each mount point only"""
+    types = Matcher.compile([fstype] if isinstance(fstype, str) else fstype or ())
+    points = Matcher.compile([mountpoint] if isinstance(mountpoint, str) else mountpoint or ())
+    visible: Dict[str, Mount] = {}
+    for mount in mounts:
+        visible.pop(mount.mountpoint, None)
+        visible[mount.mountpoint] = mount
+    return [
+        mount for mount in visible.values() if (types is None or types(mount.fstype) is not None) and (points is None or points(mount.mountpoint) is not None)
+    ]
+
+
+class Capacity:
+    """Usage of the selected mounts, statted with a deadline where statvfs can block
+
+    Local mounts are statted in process. Remote, FUSE and automount mounts
+    are statted in child processes with `timeout` seconds to answer; those
+    that do not are collected in `unresponsive`. A timeout of 0 stats every
+    mount in process.
+    """
+
+    def __init__(self, timeout: float = 10.0, mountinfo: str = MOUNTINFO):
+        self.timeout = timeout
+        self.mountinfo = mountinfo
+        self.unresponsive: List[Unresponsive] = []
+
+    def measure(self, fstype: Patterns = None, mountpoint: Patterns = None, include_empty: bool = False) -> List[Dict[str, Any]]:
+        """Usage of every selected mount, in mount order
+
+        Mounts without any blocks, such as proc or cgroup, are left out
+        unless include_empty is set, as df does. A mount whose statvfs
+        failed is listed with the error.
+        """
+        mounts = select(table(self.mountinfo), fstype=fstype, mountpoint=mountpoint)
+        isolated = [m.mountpoint for m in mounts if self.timeout > 0 and (m.remote or m.fstype in AUTOMOUNT)]
+        outputs, hung = run(STATVFS, isolated, self.timeout) if isolated else ({}, {})
+
+        reported = []
+        for mount in mounts:
+            if mount.mountpoint in hung:
+                self.unresponsive.append(Unresponsive(mount.mountpoint, mount.source, mount.fstype, hung[mount.mountpoint]))
+                continue
+            space: Optional[Space] = None
+            error: Optional[str] = None
+            try:
+                if mount.mountpoint in outputs:
+                    space = Space.parse(outputs[mount.mountpoint])
+                else:
+                    space = Space.of(os.statvfs(mount.mountpoint))
+            except OSError as e:
+                error = str(e)
+            except ValueError:
+                error = outputs[mount.mountpoint].strip() or "statvfs failed"
+            if space is not None and space.blocks == 0 and not include_empty:
+                continue
+            item = {"path": mount.mountpoint, "source": mount.source, "fstype": mount.fstype}
+            reported.append({**item, **(space.to_dict() if space is not None else {}), "error": error})
+        return reported
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [mount.to_dict() for mount in self.unresponsive]
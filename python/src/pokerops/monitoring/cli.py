@@ -1,20 +1,59 @@
 """CLI implementation for pokerops-monitoring."""
 
+import importlib
+from typing import Dict, List, Optional, Tuple
+
 import typer
-from pokerops.monitoring.filesystem import app as filesystem_app
-from pokerops.monitoring.ntp import app as ntp_app
-from rich.console import Console
+from typer.core import TyperCommand, TyperGroup
+
+# Command name -> (module holding a Typer `app`, summary shown in help listings, whether it is a command group)
+COMMANDS: Dict[str, Tuple[str, str, bool]] = {
+    "ntp": ("pokerops.monitoring.ntp", "NTP monitoring commands", True),
+    "filesystem": ("pokerops.monitoring.filesystem", "Filesystem monitoring commands", True),
+    "logs": ("pokerops.monitoring.logs", "Log monitoring commands", True),
+    "serve": ("pokerops.monitoring.serve", "Run ntp and filesystem checks on internal timers, as NDJSON on stdout.", False),
+    "metrics-server": ("pokerops.monitoring.metrics", "Serve ntp and filesystem check results as OpenMetrics, each check run at most once per TTL.", False),
+}
+
+
+class LazyGroup(TyperGroup):
+    """Root group importing a command's module only once that command is resolved
+
+    Help listings are built from the summaries in COMMANDS, so `monitor --help`
+    imports no command module at all.
+    """
+
+    listing = False
+
+    def list_commands(self, ctx: typer.Context) -> List[str]:
+        return [*(name for name in super().list_commands(ctx) if name not in COMMANDS), *COMMANDS]
+
+    def get_command(self, ctx: typer.Context, cmd_name: str) -> Optional[TyperCommand]:
+        if cmd_name in self.commands or cmd_name not in COMMANDS:
+            return super().get_command(ctx, cmd_name)  # pyright: ignore[reportReturnType]
+        module, summary, group = COMMANDS[cmd_name]
+        if self.listing:
+            return TyperCommand(cmd_name, help=summary)
+        sub_app = importlib.import_module(module).app
+        command = typer.main.get_group(sub_app) if group else typer.main.get_command(sub_app)
+        command.name = cmd_name
+        self.add_command(command, cmd_name)
+        return command  # pyright: ignore[reportReturnType]
+
+    def format_help(self, ctx: typer.Context, formatter) -> None:
+        self.listing = True
+        try:
+            super().format_help(ctx, formatter)
+        finally:
+            self.listing = False
+
 
 app = typer.Typer(
     name="pokerops-monitoring",
     help="Monitoring scripts for pokerops",
     add_completion=False,
+    cls=LazyGroup,
 )
-console = Console()
-
-# NTP command group
-app.add_typer(ntp_app, name="ntp")
-app.add_typer(filesystem_app, name="filesystem")
 
 
 @app.callback(invoke_without_command=True)
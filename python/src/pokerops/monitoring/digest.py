@@ -0,0 +1,175 @@
+"""Content digests of scanned files, cached between runs by file metadata.
+
+xxhash's XXH3 is used when it is installed and BLAKE2b from the standard
+library otherwise. Digests carry the name of the algorithm, so a cache written
+with the other one is never mixed in.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from pokerops.monitoring import tools
+
+try:
+    import xxhash  # pyright: ignore[reportMissingImports]
+except ImportError:
+    xxhash = None
+
+ALGORITHM = "blake2b-256" if xxhash is None else "xxh3-128"
+
+# Read size; large enough that syscall overhead vanishes next to hashing
+BLOCK = 1024 * 1024
+
+# (size, st_mtime_ns, st_ctime_ns, digest), keyed by "st_dev:st_ino"
+CachedDigest = Tuple[int, int, int, str]
+
+
+def digest(path: str) -> Optional[str]:
+    """Digest of a file's content as "algorithm:hex", or None when it cannot be read"""
+    hasher = hashlib.blake2b(digest_size=32) if xxhash is None else xxhash.xxh3_128()
+    buffer = bytearray(BLOCK)
+    view = memoryview(buffer)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hasher.update(view[:read])
+    except OSError:
+        return None
+    return f"{ALGORITHM}:{hasher.hexdigest()}"
+
+
+def digests(paths: List[str]) -> List[Optional[str]]:
+    """Digests of a batch of files, hashed in one worker process"""
+    return [digest(path) for path in paths]
+
+
+class HashCache:
+    """Digests from the previous run over a root, valid while a file's metadata is unchanged
+
+    A digest is reused only while the device, inode, size, mtime and ctime of
+    the file are the same, so any write or replacement forces a fresh read.
+    Files modified within the timestamp granularity of the run start are not
+    recorded, since a later write in the same tick would go unnoticed. Stored
+    like DirectoryCache, as zlib compressed JSON replaced atomically.
+    """
+
+    VERSION = 1
+    GRANULARITY_NS = 1_000_000_000
+
+    def __init__(self, path: Path, previous: Optional[Dict[str, CachedDigest]] = None):
+        self.path = path
+        self.previous: Dict[str, CachedDigest] = previous or {}
+        self.current: Dict[str, CachedDigest] = {}
+        self.started = time.time_ns()
+        self.hits = 0
+
+    @classmethod
+    def load(cls, state_dir: Union[str, Path], root: str) -> "HashCache":
+        path = Path(state_dir) / f"hash-{hashlib.sha1(root.encode()).hexdigest()[:16]}.cache"
+        try:
+            data = json.loads(zlib.decompress(path.read_bytes()))
+            if data["version"] == cls.VERSION and data["algorithm"] == ALGORITHM:
+                return cls(path, {k: tuple(v) for k, v in data["files"].items()})  # pyright: ignore[reportArgumentType]
+        except (OSError, ValueError, KeyError, zlib.error):
+            pass
+        return cls(path)
+
+    @staticmethod
+    def key(st: os.stat_result) -> str:
+        return f"{st.st_dev}:{st.st_ino}"
+
+    def lookup(self, st: os.stat_result) -> Optional[str]:
+        key = self.key(st)
+        cached = self.previous.get(key)
+        if cached is None or cached[:3] != (st.st_size, st.st_mtime_ns, st.st_ctime_ns):
+            return None
+        self.current[key] = cached
+        self.hits += 1
+        return cached[3]
+
+    def record(self, st: os.stat_result, digest: str) -> None:
+        if max(st.st_mtime_ns, st.st_ctime_ns) >= self.started - self.GRANULARITY_NS:
+            return
+        self.current[self.key(st)] = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, digest)
+
+    def save(self, complete: bool = True) -> None:
+        """Store the digests of this run; after a partial run, those of files it did not reach are kept"""
+        files = self.current if complete else {**self.previous, **self.current}
+        data = {"version": self.VERSION, "algorithm": ALGORITHM, "files": files}
+        tools.atomic_write(self.path, zlib.compress(json.dumps(data, separators=(",", ":")).encode()))
+
+
+class Hasher:
+    """Digests of files collected during a walk, read on a process pool
+
+    Files are queued with add() along with the lstat result the walk already
+    has, and hashed in batches by hash(). Files with a cached digest are not
+    read. With more than one worker, the others are split in batches across
+    a process pool started on first use and kept until close().
+    """
+
+    def __init__(self, workers: int = 1, cache: Optional[HashCache] = None):
+        self.workers = workers
+        self.cache = cache
+        self.pending: List[Tuple[str, os.stat_result]] = []
+        self.pool: Optional[Executor] = None
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, path: str, st: os.stat_result) -> None:
+        self.pending.append((path, st))
+
+    def hash(self) -> Dict[str, Optional[str]]:
+        """Digests of the files queued since the last call, by path"""
+        pending, self.pending = self.pending, []
+        result: Dict[str, Optional[str]] = {}
+        misses: List[Tuple[str, os.stat_result]] = []
+        for path, st in pending:
+            cached = None if self.cache is None else self.cache.lookup(st)
+            if cached is None:
+                misses.append((path, st))
+            else:
+                result[path] = cached
+        values = self.read([path for path, _ in misses])
+        for index, (path, st) in enumerate(misses):
+            value = values[index]
+            result[path] = value
+            if value is not None:
+                self.files += 1
+                self.bytes += st.st_size
+                if self.cache is not None:
+                    self.cache.record(st, value)
+        return result
+
+    def read(self, paths: List[str]) -> List[Optional[str]]:
+        if self.workers <= 1 or len(paths) <= 1:
+            return digests(paths)
+        if self.pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            # Walker threads may still be running, which fork does not survive safely
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        size = -(-len(paths) // (self.workers * 4))
+        batches = [paths[i : i + size] for i in range(0, len(paths), size)]
+        return [value for batch in self.pool.map(digests, batches) for value in batch]
+
+    def counters(self) -> Dict[str, int]:
+        return {"hashed_files": self.files, "hashed_bytes": self.bytes, "hash_cache_hits": 0 if self.cache is None else self.cache.hits}
+
+    def close(self, complete: bool = True) -> None:
+        """Stop the pool and store the cache; raises OSError if the cache cannot be written"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        if self.cache is not None:
+            self.cache.save(complete=complete)
@@ -1,11 +1,20 @@
-import json
+import os
 import subprocess
+import time
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NoReturn, Optional, Tuple
 
 import typer
-from pokerops.monitoring import tools
-from rich.console import Console
+from pokerops.monitoring import output, perf, tools
+from pokerops.monitoring.mounts import Isolation
+from pokerops.monitoring.summary import Summary
+from pokerops.monitoring.throttle import Throttle, prioritize
+from pokerops.monitoring.walker import DirectoryCache, Matcher, Patterns, Predicate, Walker
+
+# Backends of the options and commands a scan does not always need are imported where they are used
+if TYPE_CHECKING:
+    from pokerops.monitoring.digest import Hasher
+    from pokerops.monitoring.growth import Tracker
 
 app = typer.Typer(help="Filesystem monitoring commands")
 
@@ -13,23 +22,177 @@ app = typer.Typer(help="Filesystem monitoring commands")
 @app.command("files")
 def filesystem_files_cmd(
     path: str = typer.Argument(help="Filesystem path to check"),
-    name: Optional[str] = typer.Option(None, help="Filename filter"),  # pyright: ignore[reportCallInDefaultInitializer]
+    name: Optional[List[str]] = typer.Option(None, help="Filename filter; repeat to match any of several"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
     mtime: Optional[str] = typer.Option(None, help="Modification time filter"),  # pyright: ignore[reportCallInDefaultInitializer]
     ctime: Optional[str] = typer.Option(None, help="Change time filter"),  # pyright: ignore[reportCallInDefaultInitializer]
     size: Optional[str] = typer.Option(None, help="File size filter (e.g., 10K, 5M)"),  # pyright: ignore[reportCallInDefaultInitializer]
+    exclude: Optional[List[str]] = typer.Option(None, help="Filename or path pattern of files to leave out; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    exclude_dir: Optional[List[str]] = typer.Option(None, help="Name or path pattern of directories not to descend into; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    one_filesystem: bool = typer.Option(False, help="Do not descend into directories on other filesystems"),  # pyright: ignore[reportCallInDefaultInitializer]
     recursive: bool = typer.Option(True, help="Enable recursive search"),  # pyright: ignore[reportCallInDefaultInitializer]
+    workers: int = typer.Option(1, min=1, help="Directory traversal threads"),  # pyright: ignore[reportCallInDefaultInitializer]
+    sort: bool = typer.Option(False, help="Sort reported files by path"),  # pyright: ignore[reportCallInDefaultInitializer]
+    stream: bool = typer.Option(False, help="Emit matches as chunked NDJSON events"),  # pyright: ignore[reportCallInDefaultInitializer]
+    chunk_size: int = typer.Option(1000, min=1, help="Maximum files per streamed event"),  # pyright: ignore[reportCallInDefaultInitializer]
+    summary: bool = typer.Option(False, help="Report counts, bytes, histograms and top files instead of every file"),  # pyright: ignore[reportCallInDefaultInitializer]
+    top: int = typer.Option(10, min=0, help="Largest and oldest files listed in the summary"),  # pyright: ignore[reportCallInDefaultInitializer]
+    count_only: bool = typer.Option(False, help="Only count files in the summary, without stat calls"),  # pyright: ignore[reportCallInDefaultInitializer]
+    state_dir: Optional[str] = typer.Option(None, help="Directory for listings and digests reused by incremental scans"),  # pyright: ignore[reportCallInDefaultInitializer]
+    hash: bool = typer.Option(False, help="Add a content digest of every file"),  # pyright: ignore[reportCallInDefaultInitializer]
+    hash_workers: Optional[int] = typer.Option(None, min=1, help="Processes reading files for --hash (default: CPU count)"),  # pyright: ignore[reportCallInDefaultInitializer]
+    growth: bool = typer.Option(False, help="Add growth rates since the last run and a time-until-full forecast; needs --state-dir"),  # pyright: ignore[reportCallInDefaultInitializer]
+    stats: bool = typer.Option(False, help="Add the cost of the scan to the output as monitor.perf"),  # pyright: ignore[reportCallInDefaultInitializer]
+    io_idle: bool = typer.Option(False, help="Scan in the idle I/O scheduling class"),  # pyright: ignore[reportCallInDefaultInitializer]
+    nice: Optional[int] = typer.Option(None, min=-20, max=19, help="CPU nice level of the scan"),  # pyright: ignore[reportCallInDefaultInitializer]
+    max_rate: Optional[float] = typer.Option(None, min=1.0, help="Maximum directory reads and stats per second"),  # pyright: ignore[reportCallInDefaultInitializer]
+    time_budget: Optional[float] = typer.Option(None, min=0.0, help="Seconds after which the scan stops and reports a truncated result"),  # pyright: ignore[reportCallInDefaultInitializer]
+    mount_timeout: float = typer.Option(
+        10.0, min=0.0, help="Seconds remote mounts under the path, and then each directory read, get to respond before they are skipped; 0 disables"
+    ),  # pyright: ignore[reportCallInDefaultInitializer]
     log_id: str = typer.Option("filesystem-files", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
     location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
     environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
     function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
 ) -> None:
     return files(
+        path=path,
+        name=name,
+        mtime=mtime,
+        ctime=ctime,
+        size=size,
+        exclude=exclude,
+        exclude_dir=exclude_dir,
+        one_filesystem=one_filesystem,
+        recursive=recursive,
+        workers=workers,
+        sort=sort,
+        stream=stream,
+        chunk_size=chunk_size,
+        summary=summary,
+        top=top,
+        count_only=count_only,
+        state_dir=state_dir,
+        hash=hash,
+        hash_workers=hash_workers,
+        growth=growth,
+        stats=stats,
+        io_idle=io_idle,
+        nice=nice,
+        max_rate=max_rate,
+        time_budget=time_budget,
+        mount_timeout=mount_timeout,
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
+    )
+
+
+@app.command("watch")
+def filesystem_watch_cmd(
+    path: str = typer.Argument(help="Filesystem path to watch"),
+    name: Optional[str] = typer.Option(None, help="Filename filter"),  # pyright: ignore[reportCallInDefaultInitializer]
+    mtime: Optional[str] = typer.Option(None, help="Modification time filter"),  # pyright: ignore[reportCallInDefaultInitializer]
+    ctime: Optional[str] = typer.Option(None, help="Change time filter"),  # pyright: ignore[reportCallInDefaultInitializer]
+    size: Optional[str] = typer.Option(None, help="File size filter (e.g., 10K, 5M)"),  # pyright: ignore[reportCallInDefaultInitializer]
+    recursive: bool = typer.Option(True, help="Enable recursive search"),  # pyright: ignore[reportCallInDefaultInitializer]
+    interval: float = typer.Option(60.0, min=0.0, help="Seconds between reports; SIGUSR1 reports immediately"),  # pyright: ignore[reportCallInDefaultInitializer]
+    iterations: Optional[int] = typer.Option(None, min=1, help="Exit after this many reports"),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("filesystem-files", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return watch(
         path=path,
         name=name,
         mtime=mtime,
         ctime=ctime,
         size=size,
         recursive=recursive,
+        interval=interval,
+        iterations=iterations,
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
+    )
+
+
+@app.command("plan")
+def filesystem_plan_cmd(
+    plan_path: str = typer.Argument(help="JSON file listing the checks to run"),
+    workers: int = typer.Option(1, min=1, help="Directory traversal threads"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return plan(
+        plan_path=plan_path,
+        workers=workers,
+        location=location,
+        environment=environment,
+        function=function,
+    )
+
+
+@app.command("usage")
+def filesystem_usage_cmd(
+    path: str = typer.Argument(help="Filesystem path to account"),
+    depth: int = typer.Option(1, min=0, help="Directory levels below the path that usage is rolled up to"),  # pyright: ignore[reportCallInDefaultInitializer]
+    top: int = typer.Option(10, min=0, help="Heaviest directories listed"),  # pyright: ignore[reportCallInDefaultInitializer]
+    exclude_dir: Optional[List[str]] = typer.Option(None, help="Name or path pattern of directories not to descend into; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    one_filesystem: bool = typer.Option(False, help="Do not descend into directories on other filesystems"),  # pyright: ignore[reportCallInDefaultInitializer]
+    workers: int = typer.Option(1, min=1, help="Directory traversal threads"),  # pyright: ignore[reportCallInDefaultInitializer]
+    stats: bool = typer.Option(False, help="Add the cost of the scan to the output as monitor.perf"),  # pyright: ignore[reportCallInDefaultInitializer]
+    io_idle: bool = typer.Option(False, help="Scan in the idle I/O scheduling class"),  # pyright: ignore[reportCallInDefaultInitializer]
+    nice: Optional[int] = typer.Option(None, min=-20, max=19, help="CPU nice level of the scan"),  # pyright: ignore[reportCallInDefaultInitializer]
+    max_rate: Optional[float] = typer.Option(None, min=1.0, help="Maximum directory reads and stats per second"),  # pyright: ignore[reportCallInDefaultInitializer]
+    time_budget: Optional[float] = typer.Option(None, min=0.0, help="Seconds after which the scan stops and reports a truncated result"),  # pyright: ignore[reportCallInDefaultInitializer]
+    mount_timeout: float = typer.Option(
+        10.0, min=0.0, help="Seconds remote mounts under the path, and then each directory read, get to respond before they are skipped; 0 disables"
+    ),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("filesystem-usage", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return usage(
+        path=path,
+        depth=depth,
+        top=top,
+        exclude_dir=exclude_dir,
+        one_filesystem=one_filesystem,
+        workers=workers,
+        stats=stats,
+        io_idle=io_idle,
+        nice=nice,
+        max_rate=max_rate,
+        time_budget=time_budget,
+        mount_timeout=mount_timeout,
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
+    )
+
+
+@app.command("capacity")
+def filesystem_capacity_cmd(
+    fstype: Optional[List[str]] = typer.Option(None, help="Filesystem type glob of mounts to report, e.g. 'ext4' or 'fuse.*'; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    mountpoint: Optional[List[str]] = typer.Option(None, help="Mount point glob of mounts to report, e.g. '/var/*'; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    include_empty: bool = typer.Option(False, "--all", help="Also report mounts without any blocks, such as proc and cgroup"),  # pyright: ignore[reportCallInDefaultInitializer]
+    mount_timeout: float = typer.Option(10.0, min=0.0, help="Seconds remote mounts get to answer statvfs before they are skipped; 0 disables"),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("filesystem-capacity", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return capacity(
+        fstype=fstype,
+        mountpoint=mountpoint,
+        include_empty=include_empty,
+        mount_timeout=mount_timeout,
         location=location,
         environment=environment,
         function=function,
@@ -80,17 +243,402 @@ def find(path: Path, arguments: Optional[Iterable[str]] = None) -> Tuple[Optiona
         return (f"Error executing find: {str(e)}", None)
 
 
+def failure(errors: Iterable[str]) -> str:
+    """Format walker errors the way find() reports a failed find invocation"""
+    return "find command failed with exit code 1: " + "\n".join(errors)
+
+
+def walk(
+    path: Path,
+    maxdepth: Optional[int] = None,
+    type: Optional[str] = None,
+    name: Patterns = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    workers: int = 1,
+    prefetch: bool = True,
+    state_dir: Optional[str] = None,
+    throttle: Optional[Throttle] = None,
+    isolation: Optional[Isolation] = None,
+) -> Walker:
+    """Build a walker for the predicates exposed by files(); raises ValueError on invalid filters
+
+    Directories matching exclude_dir, and with one_filesystem those on other
+    devices, are pruned without being read. With an isolation, the mounts
+    under path are probed first and the walk skips those that do not respond;
+    when path itself is on one, the walker reports an error rather than an
+    empty tree. Directories are then read under the same deadline, so one
+    hanging later, or on a mount that was not probed, is skipped as well.
+    """
+    predicate = Predicate(type=type, name=name, mtime=mtime, ctime=ctime, size=size, exclude=exclude)
+    excluded = isolation.check(str(path)) if isolation is not None else set()
+    cache = DirectoryCache.load(state_dir, str(path)) if state_dir else None
+    walker = Walker(
+        path,
+        predicate=predicate,
+        maxdepth=maxdepth,
+        prefetch=prefetch,
+        workers=workers,
+        cache=cache,
+        throttle=throttle,
+        exclude=excluded,
+        prune=Matcher.of(exclude_dir),
+        one_filesystem=one_filesystem,
+        timeout=isolation.timeout if isolation is not None else None,
+        stalled=isolation.stalled if isolation is not None else None,
+    )
+    if isolation is not None and str(path) in excluded:
+        walker.errors.append(f"find: '{path}': mount did not respond within {isolation.timeout} seconds")
+    return walker
+
+
+def matches(walker: Walker, hasher: Optional["Hasher"] = None, tracker: Optional["Tracker"] = None) -> Iterator[Tuple[str, int]]:
+    """Lazily yield (path, size) for every entry the walker reports, queueing it on the hasher and tracker if given"""
+    for entry in walker:
+        st = walker.stat(entry)
+        if st is not None:
+            if hasher is not None:
+                hasher.add(entry.path, st)
+            if tracker is not None:
+                tracker.add(entry.path, st)
+            yield (entry.path, st.st_size)
+
+
+def complete(throttle: Optional[Throttle], isolation: Optional[Isolation]) -> bool:
+    """Whether a scan reached every file, neither cut short by the throttle nor skipping unresponsive mounts"""
+    return not (throttle is not None and throttle.truncated) and not (isolation is not None and isolation.unresponsive)
+
+
+def annotate(items: List[Dict[str, Any]], hasher: Optional["Hasher"], tracker: Optional["Tracker"]) -> None:
+    """Add the digests and growth rates of reported files, as far as they are collected"""
+    if hasher is not None:
+        digests = hasher.hash()
+        for item in items:
+            item["hash"] = digests.get(item["path"])
+    if tracker is not None:
+        rates = tracker.rates()
+        for item in items:
+            item["growth_rate"], item["rotated"] = rates.get(item["path"], (None, False))
+
+
+def count(walker: Walker, stats: Optional[perf.Stats], hasher: Optional["Hasher"] = None) -> None:
+    """Add a finished walk's counters, and those of its hasher, to the stats of the run, if they are collected"""
+    if stats is not None:
+        stats.add(directories=walker.directories, entries=walker.entries, stat_calls=walker.stat_calls)
+        if hasher is not None:
+            stats.add(**hasher.counters())
+
+
+def scan(
+    path: Path,
+    maxdepth: Optional[int] = None,
+    type: Optional[str] = None,
+    name: Patterns = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    workers: int = 1,
+    state_dir: Optional[str] = None,
+    stats: Optional[perf.Stats] = None,
+    throttle: Optional[Throttle] = None,
+    isolation: Optional[Isolation] = None,
+    hasher: Optional["Hasher"] = None,
+    tracker: Optional["Tracker"] = None,
+) -> Tuple[Optional[str], Optional[List[Tuple[Path, int]]]]:
+    """In-process equivalent of find() for the predicates exposed by files()
+
+    With a throttle the result may be partial; throttle.truncated tells. With
+    an isolation, unresponsive mounts are left out; isolation.unresponsive
+    lists them. Matches are queued on the hasher and tracker, if given, for
+    the caller to collect their digests and growth rates.
+
+    Returns:
+        Tuple of (error, result):
+        - On success: (None, list of matching files)
+        - On error: (error_message, None)
+    """
+    try:
+        walker = walk(
+            path,
+            maxdepth=maxdepth,
+            type=type,
+            name=name,
+            mtime=mtime,
+            ctime=ctime,
+            size=size,
+            exclude=exclude,
+            exclude_dir=exclude_dir,
+            one_filesystem=one_filesystem,
+            workers=workers,
+            state_dir=state_dir,
+            throttle=throttle,
+            isolation=isolation,
+        )
+    except ValueError as e:
+        return (failure([f"find: {e}"]), None)
+
+    result = [(Path(p), size) for p, size in matches(walker, hasher, tracker)]
+    count(walker, stats)
+
+    if walker.errors:
+        return (failure(walker.errors), None)
+
+    return (None, result)
+
+
+def warn(message: str) -> None:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(message)
+
+
+def abort(path: str) -> NoReturn:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(f"Unexpected error occurred while scanning path: {path}")
+
+    raise typer.Exit(code=1)
+
+
+def stream_files(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    name: Patterns = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    recursive: bool = True,
+    log_id: str = "filesystem-files",
+    workers: int = 1,
+    chunk_size: int = 1000,
+    state_dir: Optional[str] = None,
+    stats: Optional[perf.Stats] = None,
+    throttle: Optional[Throttle] = None,
+    isolation: Optional[Isolation] = None,
+    hasher: Optional["Hasher"] = None,
+    tracker: Optional["Tracker"] = None,
+) -> None:
+    """Scan filesystem path and report matching files as a sequence of NDJSON events.
+
+    Every event carries the usual metadata envelope, the scan filters and a
+    sequence number. File events hold at most chunk_size files, with their
+    digests when a hasher is given and their growth rates when a tracker is;
+    the final event holds the total count, whether the throttle truncated the
+    scan, the mounts skipped as unresponsive, the growth of the root with a
+    tracker, the scan error, if any, and the stats when they are collected.
+    Matches are never accumulated beyond one chunk.
+    """
+
+    def emit(final: bool = False, **fields: Any) -> None:
+        data = {
+            "filesystem": {"path": path, "ctime": ctime, "mtime": mtime, **fields},
+            **tools.metadata(
+                location=location,
+                environment=environment,
+                function=function,
+                log_id=log_id,
+            ),
+        }
+        written = output.write(data, flush=True, trailer=stats.monitor if final and stats is not None else None)
+        if stats is not None:
+            stats.output_bytes += written
+
+    sequence = 0
+    total = 0
+
+    try:
+        walker = walk(
+            Path(path).resolve(),
+            maxdepth=None if recursive else 1,
+            type="f",
+            name=name,
+            mtime=mtime,
+            ctime=ctime,
+            size=size,
+            exclude=exclude,
+            exclude_dir=exclude_dir,
+            one_filesystem=one_filesystem,
+            workers=workers,
+            state_dir=state_dir,
+            throttle=throttle,
+            isolation=isolation,
+        )
+    except ValueError as e:
+        emit(final=True, count=total, error=failure([f"find: {e}"]), sequence=sequence)
+        abort(path)
+
+    def emit_files(chunk: List[Dict[str, Any]]) -> None:
+        annotate(chunk, hasher, tracker)
+        emit(files=chunk, sequence=sequence)
+
+    chunk: List[Dict[str, Any]] = []
+    for p, file_size in matches(walker, hasher, tracker):
+        chunk.append({"path": p, "size": file_size})
+        total += 1
+        if len(chunk) >= chunk_size:
+            emit_files(chunk)
+            sequence += 1
+            chunk = []
+
+    if chunk:
+        emit_files(chunk)
+        sequence += 1
+
+    count(walker, stats, hasher)
+    error = failure(walker.errors) if walker.errors else None
+    unresponsive = [] if isolation is None else isolation.to_list()
+    extra = {} if tracker is None else {"growth": tracker.summary(complete(throttle, isolation))}
+    emit(final=True, count=total, truncated=walker.truncated, unresponsive=unresponsive, **extra, error=error, sequence=sequence)
+
+    if error is not None:
+        abort(path)
+
+
+def summarize_files(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    name: Patterns = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    recursive: bool = True,
+    log_id: str = "filesystem-files",
+    workers: int = 1,
+    top: int = 10,
+    count_only: bool = False,
+    state_dir: Optional[str] = None,
+    stats: Optional[perf.Stats] = None,
+    throttle: Optional[Throttle] = None,
+    isolation: Optional[Isolation] = None,
+) -> None:
+    """Scan filesystem path and report aggregates instead of individual files.
+
+    Matches are folded into a Summary as they are found, so memory is bounded
+    by the top-N heaps. With count_only set and no size or time filter, entries
+    are never statted.
+    """
+    try:
+        walker = walk(
+            Path(path).resolve(),
+            maxdepth=None if recursive else 1,
+            type="f",
+            name=name,
+            mtime=mtime,
+            ctime=ctime,
+            size=size,
+            exclude=exclude,
+            exclude_dir=exclude_dir,
+            one_filesystem=one_filesystem,
+            workers=workers,
+            prefetch=not count_only,
+            state_dir=state_dir,
+            throttle=throttle,
+            isolation=isolation,
+        )
+    except ValueError as e:
+        walker = None
+        error = failure([f"find: {e}"])
+
+    if walker is not None:
+        summary = Summary(now=walker.predicate.now if walker.predicate else time.time(), top=top)
+        for entry in walker:
+            if count_only:
+                summary.add(entry.path)
+                continue
+            st = walker.stat(entry)
+            if st is not None:
+                summary.add(entry.path, size=st.st_size, mtime=st.st_mtime)
+        count(walker, stats)
+        error = failure(walker.errors) if walker.errors else None
+
+        if error is None:
+            data = {
+                "filesystem": {
+                    "path": path,
+                    "ctime": ctime,
+                    "mtime": mtime,
+                    **summary.to_dict(stat=not count_only),
+                    "truncated": walker.truncated,
+                    "unresponsive": [] if isolation is None else isolation.to_list(),
+                    "error": error,
+                },
+                **tools.metadata(
+                    location=location,
+                    environment=environment,
+                    function=function,
+                    log_id=log_id,
+                ),
+            }
+            output.write(data, trailer=None if stats is None else stats.monitor)
+            return
+
+    data = {
+        "filesystem": {
+            "path": path,
+            "error": error,
+        },
+        **tools.metadata(
+            location=location,
+            environment=environment,
+            function=function,
+            log_id=log_id,
+        ),
+    }
+    output.write(data, trailer=None if stats is None else stats.monitor)
+
+    abort(path)
+
+
 def files(
     path: str,
     location: str,
     environment: str,
     function: str,
-    name: Optional[str] = None,
+    name: Patterns = None,
     mtime: Optional[str] = None,
     ctime: Optional[str] = None,
     size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
     recursive: bool = True,
     log_id: str = "filesystem-files",
+    workers: int = 1,
+    sort: bool = False,
+    stream: bool = False,
+    chunk_size: int = 1000,
+    summary: bool = False,
+    top: int = 10,
+    count_only: bool = False,
+    state_dir: Optional[str] = None,
+    hash: bool = False,
+    hash_workers: Optional[int] = None,
+    growth: bool = False,
+    stats: bool = False,
+    io_idle: bool = False,
+    nice: Optional[int] = None,
+    max_rate: Optional[float] = None,
+    time_budget: Optional[float] = None,
+    mount_timeout: float = 10.0,
 ) -> None:
     """Scan filesystem path and report files matching criteria.
 
@@ -99,72 +647,507 @@ def files(
         location: Location identifier
         environment: Environment name
         function: Function identifier
-        name: Filename filter (e.g., "*.txt", "file.log")
+        name: Filename filter (e.g., "*.txt", "file.log"), or a list of them matching files that match any
+        size: File size filter (e.g., "+10M")
+        exclude: Patterns of files left out; patterns holding a "/" match the whole path, the others the name
+        exclude_dir: Patterns of directories below path that are not read, matched like exclude
+        one_filesystem: Whether to stay on the filesystem of path, like find -xdev
         mtime: Modification time filter in days (e.g., "-7" for within 7 days, "+1" for older than 1 day)
         ctime: Change time filter in days (e.g., "-7" for within 7 days, "+1" for older than 1 day)
         recursive: Whether to scan recursively
         log_id: Log identifier
+        workers: Number of threads reading directories concurrently
+        sort: Whether to sort reported files by path
+        stream: Whether to emit NDJSON chunk events instead of one document
+        chunk_size: Maximum number of files per streamed event
+        summary: Whether to report aggregates instead of individual files
+        top: Number of largest and oldest files listed in the summary
+        count_only: Whether the summary should only count files, skipping stat
+        state_dir: Directory holding listings and digests from previous runs for incremental scans
+        hash: Whether to add a content digest to every file; with state_dir, only files whose device, inode, size,
+            mtime or ctime changed since the last run are read
+        hash_workers: Number of processes reading files for hash; defaults to the number of CPUs
+        growth: Whether to add the growth of every file and of all of them in bytes per second since the last run,
+            and the seconds until the filesystem of path fills up at that rate; samples are kept in state_dir
+        stats: Whether to add the wall and CPU time, directories, entries and stat calls of the scan, peak RSS and output size as monitor.perf
+        io_idle: Whether to scan in the idle I/O scheduling class, so the scan only gets disk time nothing else wants
+        nice: CPU nice level of the scan
+        max_rate: Maximum number of directory reads and stats per second
+        time_budget: Seconds after which the scan stops; the partial result is reported with truncated set
+        mount_timeout: Seconds remote mounts under path get to answer a probe; those that do not are skipped and
+            reported as unresponsive with their source and the time waited. 0 disables the probes
+    """
+    run = perf.Stats() if stats else None
+    throttle = None if max_rate is None and time_budget is None else Throttle(rate=max_rate, budget=time_budget)
+    isolation = Isolation(mount_timeout) if mount_timeout > 0 else None
+    for message in prioritize(idle=io_idle, nice=nice):
+        warn(message)
+
+    if stream and sort:
+        raise typer.BadParameter("--sort cannot be combined with --stream")
+
+    if summary and (stream or sort):
+        raise typer.BadParameter("--summary cannot be combined with --stream or --sort")
+
+    if summary and hash:
+        raise typer.BadParameter("--hash cannot be combined with --summary")
+
+    if summary and growth:
+        raise typer.BadParameter("--growth cannot be combined with --summary")
+
+    if growth and not state_dir:
+        raise typer.BadParameter("--growth requires --state-dir")
+
+    if summary:
+        return summarize_files(
+            path=path,
+            location=location,
+            environment=environment,
+            function=function,
+            name=name,
+            mtime=mtime,
+            ctime=ctime,
+            size=size,
+            exclude=exclude,
+            exclude_dir=exclude_dir,
+            one_filesystem=one_filesystem,
+            recursive=recursive,
+            log_id=log_id,
+            workers=workers,
+            top=top,
+            count_only=count_only,
+            state_dir=state_dir,
+            stats=run,
+            throttle=throttle,
+            isolation=isolation,
+        )
+
+    tracker = None
+    if growth and state_dir:
+        import sqlite3
+
+        from pokerops.monitoring.growth import GrowthStore, Tracker
+
+        root = str(Path(path).resolve())
+        try:
+            tracker = Tracker(GrowthStore.open(state_dir, root), root)
+        except sqlite3.Error as e:
+            warn(f"Unable to open growth samples: {e}")
+            raise typer.Exit(code=1) from e
+
+    hasher = None
+    if hash:
+        from pokerops.monitoring.digest import HashCache, Hasher
+
+        cache = HashCache.load(state_dir, str(Path(path).resolve())) if state_dir else None
+        hasher = Hasher(workers=hash_workers or os.cpu_count() or 1, cache=cache)
+
+    # Set once the scan succeeded; a failed scan stores its digests and samples as a partial one
+    succeeded = False
+    try:
+        if stream:
+            stream_files(
+                path=path,
+                location=location,
+                environment=environment,
+                function=function,
+                name=name,
+                mtime=mtime,
+                ctime=ctime,
+                size=size,
+                exclude=exclude,
+                exclude_dir=exclude_dir,
+                one_filesystem=one_filesystem,
+                recursive=recursive,
+                log_id=log_id,
+                workers=workers,
+                chunk_size=chunk_size,
+                state_dir=state_dir,
+                stats=run,
+                throttle=throttle,
+                isolation=isolation,
+                hasher=hasher,
+                tracker=tracker,
+            )
+            succeeded = True
+            return
+
+        error, data = report(
+            path=path,
+            location=location,
+            environment=environment,
+            function=function,
+            name=name,
+            mtime=mtime,
+            ctime=ctime,
+            size=size,
+            exclude=exclude,
+            exclude_dir=exclude_dir,
+            one_filesystem=one_filesystem,
+            recursive=recursive,
+            log_id=log_id,
+            workers=workers,
+            sort=sort,
+            state_dir=state_dir,
+            stats=run,
+            throttle=throttle,
+            isolation=isolation,
+            hasher=hasher,
+            tracker=tracker,
+        )
+
+        succeeded = error is None
+        output.write(data, trailer=None if run is None else run.monitor)
+    finally:
+        # Digests and samples of files a partial or failed scan did not reach are kept for the next run
+        whole = succeeded and complete(throttle, isolation)
+        if hasher is not None:
+            try:
+                hasher.close(complete=whole)
+            except OSError as e:
+                warn(f"Unable to store file digests: {e}")
+        if tracker is not None:
+            import sqlite3
+
+            try:
+                tracker.close(complete=whole)
+            except sqlite3.Error as e:
+                warn(f"Unable to store growth samples: {e}")
+
+    if error is not None:
+        abort(path)
+
+
+def report(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    name: Patterns = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    exclude: Patterns = None,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    recursive: bool = True,
+    log_id: str = "filesystem-files",
+    workers: int = 1,
+    sort: bool = False,
+    state_dir: Optional[str] = None,
+    stats: Optional[perf.Stats] = None,
+    throttle: Optional[Throttle] = None,
+    isolation: Optional[Isolation] = None,
+    hasher: Optional["Hasher"] = None,
+    tracker: Optional["Tracker"] = None,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Build the files() document without printing it
+
+    Walk counters are added to stats when given; the caller reports them.
+    With a hasher, every file carries its digest, and with a tracker its
+    growth rate, next to the growth of them all; the caller closes both.
+    A scan cut short by the throttle is reported with truncated set, and
+    mounts the isolation skipped are listed as unresponsive.
+
+    Returns:
+        Tuple of (error, document), where error is None when the scan succeeded
     """
-    error, file_list = find(
+    error, file_list = scan(
         path=Path(path).resolve(),
-        arguments=(
-            argument("-maxdepth", "1" if not recursive else None),
-            argument("-type", "f"),
-            argument("-name", name),
-            argument("-mtime", mtime),
-            argument("-ctime", ctime),
-            argument("-size", size),
-        ),
+        maxdepth=None if recursive else 1,
+        type="f",
+        name=name,
+        mtime=mtime,
+        ctime=ctime,
+        size=size,
+        exclude=exclude,
+        exclude_dir=exclude_dir,
+        one_filesystem=one_filesystem,
+        workers=workers,
+        state_dir=state_dir,
+        stats=stats,
+        throttle=throttle,
+        isolation=isolation,
+        hasher=hasher,
+        tracker=tracker,
+    )
+
+    metadata = tools.metadata(
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
     )
 
-    if file_list is not None:
-        file_data = {
+    if file_list is None:
+        return (error, {"filesystem": {"path": path, "error": error}, **metadata})
+
+    if sort:
+        file_list.sort(key=lambda f: str(f[0]))
+
+    reported = [{"path": str(p), "size": size} for p, size in file_list]
+    annotate(reported, hasher, tracker)
+    if hasher is not None and stats is not None:
+        stats.add(**hasher.counters())
+
+    file_data = {
+        "filesystem": {
+            "path": path,
+            "ctime": ctime,
+            "mtime": mtime,
+            "files": reported,
+            "count": len(file_list),
+            "truncated": throttle is not None and throttle.truncated,
+            "unresponsive": [] if isolation is None else isolation.to_list(),
+            **({} if tracker is None else {"growth": tracker.summary(complete(throttle, isolation))}),
+            "error": error,
+        }
+    }
+
+    return (None, {**file_data, **metadata})
+
+
+def watch(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    name: Optional[str] = None,
+    mtime: Optional[str] = None,
+    ctime: Optional[str] = None,
+    size: Optional[str] = None,
+    recursive: bool = True,
+    interval: float = 60.0,
+    iterations: Optional[int] = None,
+    log_id: str = "filesystem-files",
+) -> None:
+    """Index a path once, keep it current with inotify and report it periodically.
+
+    Each report has the same shape as the files() document and is emitted every
+    interval seconds, or immediately on SIGUSR1. Time filters are evaluated
+    against the time of each report.
+    """
+
+    from pokerops.monitoring.watch import FileIndex, serve
+
+    def metadata() -> tools.Fields:
+        return tools.metadata(location=location, environment=environment, function=function, log_id=log_id)
+
+    try:
+        Predicate(type="f", name=name, mtime=mtime, ctime=ctime, size=size)
+        index = FileIndex(str(Path(path).resolve()), recursive=recursive)
+    except (ValueError, OSError) as e:
+        output.write({"filesystem": {"path": path, "error": f"watch: {e}"}, **metadata()})
+        abort(path)
+
+    def emit() -> None:
+        file_list = list(index.files(Predicate(type="f", name=name, mtime=mtime, ctime=ctime, size=size)))
+        data = {
             "filesystem": {
                 "path": path,
                 "ctime": ctime,
                 "mtime": mtime,
-                "files": [{"path": str(p), "size": size} for p, size in file_list],
+                "files": [{"path": p, "size": file_size} for p, file_size in file_list],
                 "count": len(file_list),
-                "error": error,
-            }
+                "truncated": False,
+                "unresponsive": [],
+                "error": "\n".join(index.errors) or None,
+            },
+            **metadata(),
         }
+        output.write(data, flush=True)
+
+    try:
+        index.build()
+        serve(index, emit, interval=interval, iterations=iterations)
+    finally:
+        index.close()
+
+
+def plan(
+    plan_path: str,
+    location: str,
+    environment: str,
+    function: str,
+    workers: int = 1,
+) -> None:
+    """Run a batch of files() checks, walking every distinct root only once.
 
+    The plan file holds a list of checks (or an object with a "checks" list)
+    whose keys mirror the files() options: path, name, mtime, ctime, size,
+    recursive and log_id, plus optional location, environment and function
+    overriding the command line values. One files() document is printed per
+    check, in plan order.
+
+    Args:
+        plan_path: Path to the JSON plan file
+        location: Default location identifier
+        environment: Default environment name
+        function: Default function identifier
+        workers: Number of threads reading directories concurrently
+    """
+    from pokerops.monitoring.plan import load as load_plan
+    from pokerops.monitoring.plan import run as run_plan
+
+    try:
+        checks = load_plan(plan_path)
+    except (OSError, ValueError) as e:
         data = {
-            **file_data,
-            **tools.metadata(
-                location=location,
-                environment=environment,
-                function=function,
-                log_id=log_id,
-            ),
+            "filesystem": {"path": plan_path, "error": f"Invalid plan: {e}"},
+            **tools.metadata(location=location, environment=environment, function=function, log_id="filesystem-plan"),
         }
+        output.write(data)
+        abort(plan_path)
+
+    failed: List[str] = []
+    for check, errors, file_list in run_plan(checks, workers=workers):
+        metadata = tools.metadata(
+            location=location if check.location is None else check.location,
+            environment=environment if check.environment is None else check.environment,
+            function=function if check.function is None else check.function,
+            log_id=check.log_id,
+        )
+        if file_list is None:
+            failed.append(check.path)
+            data = {"filesystem": {"path": check.path, "error": failure(errors)}, **metadata}
+        else:
+            data = {
+                "filesystem": {
+                    "path": check.path,
+                    "ctime": check.ctime,
+                    "mtime": check.mtime,
+                    "files": [{"path": p, "size": file_size} for p, file_size in file_list],
+                    "count": len(file_list),
+                    "truncated": False,
+                    "unresponsive": [],
+                    "error": None,
+                },
+                **metadata,
+            }
+        output.write(data)
+
+    if failed:
+        abort(", ".join(failed))
+
 
-        print(json.dumps(data))
-        return
+def usage(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    depth: int = 1,
+    top: int = 10,
+    exclude_dir: Patterns = None,
+    one_filesystem: bool = False,
+    workers: int = 1,
+    log_id: str = "filesystem-usage",
+    stats: bool = False,
+    io_idle: bool = False,
+    nice: Optional[int] = None,
+    max_rate: Optional[float] = None,
+    time_budget: Optional[float] = None,
+    mount_timeout: float = 10.0,
+) -> None:
+    """Report allocated bytes and file counts under a path, like du, in one traversal.
 
-    error_data = {
+    Every entry is statted once, on the walker threads, and its st_blocks are
+    added to its directory and each ancestor down to depth levels below path.
+    Files with several hardlinks are counted once. Only the top heaviest
+    directories within depth are listed, next to the totals.
+
+    Args:
+        path: Directory path to account
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        depth: Directory levels below path that usage is rolled up to; 0 only reports the totals
+        top: Number of heaviest directories listed
+        exclude_dir: Patterns of directories below path that are not read, as for files()
+        one_filesystem: Whether to stay on the filesystem of path, like du -x
+        workers: Number of threads reading directories concurrently
+        log_id: Log identifier
+        stats: Whether to add the cost of the scan as monitor.perf
+        io_idle: Whether to scan in the idle I/O scheduling class
+        nice: CPU nice level of the scan
+        max_rate: Maximum number of directory reads and stats per second
+        time_budget: Seconds after which the scan stops; the partial result is reported with truncated set
+        mount_timeout: Seconds remote mounts under path get to answer a probe before they are skipped; 0 disables
+    """
+    from pokerops.monitoring.usage import Usage
+
+    run = perf.Stats() if stats else None
+    throttle = None if max_rate is None and time_budget is None else Throttle(rate=max_rate, budget=time_budget)
+    isolation = Isolation(mount_timeout) if mount_timeout > 0 else None
+    for message in prioritize(idle=io_idle, nice=nice):
+        warn(message)
+
+    root = Path(path).resolve()
+    walker = walk(root, exclude_dir=exclude_dir, one_filesystem=one_filesystem, workers=workers, throttle=throttle, isolation=isolation)
+    totals = Usage(str(root), depth=depth)
+    for entry in walker:
+        st = walker.stat(entry)
+        if st is not None:
+            totals.add(entry.path, st)
+    count(walker, stats=run)
+
+    metadata = tools.metadata(location=location, environment=environment, function=function, log_id=log_id)
+    if walker.errors:
+        output.write({"filesystem": {"path": path, "error": failure(walker.errors)}, **metadata}, trailer=None if run is None else run.monitor)
+        abort(path)
+
+    data = {
         "filesystem": {
             "path": path,
-            "error": error,
-        }
+            **totals.to_dict(top=top),
+            "truncated": walker.truncated,
+            "unresponsive": [] if isolation is None else isolation.to_list(),
+            "error": None,
+        },
+        **metadata,
     }
+    output.write(data, trailer=None if run is None else run.monitor)
 
-    data = {
-        **error_data,
-        **tools.metadata(
-            location=location,
-            environment=environment,
-            function=function,
-            log_id=log_id,
-        ),
-    }
 
-    print(json.dumps(data))
+def capacity(
+    location: str,
+    environment: str,
+    function: str,
+    fstype: Patterns = None,
+    mountpoint: Patterns = None,
+    include_empty: bool = False,
+    mount_timeout: float = 10.0,
+    log_id: str = "filesystem-capacity",
+) -> None:
+    """Report the space and inode usage of mounted filesystems, like df, without reading any directory.
 
-    stderr = Console(stderr=True)
-    stderr.print(f"Unexpected error occurred while scanning path: {path}")
+    The mount table is read once from /proc/self/mountinfo and every selected
+    mount costs a single statvfs, so the answer does not depend on how many
+    files the mounts hold. Remote mounts that do not answer in time are
+    listed as unresponsive; the others are still reported.
 
-    raise typer.Exit(code=1)
+    Args:
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        fstype: Globs of the filesystem types reported; all when None
+        mountpoint: Globs of the mount points reported; all when None
+        include_empty: Whether to report mounts without any blocks, such as proc and cgroup
+        mount_timeout: Seconds remote mounts get to answer statvfs in a child process before they are skipped;
+            0 stats every mount in process
+        log_id: Log identifier
+    """
+    from pokerops.monitoring.capacity import Capacity
+
+    mounts = Capacity(mount_timeout)
+    data = {
+        "filesystem": {
+            "mounts": mounts.measure(fstype=fstype, mountpoint=mountpoint, include_empty=include_empty),
+            "unresponsive": mounts.to_list(),
+            "error": None,
+        },
+        **tools.metadata(location=location, environment=environment, function=function, log_id=log_id),
+    }
+    output.write(data)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""Growth rates of scanned files between runs, and when their filesystem fills up.
+
+Samples of every file, its device, inode, size and the time of the run, are
+kept in a SQLite database per scan root. A run loads the previous samples
+into memory with one query, so each lookup is a dict access, and replaces them
+in a single transaction.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, dev INTEGER, ino INTEGER, size INTEGER, time REAL) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER, time REAL)",
+)
+
+# (st_dev, st_ino, size, time of the run), keyed by path
+Sample = Tuple[int, int, int, float]
+# (bytes per second, or None for a new file, whether the file was rotated)
+Rate = Tuple[Optional[float], bool]
+
+
+class GrowthStore:
+    """Samples of the files under one root from the last run, in a SQLite database"""
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(str(self.path))
+        try:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, self.VERSION):
+                self.connection.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS runs;")
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            self.connection.execute(f"PRAGMA user_version = {self.VERSION}")
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.close()
+            raise
+
+    @classmethod
+    def open(cls, state_dir: Union[str, Path], root: str) -> "GrowthStore":
+        """The store of a root; raises sqlite3.Error when it cannot be opened"""
+        return cls(Path(state_dir) / f"growth-{hashlib.sha1(root.encode()).hexdigest()[:16]}.sqlite")
+
+    def samples(self) -> Dict[str, Sample]:
+        return {path: (dev, ino, size, at) for path, dev, ino, size, at in self.connection.execute("SELECT path, dev, ino, size, time FROM files")}
+
+    def last_run(self) -> Optional[Tuple[int, float]]:
+        """Total bytes and time of the last complete run"""
+        row = self.connection.execute("SELECT bytes, time FROM runs WHERE id = 0").fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def save(self, samples: Dict[str, Sample], run: Optional[Tuple[int, float]]) -> None:
+        """Store the samples of a run, replacing all others when run holds the totals of a complete one"""
+        with self.connection:
+            if run is not None:
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("INSERT OR REPLACE INTO runs (id, bytes, time) VALUES (0, ?, ?)", run)
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files (path, dev, ino, size, time) VALUES (?, ?, ?, ?, ?)",
+                ((path, *sample) for path, sample in samples.items()),
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def rate(previous: Optional[Sample], st: os.stat_result, now: float) -> Rate:
+    """Growth of a file since its previous sample
+
+    A file with another inode than before, or smaller than before, was
+    rotated; its rate is then the growth of the new file over the whole
+    interval, a lower bound.
+    """
+    if previous is None or now <= previous[3]:
+        return (None, False)
+    dev, ino, size, at = previous
+    if (dev, ino) != (st.st_dev, st.st_ino) or st.st_size < size:
+        return (st.st_size / (now - at), True)
+    return ((st.st_size - size) / (now - at), False)
+
+
+class Tracker:
+    """Growth of the files a walk reports, against the samples of the previous run
+
+    Files are added with the lstat result the walk already has; rates() hands
+    out the rates of those added since the last call.
+    """
+
+    def __init__(self, store: GrowthStore, root: str, now: Optional[float] = None):
+        self.store = store
+        self.root = root
+        self.now = time.time() if now is None else now
+        self.previous = store.samples()
+        self.current: Dict[str, Sample] = {}
+        self.pending: Dict[str, Rate] = {}
+        self.bytes = 0
+        self.rotated = 0
+
+    def add(self, path: str, st: os.stat_result) -> None:
+        growth = rate(self.previous.get(path), st, self.now)
+        self.pending[path] = growth
+        self.current[path] = (st.st_dev, st.st_ino, st.st_size, self.now)
+        self.bytes += st.st_size
+        self.rotated += growth[1]
+
+    def rates(self) -> Dict[str, Rate]:
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def summary(self, complete: bool = True) -> Dict[str, Any]:
+        """Growth of all files under the root and the forecast for its filesystem
+
+        The total rate needs a complete scan now and before; without one, the
+        rate and the forecast are None. The forecast extrapolates the total
+        rate until the space available to unprivileged users runs out.
+        """
+        last = self.store.last_run()
+        growth: Optional[float] = None
+        if complete and last is not None and self.now > last[1]:
+            growth = (self.bytes - last[0]) / (self.now - last[1])
+        available: Optional[int] = None
+        if complete:
+            try:
+                st = os.statvfs(self.root)
+                available = st.f_bavail * st.f_frsize
+            except OSError:
+                pass
+        return {
+            "bytes": self.bytes,
+            "rate": growth,
+            "interval": None if last is None else self.now - last[1],
+            "rotated": self.rotated,
+            "available_bytes": available,
+            "seconds_until_full": available / growth if available is not None and growth is not None and growth > 0 else None,
+        }
+
+    def close(self, complete: bool = True) -> None:
+        """Store this run's samples; after a partial run, those of files it did not reach are kept"""
+        try:
+            self.store.save(self.current, (self.bytes, self.now) if complete else None)
+        finally:
+            self.store.close()
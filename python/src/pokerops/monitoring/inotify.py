@@ -0,0 +1,92 @@
+"""Minimal ctypes binding for Linux inotify(7)."""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import Iterator, NamedTuple, Optional
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+HEADER = struct.Struct("iIII")
+
+
+class Event(NamedTuple):
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+_libc: Optional[ctypes.CDLL] = None
+
+
+def libc() -> ctypes.CDLL:
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(_libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+    return _libc
+
+
+def check(result: int) -> int:
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return result
+
+
+class Inotify:
+    """Non-blocking inotify instance; read() returns whatever events are queued"""
+
+    def __init__(self):
+        self.fd = check(libc().inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+    def add_watch(self, path: str, mask: int) -> int:
+        return check(libc().inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask)))
+
+    def rm_watch(self, wd: int) -> None:
+        libc().inotify_rm_watch(self.fd, wd)
+
+    def read(self, size: int = 65536) -> Iterator[Event]:
+        try:
+            data = os.read(self.fd, size)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            (wd, mask, cookie, length) = HEADER.unpack_from(data, offset)
+            offset += HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            yield Event(wd, mask, cookie, name)
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> "Inotify":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
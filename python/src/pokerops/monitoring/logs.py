@@ -0,0 +1,334 @@
+import json
+import re
+import time
+from typing import Any, Dict, List, NoReturn, Optional, Pattern, Tuple
+
+import typer
+from pokerops.monitoring import output, tools
+from pokerops.monitoring.sketch import DDSketch
+from pokerops.monitoring.tail import Tail
+
+app = typer.Typer(help="Log monitoring commands")
+
+# Log format -> (severity regex with a {} for the alternatives, severities counted by default)
+SEVERITY: Dict[str, Tuple[str, List[str]]] = {
+    # {"t":{"$date":"..."},"s":"E","c":"NETWORK",...}
+    "mongod": ('"s":"(?:{})"', ["F", "E"]),
+    # 2024-05-01 12:00:00 routing ERROR [7f3c9a7fe700] ...
+    "mysqlrouter": ("^\\S+ \\S+ \\S+ (?:{}) ", ["FATAL", "ERROR"]),
+}
+
+# Only mongod lines holding this are decoded as JSON
+DURATION = b'"durationMillis":'
+QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+@app.command("scan")
+def logs_scan_cmd(
+    path: str = typer.Argument(help="Log file to scan"),
+    pattern: Optional[List[str]] = typer.Option(None, help="Regular expression whose matching lines are counted; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    format: Optional[str] = typer.Option(None, help=f"Log format whose severities are counted: {', '.join(SEVERITY)}"),  # pyright: ignore[reportCallInDefaultInitializer]
+    severity: Optional[List[str]] = typer.Option(None, help="Severity counted with --format, as written in the log; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    state_dir: Optional[str] = typer.Option(None, help="Directory for the offset reached, so the next run only reads what was appended"),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("logs-scan", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return scan(
+        path=path,
+        pattern=pattern,
+        format=format,
+        severity=severity,
+        state_dir=state_dir,
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
+    )
+
+
+@app.command("mongod-latency")
+def logs_mongod_latency_cmd(
+    path: str = typer.Argument(help="mongod log file to read"),
+    state_dir: Optional[str] = typer.Option(None, help="Directory for the offset reached, so the next run only reads what was appended"),  # pyright: ignore[reportCallInDefaultInitializer]
+    interval: Optional[float] = typer.Option(None, min=0.0, help="Keep following the log and report every this many seconds"),  # pyright: ignore[reportCallInDefaultInitializer]
+    iterations: Optional[int] = typer.Option(None, min=1, help="Exit after this many reports when following"),  # pyright: ignore[reportCallInDefaultInitializer]
+    relative_accuracy: float = typer.Option(0.01, min=0.0001, max=0.5, help="Relative error of the reported quantiles"),  # pyright: ignore[reportCallInDefaultInitializer]
+    sketch: bool = typer.Option(False, help="Add the DDSketch of every operation, so reports can be merged downstream"),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("logs-mongod-latency", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return mongod_latency(
+        path=path,
+        state_dir=state_dir,
+        interval=interval,
+        iterations=iterations,
+        relative_accuracy=relative_accuracy,
+        sketch=sketch,
+        location=location,
+        environment=environment,
+        function=function,
+        log_id=log_id,
+    )
+
+
+def abort(path: str) -> NoReturn:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(f"Unexpected error occurred while reading log: {path}")
+
+    raise typer.Exit(code=1)
+
+
+def warn(message: str) -> None:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(message)
+
+
+def compile_patterns(pattern: Optional[List[str]], format: Optional[str], severity: Optional[List[str]]) -> Dict[str, Pattern[bytes]]:
+    """Regular expressions on raw log bytes, keyed by the pattern or severity they count; raises typer.BadParameter"""
+    if format is not None and format not in SEVERITY:
+        raise typer.BadParameter(f"--format must be one of: {', '.join(SEVERITY)}")
+    if severity and format is None:
+        raise typer.BadParameter("--severity requires --format")
+    if not pattern and format is None:
+        raise typer.BadParameter("--pattern or --format is required")
+
+    expressions: Dict[str, str] = {p: p for p in pattern or ()}
+    if format is not None:
+        template, default = SEVERITY[format]
+        expressions.update({s: template.format(re.escape(s)) for s in severity or default})
+    compiled = {}
+    for label, expression in expressions.items():
+        try:
+            compiled[label] = re.compile(expression.encode(), re.MULTILINE)
+        except re.error as e:
+            raise typer.BadParameter(f"Invalid pattern {expression!r}: {e}") from e
+    return compiled
+
+
+def count(expression: Pattern[bytes], chunk: bytes) -> int:
+    """Lines of a chunk of whole lines holding a match
+
+    The search runs in C over the non-matching stretches; Python only steps
+    in once per matching line, to resume at the start of the next one.
+    """
+    lines = 0
+    position = 0
+    search = expression.search
+    while True:
+        match = search(chunk, position)
+        if match is None:
+            return lines
+        lines += 1
+        position = chunk.find(b"\n", match.start()) + 1
+        if position == 0:
+            return lines
+
+
+def scan(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    pattern: Optional[List[str]] = None,
+    format: Optional[str] = None,
+    severity: Optional[List[str]] = None,
+    state_dir: Optional[str] = None,
+    log_id: str = "logs-scan",
+) -> None:
+    """Count the lines of a log matching patterns or severities, reading only what was appended since the last run.
+
+    Patterns are compiled once and run over raw bytes in chunks of whole
+    lines. With state_dir, the offset reached is kept by device and inode, so
+    rotation and copytruncate are followed and a multi-gigabyte log costs
+    only its delta; without it, the whole log is read.
+
+    Args:
+        path: Log file to scan
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        pattern: Regular expressions whose matching lines are counted, each under its own key
+        format: Log format whose severities are counted: mongod or mysqlrouter
+        severity: Severities counted for format, as written in the log; its defaults when None
+        state_dir: Directory where the offset reached is kept between runs
+        log_id: Log identifier
+    """
+    expressions = compile_patterns(pattern, format, severity)
+    tail = Tail.open(path, state_dir, "scan")
+    matches = dict.fromkeys(expressions, 0)
+    lines = 0
+
+    error: Optional[str] = None
+    try:
+        for chunk in tail.chunks():
+            lines += chunk.count(b"\n")
+            for label, expression in expressions.items():
+                matches[label] += count(expression, chunk)
+    except OSError as e:
+        error = f"{path}: {e.strerror or e}"
+
+    metadata = tools.metadata(location=location, environment=environment, function=function, log_id=log_id)
+    if error is not None:
+        output.write({"logs": {"path": path, "error": error}, **metadata})
+        abort(path)
+
+    data: Dict[str, Any] = {
+        "logs": {
+            "path": path,
+            "matches": matches,
+            "lines": lines,
+            "bytes": tail.bytes,
+            "rotated": tail.rotated,
+            "truncated": tail.truncated,
+            "error": None,
+        },
+        **metadata,
+    }
+    output.write(data)
+
+    try:
+        tail.save()
+    except OSError as e:
+        warn(f"Unable to store log offset: {e}")
+
+
+class Latency:
+    """Durations of the slow operations in mongod log lines, per namespace and operation
+
+    Only lines holding durationMillis are located, with a byte search over
+    the chunk, and decoded as JSON; every other line is skipped without
+    being split out. The operation is the command name, such as find or
+    aggregate, or else the type mongod logs.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.sketches: Dict[Tuple[str, str], DDSketch] = {}
+        self.ignored = 0
+
+    def feed(self, chunk: bytes) -> None:
+        find = chunk.find
+        position = find(DURATION)
+        while position != -1:
+            start = chunk.rfind(b"\n", 0, position) + 1
+            end = find(b"\n", position)
+            if end == -1:
+                end = len(chunk)
+            self.add(chunk[start:end])
+            position = find(DURATION, end)
+
+    def add(self, line: bytes) -> None:
+        """Account one line; lines that are not JSON or lack a namespace or duration are counted as ignored"""
+        try:
+            attr = json.loads(line)["attr"]
+            duration = float(attr["durationMillis"])
+            namespace = str(attr["ns"])
+        except (ValueError, KeyError, TypeError):
+            self.ignored += 1
+            return
+        command = attr.get("command")
+        operation = next(iter(command)) if isinstance(command, dict) and command else str(attr.get("type", "unknown"))
+        sketch = self.sketches.get((namespace, operation))
+        if sketch is None:
+            sketch = self.sketches[(namespace, operation)] = DDSketch(self.relative_accuracy)
+        sketch.add(duration)
+
+    @staticmethod
+    def summarize(sketch: DDSketch) -> Dict[str, Any]:
+        quantiles = {name: sketch.quantile(q) for name, q in QUANTILES.items()}
+        return {"count": sketch.count, **{name: None if v is None else round(v, 3) for name, v in quantiles.items()}, "max": sketch.max}
+
+    def to_dict(self, sketch: bool = False) -> Dict[str, Any]:
+        """Summaries per operation and of all of them, merged from the per-operation sketches"""
+        total = DDSketch(self.relative_accuracy)
+        operations = []
+        for (namespace, operation), each in sorted(self.sketches.items()):
+            total.merge(each)
+            summary = {"namespace": namespace, "operation": operation, **self.summarize(each)}
+            if sketch:
+                summary["sketch"] = each.to_dict()
+            operations.append(summary)
+        return {"operations": operations, "total": self.summarize(total), "ignored": self.ignored}
+
+
+def mongod_latency(
+    path: str,
+    location: str,
+    environment: str,
+    function: str,
+    state_dir: Optional[str] = None,
+    interval: Optional[float] = None,
+    iterations: Optional[int] = None,
+    relative_accuracy: float = 0.01,
+    sketch: bool = False,
+    log_id: str = "logs-mongod-latency",
+) -> None:
+    """Report count, p50, p95, p99 and max of mongod slow operation durations per namespace and operation.
+
+    Each report covers the lines appended since the previous one, read as by
+    scan(). Durations are aggregated into DDSketches, so memory is bounded
+    by the number of namespaces and operations, not of lines. Without
+    interval, one report is made and the offset kept in state_dir for the
+    next run; with it, the log is followed and reported every interval
+    seconds.
+
+    Args:
+        path: mongod log file to read
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        state_dir: Directory where the offset reached is kept between runs
+        interval: Seconds between reports while following the log; one report when None
+        iterations: Number of reports after which following stops; unbounded when None
+        relative_accuracy: Relative error of the reported quantiles
+        sketch: Whether to add the sketch of every operation, to merge reports downstream
+        log_id: Log identifier
+    """
+    tail = Tail.open(path, state_dir, "mongod-latency")
+    reports = 0
+    while True:
+        started = time.monotonic()
+        latency = Latency(relative_accuracy)
+        error: Optional[str] = None
+        try:
+            for chunk in tail.chunks():
+                latency.feed(chunk)
+        except OSError as e:
+            error = f"{path}: {e.strerror or e}"
+
+        metadata = tools.metadata(location=location, environment=environment, function=function, log_id=log_id)
+        if error is not None:
+            output.write({"logs": {"path": path, "error": error}, **metadata}, flush=True)
+            if interval is None:
+                abort(path)
+        else:
+            data = {
+                "logs": {
+                    "path": path,
+                    **latency.to_dict(sketch=sketch),
+                    "bytes": tail.bytes,
+                    "rotated": tail.rotated,
+                    "truncated": tail.truncated,
+                    "error": None,
+                },
+                **metadata,
+            }
+            output.write(data, flush=True)
+            try:
+                tail.save()
+            except OSError as e:
+                warn(f"Unable to store log offset: {e}")
+
+        reports += 1
+        if interval is None or (iterations is not None and reports >= iterations):
+            return
+        time.sleep(max(0.0, started + interval - time.monotonic()))
+        tail.advance()
@@ -0,0 +1,253 @@
+"""OpenMetrics endpoint serving the latest results of ntp and filesystem checks, each run at most once per TTL."""
+
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import typer
+from pokerops.monitoring import output, tools
+from pokerops.monitoring.serve import Job, load, warn
+from pokerops.monitoring.serve import run as run_check
+
+app = typer.Typer(help="OpenMetrics endpoint for check results")
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Metric family -> (type, unit, help), in the order they are exposed
+FAMILIES: Dict[str, Tuple[str, str, str]] = {
+    "ntp_peer_offset_seconds": ("gauge", "seconds", "Absolute consensus offset of the local clock from the NTP peers"),
+    "filesystem_files": ("gauge", "", "Files matching a filesystem check"),
+    "filesystem_bytes": ("gauge", "bytes", "Total size of the files matching a filesystem check"),
+    "monitor_check_success": ("gauge", "", "Whether the last run of a check succeeded"),
+    "monitor_check_duration_seconds": ("gauge", "seconds", "Wall time of the last run of a check"),
+    "monitor_check_timestamp_seconds": ("gauge", "seconds", "Unix time the last run of a check finished"),
+}
+
+# (labels, value) samples of one family
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class Result(NamedTuple):
+    """The samples of a finished run and when it finished, on the monotonic clock"""
+
+    samples: Dict[str, Samples]
+    finished: float
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def line(name: str, labels: Dict[str, str], value: float) -> str:
+    rendered = ",".join(f'{key}="{escape(label)}"' for key, label in labels.items())
+    return f"{name}{{{rendered}}} {float(value)!r}\n"
+
+
+def samples(job: Job, data: Optional[Dict[str, Any]], duration: float, finished: float) -> Dict[str, Samples]:
+    """Samples of a check's document, as its command would print it, or of a run that raised when data is None"""
+    labels = {"check": job.id}
+    found: Dict[str, Samples] = {}
+    success = False
+    if data is not None and job.check == "ntp":
+        success = data.get("error") is None
+        if data.get("ntp_peer_offset") is not None:
+            found["ntp_peer_offset_seconds"] = [(labels, data["ntp_peer_offset"])]
+    elif data is not None:
+        filesystem = data.get("filesystem", {})
+        success = filesystem.get("error") is None
+        if success:
+            path = {**labels, "path": str(filesystem.get("path", ""))}
+            found["filesystem_files"] = [(path, filesystem["count"])]
+            found["filesystem_bytes"] = [(path, sum(f["size"] for f in filesystem["files"]))]
+    found["monitor_check_success"] = [(labels, 1 if success else 0)]
+    found["monitor_check_duration_seconds"] = [(labels, duration)]
+    found["monitor_check_timestamp_seconds"] = [(labels, finished)]
+    return found
+
+
+class Checks:
+    """Latest results of checks, refreshed at most once per TTL and never waited for
+
+    A check runs when it is first due, at start, and again on the first
+    scrape after its result is older than its TTL, the interval of its job.
+    Scrapes are always served from the results at hand: a check without a
+    result yet is left out, and an expired one is served while its next run
+    is in flight. At most one run of each check is in flight, however many
+    scrapes arrive, on a pool of `workers` threads.
+    """
+
+    def __init__(
+        self,
+        jobs: List[Job],
+        run: Callable[[Job], Dict[str, Any]],
+        workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.jobs = jobs
+        self.run = run
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.results: Dict[str, Result] = {}
+        self.inflight: Dict[str, bool] = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def refresh(self) -> None:
+        """Start a run of every check whose result is missing or older than its TTL, unless one is in flight"""
+        now = self.clock()
+        with self.lock:
+            due = [
+                job
+                for job in self.jobs
+                if not self.inflight.get(job.id) and (job.id not in self.results or now - self.results[job.id].finished >= job.interval)
+            ]
+            for job in due:
+                self.inflight[job.id] = True
+        for job in due:
+            self.pool.submit(self.execute, job)
+
+    def execute(self, job: Job) -> None:
+        start = self.clock()
+        data: Optional[Dict[str, Any]] = None
+        try:
+            data = self.run(job)
+        except Exception as e:
+            warn(f"Check {job.id} failed: {type(e).__name__}: {e}")
+        finished = self.clock()
+        result = Result(samples(job, data, finished - start, time.time()), finished)
+        with self.lock:
+            self.results[job.id] = result
+            self.inflight[job.id] = False
+
+    def render(self) -> str:
+        """The exposition of the latest results, grouped by family as OpenMetrics requires"""
+        with self.lock:
+            results = [self.results[job.id] for job in self.jobs if job.id in self.results]
+        lines: List[str] = []
+        for name, (kind, unit, description) in FAMILIES.items():
+            family = [sample for result in results for sample in result.samples.get(name, ())]
+            if not family:
+                continue
+            lines.append(f"# TYPE {name} {kind}\n")
+            if unit:
+                lines.append(f"# UNIT {name} {unit}\n")
+            lines.append(f"# HELP {name} {description}\n")
+            lines.extend(line(name, labels, value) for labels, value in family)
+        lines.append("# EOF\n")
+        return "".join(lines)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """GET /metrics renders the cached results and starts the runs they are due for"""
+
+    checks: Checks
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.checks.render().encode()
+        self.checks.refresh()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def server(checks: Checks, address: str = "127.0.0.1", port: int = 9101) -> ThreadingHTTPServer:
+    """An HTTP server exposing checks on /metrics; port 0 picks a free one"""
+    handler = type("BoundHandler", (Handler,), {"checks": checks})
+    httpd = ThreadingHTTPServer((address, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def metrics_server(
+    schedule_path: str,
+    location: str,
+    environment: str,
+    function: str,
+    address: str = "127.0.0.1",
+    port: int = 9101,
+    workers: int = 4,
+) -> None:
+    """Serve the results of the checks of a schedule on /metrics in the OpenMetrics text format.
+
+    The schedule is the one `monitor serve` takes; the interval of each check
+    is its TTL. Every check runs once at start, then at most once per TTL,
+    when a scrape finds its result expired. Scrapes only render the cached
+    results, so they take milliseconds however long the checks take. The
+    process exits on SIGTERM or SIGINT.
+
+    Args:
+        schedule_path: Path to the JSON schedule file
+        location: Default location identifier
+        environment: Default environment name
+        function: Default function identifier
+        address: Address to listen on
+        port: Port to listen on
+        workers: Maximum number of checks running concurrently
+    """
+    try:
+        jobs = load(schedule_path)
+    except (OSError, ValueError) as e:
+        data = {
+            "serve": {"path": schedule_path, "error": f"Invalid schedule: {e}"},
+            **tools.metadata(location=location, environment=environment, function=function, log_id="monitor-metrics-server"),
+        }
+        output.write(data)
+        warn(f"Invalid schedule: {schedule_path}")
+        raise typer.Exit(code=1) from None
+
+    checks = Checks(jobs, run=lambda job: run_check(job, location, environment, function), workers=workers)
+    try:
+        httpd = server(checks, address, port)
+    except OSError as e:
+        checks.close()
+        warn(f"Unable to listen on {address}:{port}: {e}")
+        raise typer.Exit(code=1) from None
+
+    def stop(*_: Any) -> None:
+        # shutdown() waits for serve_forever(), which runs in this thread
+        threading.Thread(target=httpd.shutdown).start()
+
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    checks.refresh()
+    try:
+        httpd.serve_forever()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        httpd.server_close()
+        checks.close()
+
+
+@app.command("metrics-server")
+def metrics_server_cmd(
+    schedule_path: str = typer.Argument(help="JSON file listing the checks to expose, as for serve; intervals are TTLs"),
+    address: str = typer.Option("127.0.0.1", help="Address to listen on"),  # pyright: ignore[reportCallInDefaultInitializer]
+    port: int = typer.Option(9101, min=0, max=65535, help="Port to listen on"),  # pyright: ignore[reportCallInDefaultInitializer]
+    workers: int = typer.Option(4, min=1, help="Maximum checks running concurrently"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    """Serve ntp and filesystem check results as OpenMetrics, each check run at most once per TTL."""
+    return metrics_server(
+        schedule_path=schedule_path,
+        location=location,
+        environment=environment,
+        function=function,
+        address=address,
+        port=port,
+        workers=workers,
+    )
@@ -0,0 +1,165 @@
+"""Mount table parsing and out-of-process probes isolating hung mounts from scans."""
+
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+MOUNTINFO = "/proc/self/mountinfo"
+
+# Filesystem types whose operations can block indefinitely on a lost server; FUSE types are matched by prefix
+REMOTE = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "ceph", "glusterfs", "9p", "afs", "lustre", "gpfs", "davfs", "ncpfs", "coda", "ocfs2", "gfs2"}
+
+# Run in a child interpreter: stat the path and read its first entry, the calls a hung mount blocks
+PROBE = "import os, sys\nos.stat(sys.argv[1])\nwith os.scandir(sys.argv[1]) as it:\n    next(it, None)\n"
+# Seconds a killed probe is given to exit before it is left to be reaped later
+GRACE = 0.1
+
+_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+class Mount(NamedTuple):
+    """One line of /proc/self/mountinfo"""
+
+    mountpoint: str
+    source: str
+    fstype: str
+
+    @property
+    def remote(self) -> bool:
+        return self.fstype in REMOTE or self.fstype.startswith("fuse")
+
+
+class Unresponsive(NamedTuple):
+    """A mount whose probe, or a directory whose read, did not finish within the deadline"""
+
+    path: str
+    source: str
+    fstype: str
+    elapsed: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def unescape(field: str) -> str:
+    """Decode the octal escapes mountinfo uses for spaces, tabs, newlines and backslashes"""
+    return _ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse(line: str) -> Mount:
+    """Parse a mountinfo line; raises ValueError on malformed lines"""
+    fields = line.split()
+    separator = fields.index("-", 6)
+    return Mount(unescape(fields[4]), unescape(fields[separator + 2]), unescape(fields[separator + 1]))
+
+
+def table(path: str = MOUNTINFO) -> List[Mount]:
+    """The mounts of this process, in mount order; empty where mountinfo is unavailable"""
+    try:
+        with open(path, encoding="utf-8", errors="surrogateescape") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    mounts = []
+    for line in lines:
+        try:
+            mounts.append(parse(line))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def containing(path: str, mounts: List[Mount]) -> Optional[Mount]:
+    """The mount a path resolves into: the last mounted of those whose mountpoint is a prefix of it"""
+    found = None
+    for mount in mounts:
+        if path == mount.mountpoint or path.startswith(mount.mountpoint.rstrip("/") + "/"):
+            found = mount
+    return found
+
+
+def run(script: str, paths: List[str], timeout: float) -> Tuple[Dict[str, str], Dict[str, float]]:
+    """Run a script on every path concurrently in child processes, against one deadline
+
+    Returns the standard output of each child that finished, and the elapsed
+    time of each that did not. Children still running at the deadline are
+    killed. One stuck in an uninterruptible call cannot exit until the call
+    returns; it is not waited for and is reaped by a later subprocess call
+    or, once this process exits, by init.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    children = {
+        path: subprocess.Popen(
+            [sys.executable, "-I", "-S", "-c", script, path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        for path in paths
+    }
+    outputs: Dict[str, str] = {}
+    hung: Dict[str, float] = {}
+    for path, process in children.items():
+        try:
+            outputs[path] = process.communicate(timeout=max(0.0, deadline - time.monotonic()))[0]
+        except subprocess.TimeoutExpired:
+            hung[path] = time.monotonic() - start
+            process.kill()
+    for path in hung:
+        try:
+            children[path].communicate(timeout=GRACE)
+        except subprocess.TimeoutExpired:
+            pass
+    return outputs, hung
+
+
+def probe(paths: List[str], timeout: float) -> Dict[str, float]:
+    """Probe paths concurrently in child processes, returning the elapsed time of each that timed out"""
+    return run(PROBE, paths, timeout)[1]
+
+
+class Isolation:
+    """Finds the mounts under a scan root that do not respond, so the walk can skip them
+
+    Remote and FUSE mounts at or below the root, and the one holding the root
+    itself, are probed out of process with a per-mount deadline before the
+    walk. Local mounts are not probed; the walk reads directories under the
+    same deadline and reports those that stall through `stalled`.
+    `unresponsive` collects what was skipped.
+    """
+
+    def __init__(self, timeout: float, mountinfo: str = MOUNTINFO):
+        self.timeout = timeout
+        self.mountinfo = mountinfo
+        self.unresponsive: List[Unresponsive] = []
+
+    def check(self, root: str) -> Set[str]:
+        """Probe the remote mounts a walk of root would enter, returning the paths to skip"""
+        mounts = table(self.mountinfo)
+        candidates: Dict[str, Mount] = {}
+        top = containing(root, mounts)
+        if top is not None and top.remote:
+            candidates[root] = top
+        prefix = root.rstrip("/") + "/"
+        for mount in mounts:
+            if mount.remote and mount.mountpoint.startswith(prefix):
+                candidates[mount.mountpoint] = mount
+        if not candidates:
+            return set()
+        hung = probe(list(candidates), self.timeout)
+        for path, elapsed in hung.items():
+            mount = candidates[path]
+            self.unresponsive.append(Unresponsive(path, mount.source, mount.fstype, elapsed))
+        return set(hung)
+
+    def stalled(self, path: str, elapsed: float) -> None:
+        """Record a directory the walk gave up reading, with the mount holding it"""
+        mount = containing(path, table(self.mountinfo))
+        self.unresponsive.append(Unresponsive(path, mount.source if mount else "", mount.fstype if mount else "", elapsed))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [mount.to_dict() for mount in self.unresponsive]
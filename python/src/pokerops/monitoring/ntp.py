@@ -1,45 +1,214 @@
 import datetime
-import json
+from typing import Any, Dict, List, NoReturn, Optional, Tuple
 
-import ntplib
 import pokerops.monitoring.tools as tools
 import typer
+from pokerops.monitoring import output, perf, sntp, timex
 
 app = typer.Typer(help="NTP monitoring commands")
 
+PEERS = ["time.cloudflare.com"]
+
 
 @app.command("drift")
 def ntp_drift_cmd(
-    peer: str = typer.Option("time.cloudflare.com", help="NTP peer address"),  # pyright: ignore[reportCallInDefaultInitializer]
+    peer: List[str] = typer.Option(PEERS, help="NTP peer address, as host or host:port; repeat to query several peers"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    timeout: float = typer.Option(5.0, min=0.0, help="Seconds to wait for all peers to reply"),  # pyright: ignore[reportCallInDefaultInitializer]
+    samples: int = typer.Option(1, min=1, help="Requests sent to each peer in one burst; the minimum-delay reply is kept"),  # pyright: ignore[reportCallInDefaultInitializer]
+    stats: bool = typer.Option(False, help="Add the cost of the check and per-peer round-trip times to the output as monitor.perf"),  # pyright: ignore[reportCallInDefaultInitializer]
     location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
     environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
     function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
     log_id: str = typer.Option("ntp-drift", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
 ) -> None:
-    return ntp_drift(peer, location, environment, function, log_id)
+    return ntp_drift(peer, location, environment, function, log_id, timeout=timeout, samples=samples, stats=stats)
+
+
+@app.command("kernel")
+def ntp_kernel_cmd(
+    peer: Optional[List[str]] = typer.Option(None, help="NTP peer queried as with drift, only when the kernel clock is unsynchronized; repeatable"),  # noqa: B008  # pyright: ignore[reportCallInDefaultInitializer]
+    timeout: float = typer.Option(5.0, min=0.0, help="Seconds to wait for fallback peers to reply"),  # pyright: ignore[reportCallInDefaultInitializer]
+    samples: int = typer.Option(1, min=1, help="Requests sent to each fallback peer in one burst"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    log_id: str = typer.Option("ntp-kernel", help="Log identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    return ntp_kernel(location, environment, function, log_id, peer=peer or [], timeout=timeout, samples=samples)
 
 
 def ntp_drift(
-    peer: str,
+    peer: List[str],
     location: str,
     environment: str,
     function: str,
     log_id: str = "ntp-drift",
+    timeout: float = 5.0,
+    samples: int = 1,
+    stats: bool = False,
 ) -> None:
-    client = ntplib.NTPClient()
-    reply = client.request("time.cloudflare.com")  # pyright: ignore[reportUnknownMemberType]
-    drift = {
-        "ntp_peer_address": peer,
-        "ntp_peer_offset": abs(reply.offset),
+    """Query NTP peers concurrently and report their consensus offset.
+
+    Args:
+        peer: NTP peer addresses, as host, host:port or [ipv6]:port
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        log_id: Log identifier
+        timeout: Seconds to wait for all peers to reply
+        samples: Number of pipelined requests sent to each peer
+        stats: Whether to add wall and CPU time, peak RSS, output size and per-peer round-trip times as monitor.perf
+    """
+    run = perf.Stats() if stats else None
+    error, data = drift(peer, location, environment, function, log_id, timeout=timeout, samples=samples, stats=run)
+
+    output.write(data, trailer=None if run is None else run.monitor)
+
+    if error is not None:
+        abort(", ".join(peer))
+
+
+def drift(
+    peers: List[str],
+    location: str,
+    environment: str,
+    function: str,
+    log_id: str = "ntp-drift",
+    timeout: float = 5.0,
+    samples: int = 1,
+    stats: Optional[perf.Stats] = None,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Build the ntp_drift() document without printing it
+
+    The reported ntp_peer_offset is the absolute consensus offset selected
+    from every reachable peer, and ntp_peer_address the surviving peer with
+    the smallest root distance. With several samples, each peer is reduced
+    to its minimum-delay reply before selection, and its jitter and
+    dispersion widen the interval it is selected on.
+
+    Returns:
+        Tuple of (error, document), where error is None when a consensus was reached.
+        Per-peer round-trip times are added to stats when given.
+    """
+    results = sntp.query_all(peers, timeout, samples=samples)
+    if stats is not None:
+        stats.add(
+            peers=[{"address": result.address, "delay": None if result.reply is None else result.reply.delay, "elapsed": result.elapsed} for result in results]
+        )
+    reachable = [(result, result.reply) for result in results if result.reply is not None]
+    consensus = sntp.select([reply for _, reply in reachable])
+
+    error: Optional[str] = None
+    system: Optional[Tuple[sntp.PeerResult, sntp.Reply]] = None
+    if not reachable:
+        error = "No NTP peer replied: " + "; ".join(str(result.error) for result in results)
+    elif consensus is None:
+        error = f"No majority of the {len(reachable)} reachable NTP peers agree on an offset"
+    else:
+        system = min((reachable[index] for index in consensus.survivors), key=lambda pair: pair[1].distance)
+
+    offset = {
+        "ntp_peer_address": None if system is None else system[0].address,
+        "ntp_peer_offset": None if consensus is None else abs(consensus.offset),
+        "ntp_consensus": None
+        if consensus is None
+        else {
+            "offset": consensus.offset,
+            "low": consensus.low,
+            "high": consensus.high,
+            "survivors": [reachable[index][0].address for index in consensus.survivors],
+        },
+        "ntp_peers": [result.to_dict() for result in results],
     }
-    data = {
-        **drift,
-        **tools.metadata(
-            timestamp=datetime.datetime.fromtimestamp(reply.tx_time, datetime.timezone.utc),
-            location=location,
-            environment=environment,
-            function=function,
-            log_id=log_id,
-        ),
+    timestamp = None if system is None else datetime.datetime.fromtimestamp(system[1].tx_time, datetime.timezone.utc)
+    return (
+        error,
+        {
+            **offset,
+            **({} if error is None else {"error": error}),
+            **tools.metadata(
+                timestamp=timestamp,
+                location=location,
+                environment=environment,
+                function=function,
+                log_id=log_id,
+            ),
+        },
+    )
+
+
+def ntp_kernel(
+    location: str,
+    environment: str,
+    function: str,
+    log_id: str = "ntp-kernel",
+    peer: Optional[List[str]] = None,
+    timeout: float = 5.0,
+    samples: int = 1,
+) -> None:
+    """Report the kernel clock discipline status read with adjtimex(2).
+
+    Args:
+        location: Location identifier
+        environment: Environment name
+        function: Function identifier
+        log_id: Log identifier
+        peer: NTP peers queried as with ntp_drift() only when the kernel clock is unsynchronized
+        timeout: Seconds to wait for fallback peers to reply
+        samples: Number of pipelined requests sent to each fallback peer
+    """
+    error, data = kernel(location, environment, function, log_id, peers=peer, timeout=timeout, samples=samples)
+
+    output.write(data)
+
+    if error is not None:
+        abort(str(data["error"]), "NTP kernel status")
+
+
+def kernel(
+    location: str,
+    environment: str,
+    function: str,
+    log_id: str = "ntp-kernel",
+    peers: Optional[List[str]] = None,
+    timeout: float = 5.0,
+    samples: int = 1,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Build the ntp_kernel() document without printing it
+
+    ntp_peer_offset holds the absolute offset last applied by the local NTP
+    daemon, read without any network I/O. When the kernel reports the clock
+    unsynchronized that offset is meaningless: with peers given, they are
+    queried as drift() does and its fields fill the document, otherwise
+    ntp_peer_offset is null and the status alone is reported.
+
+    Returns:
+        Tuple of (error, document), where error is None when the status could be read
+    """
+    metadata = tools.metadata(location=location, environment=environment, function=function, log_id=log_id)
+    try:
+        state, status = timex.read()
+    except OSError as e:
+        return (f"adjtimex: {e}", {"ntp_kernel": None, "error": f"adjtimex: {e}", **metadata})
+
+    data = timex.to_dict(state, status)
+    document: Dict[str, Any] = {
+        "ntp_peer_address": None,
+        "ntp_peer_offset": abs(data["offset"]) if data["synchronized"] else None,
+        "ntp_kernel": data,
+        **metadata,
     }
-    print(json.dumps(data))
+    if data["synchronized"] or not peers:
+        return (None, document)
+
+    error, fallback = drift(peers, location, environment, function, log_id, timeout=timeout, samples=samples)
+    return (error, {**fallback, "ntp_kernel": data})
+
+
+def abort(peers: str, subject: str = "NTP drift from peers") -> NoReturn:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(f"Unable to determine {subject}: {peers}")
+
+    raise typer.Exit(code=1)
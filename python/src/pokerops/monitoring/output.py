@@ -0,0 +1,116 @@
+"""Serialization of check documents as NDJSON lines on a buffered binary stdout.
+
+orjson is used when it is installed and the standard library json module
+otherwise; both produce compact JSON. The static part of the metadata
+envelope, `host` and `fields`, is built and encoded once per process for
+every distinct set of metadata values, and spliced into each document as
+bytes.
+"""
+
+import json
+import platform
+import sys
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+try:
+    import orjson  # pyright: ignore[reportMissingImports]
+except ImportError:
+    orjson = None
+
+BACKEND = "json" if orjson is None else "orjson"
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+class Envelope(NamedTuple):
+    """The `host` and `fields` objects shared by every document with the same metadata, and their encoding"""
+
+    host: Dict[str, Any]
+    fields: Dict[str, Any]
+    encoded: bytes
+
+
+_host: Optional[Dict[str, Any]] = None
+# Envelopes are kept for the life of the process, so the ids used to find them are never reused
+_envelopes: Dict[Tuple[str, str, str, str], Envelope] = {}
+_encoded: Dict[int, Envelope] = {}
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object as compact JSON with the fastest available backend"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # orjson refuses strings that are not valid UTF-8, such as
+            # undecodable file names; json escapes them instead
+            pass
+    return _encoder.encode(obj).encode()
+
+
+def envelope(location: str, environment: str, function: str, log_id: str) -> Envelope:
+    """The cached envelope for a set of metadata values; its objects must not be modified"""
+    global _host
+    key = (location, environment, function, log_id)
+    cached = _envelopes.get(key)
+    if cached is not None:
+        return cached
+    if _host is None:
+        _host = {"name": platform.node()}
+    fields: Dict[str, Any] = {"log": {"description": log_id}}
+    if location != "":
+        fields["location"] = location
+    if environment != "":
+        fields["environment"] = environment
+    if function != "":
+        fields["function"] = function
+    encoded = dumps({"host": _host, "fields": fields})[1:-1]
+    cached = _envelopes.setdefault(key, Envelope(_host, fields, encoded))
+    _encoded[id(cached.fields)] = cached
+    return cached
+
+
+def encode(document: Dict[str, Any]) -> bytes:
+    """Encode a document, splicing in the pre-encoded envelope when it carries a cached one"""
+    fields = document.get("fields")
+    cached = _encoded.get(id(fields))
+    if cached is None or cached.fields is not fields or document.get("host") is not cached.host:
+        return dumps(document)
+    body = dumps({key: value for key, value in document.items() if key != "host" and key != "fields"})
+    return body[:-1] + (b"," if len(body) > 2 else b"") + cached.encoded + b"}"
+
+
+def extend(encoded: bytes, fields: Dict[str, Any]) -> bytes:
+    """Append fields to an encoded object without re-encoding it"""
+    if not fields:
+        return encoded
+    tail = dumps(fields)
+    return encoded[:-1] + (b"," if len(encoded) > 2 else b"") + tail[1:]
+
+
+def write(document: Dict[str, Any], flush: bool = False, trailer: Optional[Callable[[int], Dict[str, Any]]] = None) -> int:
+    """Write a document as one NDJSON line to stdout, returning the number of bytes written
+
+    trailer, when given, is called with the size of the line the document
+    alone encodes to, and the fields it returns are appended to the line, so
+    they can describe it.
+
+    The line goes to the binary buffer under sys.stdout, so every document a
+    command prints must go through here to keep lines in order. It is flushed
+    when asked to, or when stdout is line buffered as on a terminal.
+    """
+    encoded = encode(document)
+    if trailer is not None:
+        encoded = extend(encoded, trailer(len(encoded) + 1))
+    line = encoded + b"\n"
+    stream = sys.stdout
+    buffer = getattr(stream, "buffer", None)
+    if buffer is None:
+        stream.write(line.decode())
+        if flush:
+            stream.flush()
+        return len(line)
+    buffer.write(line)
+    if flush or getattr(stream, "line_buffering", False):
+        buffer.flush()
+    return len(line)
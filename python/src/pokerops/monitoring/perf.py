@@ -0,0 +1,53 @@
+"""Cost of a check run, reported as the monitor.perf object with --stats."""
+
+import sys
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes, or None where getrusage is unavailable"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Stats:
+    """Counters of one check run
+
+    Wall and CPU time run from construction to monitor(). Checks add their own
+    counters with add(); output_bytes accumulates what earlier events of the
+    same run wrote. Collection costs two clock reads and one getrusage call per
+    run, so it can be left on.
+    """
+
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.output_bytes = 0
+        self.counters: Dict[str, Any] = {}
+
+    def add(self, **counters: Any) -> None:
+        """Add integer counters to their running totals; other values replace the previous one"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value if isinstance(value, int) else value
+
+    def to_dict(self, output_bytes: int = 0) -> Dict[str, Any]:
+        return {
+            "wall_seconds": time.perf_counter() - self.wall,
+            "cpu_seconds": time.process_time() - self.cpu,
+            "peak_rss_bytes": peak_rss(),
+            "output_bytes": self.output_bytes + output_bytes,
+            **self.counters,
+        }
+
+    def monitor(self, output_bytes: int) -> Dict[str, Any]:
+        """The monitor object of a document whose other fields encode to output_bytes bytes"""
+        return {"monitor": {"perf": self.to_dict(output_bytes)}}
@@ -0,0 +1,138 @@
+"""Batch filesystem checks sharing one traversal per root."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from pokerops.monitoring.walker import Predicate, Walker, message
+
+FileList = List[Tuple[str, int]]
+
+
+class Check(NamedTuple):
+    """One entry of a check plan, mirroring the options of filesystem files"""
+
+    path: str
+    name: Optional[List[str]] = None
+    mtime: Optional[str] = None
+    ctime: Optional[str] = None
+    size: Optional[str] = None
+    recursive: bool = True
+    log_id: str = "filesystem-files"
+    location: Optional[str] = None
+    environment: Optional[str] = None
+    function: Optional[str] = None
+
+
+# Check fields holding text, besides name; mtime and ctime also take a whole number of days, as find does
+TEXT = ("path", "mtime", "ctime", "size", "log_id", "location", "environment", "function")
+DAYS = ("mtime", "ctime")
+REQUIRED = ("path", "log_id")
+
+
+class Result(NamedTuple):
+    check: Check
+    errors: List[str]
+    files: Optional[FileList]
+
+
+def load(path: Union[str, Path]) -> List[Check]:
+    """Read a plan file holding a list of checks, or an object with a "checks" list
+
+    Raises ValueError for malformed plans, including unknown check keys.
+    """
+    with open(path) as f:
+        data: Any = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("checks")
+    if not isinstance(data, list):
+        raise ValueError("plan must be a list of checks or an object with a 'checks' list")
+    checks: List[Check] = []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict) or "path" not in item:
+            raise ValueError(f"check {index} must be an object with a 'path'")
+        unknown = set(item) - set(Check._fields)
+        if unknown:
+            raise ValueError(f"check {index} has unknown keys: {', '.join(sorted(unknown))}")
+        checks.append(Check(**{key: field(index, key, value) for key, value in item.items()}))
+    return checks
+
+
+def field(index: int, key: str, value: Any) -> Any:
+    """A plan value checked against the type of its Check field; raises ValueError instead of coercing it"""
+    if key == "recursive":
+        if not isinstance(value, bool):
+            raise ValueError(f"check {index} 'recursive' must be a boolean")
+        return value
+    if value is None and key not in REQUIRED:
+        return None
+    if key == "name":
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list) and all(isinstance(pattern, str) for pattern in value):
+            return value
+        raise ValueError(f"check {index} 'name' must be a string or a list of strings")
+    if key in DAYS and isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if not isinstance(value, str):
+        raise ValueError(f"check {index} '{key}' must be a string")
+    return value
+
+
+def groups(checks: List[Check]) -> Dict[str, List[int]]:
+    """Indexes of checks keyed by resolved root, in order of first appearance"""
+    grouped: Dict[str, List[int]] = {}
+    for index, check in enumerate(checks):
+        grouped.setdefault(str(Path(check.path).resolve()), []).append(index)
+    return grouped
+
+
+def run(checks: List[Check], workers: int = 1) -> List[Result]:
+    """Evaluate every check, walking each distinct root once
+
+    Each entry is tested against the predicates of every check sharing its
+    root; stat results are cached on the entry, so checks with time or size
+    filters share a single stat. Errors while walking a root are reported by
+    every check on that root, as a separate files() run would.
+    """
+    results: List[Optional[Result]] = [None] * len(checks)
+    for root, indexes in groups(checks).items():
+        now = time.time()
+        predicates: List[Tuple[int, Predicate]] = []
+        for index in indexes:
+            check = checks[index]
+            try:
+                predicates.append((index, Predicate(type="f", name=check.name, mtime=check.mtime, ctime=check.ctime, size=check.size, now=now)))
+            except ValueError as e:
+                results[index] = Result(check, [f"find: {e}"], None)
+        if not predicates:
+            continue
+
+        recursive = any(checks[index].recursive for index, _ in predicates)
+        shallow = not all(checks[index].recursive for index, _ in predicates)
+        base = root.rstrip(os.sep).count(os.sep)
+        walker = Walker(root, maxdepth=None if recursive else 1, workers=workers)
+        found: Dict[int, FileList] = {index: [] for index, _ in predicates}
+
+        for entry in walker:
+            nested = shallow and entry.path.count(os.sep) - base > 1
+            size: Optional[int] = None
+            for index, predicate in predicates:
+                if nested and not checks[index].recursive:
+                    continue
+                try:
+                    if not predicate.match(entry):
+                        continue
+                    if size is None:
+                        size = entry.stat(follow_symlinks=False).st_size
+                except OSError as e:
+                    walker.errors.append(message(entry.path, e))
+                    break
+                found[index].append((entry.path, size))
+
+        for index, _ in predicates:
+            results[index] = Result(checks[index], walker.errors, None if walker.errors else found[index])
+
+    return [result for result in results if result is not None]
@@ -0,0 +1,296 @@
+"""Resident scheduler running ntp and filesystem checks on internal timers."""
+
+import hashlib
+import heapq
+import json
+import platform
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import typer
+from pokerops.monitoring import output, tools
+from pokerops.monitoring.filesystem import report
+from pokerops.monitoring.mounts import Isolation
+from pokerops.monitoring.ntp import drift
+
+app = typer.Typer(help="Resident check scheduler")
+
+METADATA = ("location", "environment", "function")
+FLAGS = ("recursive", "sort")
+COUNTS = ("workers", "samples")
+# Options taking one glob pattern or a list of them
+PATTERNS = ("name", "exclude", "exclude_dir")
+
+CHECKS = {
+    "ntp": {"peer", "timeout", "samples", "log_id", *METADATA},
+    "files": {
+        "path",
+        "name",
+        "exclude",
+        "exclude_dir",
+        "mtime",
+        "ctime",
+        "size",
+        "recursive",
+        "workers",
+        "sort",
+        "state_dir",
+        "mount_timeout",
+        "log_id",
+        *METADATA,
+    },
+}
+
+
+class Job(NamedTuple):
+    """One scheduled check; options mirror the options of the matching command"""
+
+    id: str
+    check: str
+    interval: float
+    options: Dict[str, Any]
+
+
+def load(path: str) -> List[Job]:
+    """Read a schedule holding a list of checks, or an object with a "checks" list
+
+    Raises ValueError for malformed schedules, including unknown check keys.
+    """
+    with open(path) as f:
+        data: Any = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("checks")
+    if not isinstance(data, list):
+        raise ValueError("schedule must be a list of checks or an object with a 'checks' list")
+    jobs: List[Job] = []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f"check {index} must be an object")
+        options = dict(item)
+        check = options.pop("check", None)
+        if check not in CHECKS:
+            raise ValueError(f"check {index} must set 'check' to one of: {', '.join(CHECKS)}")
+        interval = options.pop("interval", None)
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError(f"check {index} must set a positive 'interval' in seconds")
+        job_id = str(options.pop("id", f"{check}-{index}"))
+        if any(job.id == job_id for job in jobs):
+            raise ValueError(f"check {index} reuses id '{job_id}'")
+        unknown = set(options) - CHECKS[check]
+        if unknown:
+            raise ValueError(f"check {index} has unknown keys: {', '.join(sorted(unknown))}")
+        if check == "files" and "path" not in options:
+            raise ValueError(f"check {index} must set a 'path'")
+        for key, value in options.items():
+            if key in FLAGS and not isinstance(value, bool):
+                raise ValueError(f"check {index} '{key}' must be a boolean")
+            if key in COUNTS and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+                raise ValueError(f"check {index} '{key}' must be a positive integer")
+            if key in PATTERNS and not (isinstance(value, str) or (isinstance(value, list) and all(isinstance(v, str) for v in value))):
+                raise ValueError(f"check {index} '{key}' must be a string or a list of strings")
+            if key not in PATTERNS and key != "peer" and isinstance(value, (list, dict)):
+                raise ValueError(f"check {index} '{key}' must be a single value")
+        if check == "ntp":
+            peers = options.pop("peer", ["time.cloudflare.com"])
+            timeout = options.pop("timeout", 5.0)
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout < 0:
+                raise ValueError(f"check {index} 'timeout' must be a non-negative number of seconds")
+        mount_timeout = options.pop("mount_timeout", None)
+        if mount_timeout is not None and (isinstance(mount_timeout, bool) or not isinstance(mount_timeout, (int, float)) or mount_timeout < 0):
+            raise ValueError(f"check {index} 'mount_timeout' must be a non-negative number of seconds")
+        for key, value in options.items():
+            if key in PATTERNS:
+                options[key] = [value] if isinstance(value, str) else value
+            elif key not in FLAGS and key not in COUNTS and value is not None:
+                options[key] = str(value)
+        if check == "ntp":
+            options["peer"] = [str(peer) for peer in peers] if isinstance(peers, list) else [str(peers)]
+            options["timeout"] = float(timeout)
+        if mount_timeout is not None:
+            options["mount_timeout"] = float(mount_timeout)
+        jobs.append(Job(job_id, check, float(interval), options))
+    return jobs
+
+
+def splay(host: str, job: Job) -> float:
+    """Deterministic offset in [0, interval) spreading a check's runs across hosts"""
+    digest = hashlib.sha1(f"{host}/{job.id}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 * job.interval
+
+
+class Scheduler:
+    """Run jobs every interval on a bounded thread pool
+
+    A job that is still running, or still queued for a worker, when it is next
+    due skips that run instead of stacking up; its following run keeps the
+    original phase. Results are passed to emit one at a time.
+    """
+
+    def __init__(
+        self,
+        jobs: List[Job],
+        run: Callable[[Job], Dict[str, Any]],
+        emit: Callable[[Dict[str, Any]], None],
+        workers: int = 4,
+        host: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.jobs = jobs
+        self.run = run
+        self.emit = emit
+        self.workers = workers
+        self.host = host
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.running: Dict[str, Future] = {}
+        self.skipped: Dict[str, int] = {job.id: 0 for job in jobs}
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def execute(self, job: Job) -> None:
+        try:
+            data = self.run(job)
+        except Exception as e:
+            data = {"serve": {"check": job.id, "error": f"{type(e).__name__}: {e}"}}
+        with self.lock:
+            self.emit(data)
+
+    def loop(self, iterations: Optional[int] = None) -> None:
+        """Dispatch due jobs until stopped, or until iterations runs were started"""
+        start = self.clock()
+        queue: List[Tuple[float, int]] = [(start + (0.0 if self.host is None else splay(self.host, job)), index) for index, job in enumerate(self.jobs)]
+        heapq.heapify(queue)
+        dispatched = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while queue and not self.stopped.is_set() and (iterations is None or dispatched < iterations):
+                due, index = queue[0]
+                now = self.clock()
+                if due > now:
+                    self.stopped.wait(due - now)
+                    continue
+                job = self.jobs[index]
+                following = due + job.interval
+                while following <= now:
+                    following += job.interval
+                heapq.heapreplace(queue, (following, index))
+                future = self.running.get(job.id)
+                if future is not None and not future.done():
+                    self.skipped[job.id] += 1
+                    warn(f"Check {job.id} is still running, skipping this run")
+                    continue
+                self.running[job.id] = pool.submit(self.execute, job)
+                dispatched += 1
+            if self.stopped.is_set():
+                for future in self.running.values():
+                    future.cancel()
+
+
+def warn(message: str) -> None:
+    from rich.console import Console
+
+    stderr = Console(stderr=True)
+    stderr.print(message)
+
+
+def run(job: Job, location: str, environment: str, function: str) -> Dict[str, Any]:
+    """Run one check and return the document its command would print"""
+    options = dict(job.options)
+    metadata = {
+        "location": options.pop("location", location),
+        "environment": options.pop("environment", environment),
+        "function": options.pop("function", function),
+    }
+    if job.check == "ntp":
+        _, data = drift(
+            options["peer"],
+            timeout=options["timeout"],
+            samples=options.get("samples", 1),
+            log_id=options.get("log_id", "ntp-drift"),
+            **metadata,
+        )
+        return data
+    # Remote mounts under the path are probed first, so a hung one cannot hold a worker forever
+    mount_timeout = options.pop("mount_timeout", 10.0)
+    _, data = report(**options, **metadata, isolation=Isolation(mount_timeout) if mount_timeout > 0 else None)
+    return data
+
+
+def serve(
+    schedule_path: str,
+    location: str,
+    environment: str,
+    function: str,
+    workers: int = 4,
+    splay: bool = True,
+    iterations: Optional[int] = None,
+) -> None:
+    """Run the checks of a schedule on internal timers, printing each result as an NDJSON line.
+
+    The schedule holds a list of checks (or an object with a "checks" list).
+    Each check sets "check" to "ntp" or "files", an "interval" in seconds, an
+    optional unique "id", and the options of the matching command. Runs exit on
+    SIGTERM or SIGINT once in-flight checks have finished.
+
+    Args:
+        schedule_path: Path to the JSON schedule file
+        location: Default location identifier
+        environment: Default environment name
+        function: Default function identifier
+        workers: Maximum number of checks running concurrently
+        splay: Whether to offset each check's first run by a per-host delay
+        iterations: Exit after this many check runs
+    """
+    try:
+        jobs = load(schedule_path)
+    except (OSError, ValueError) as e:
+        data = {
+            "serve": {"path": schedule_path, "error": f"Invalid schedule: {e}"},
+            **tools.metadata(location=location, environment=environment, function=function, log_id="monitor-serve"),
+        }
+        output.write(data)
+        warn(f"Invalid schedule: {schedule_path}")
+        raise typer.Exit(code=1) from None
+
+    def emit(data: Dict[str, Any]) -> None:
+        output.write(data, flush=True)
+
+    scheduler = Scheduler(
+        jobs,
+        run=lambda job: run(job, location, environment, function),
+        emit=emit,
+        workers=workers,
+        host=platform.node() if splay else None,
+    )
+    previous = {signum: signal.signal(signum, lambda *_: scheduler.stop()) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        scheduler.loop(iterations=iterations)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+@app.command("serve")
+def serve_cmd(
+    schedule_path: str = typer.Argument(help="JSON file listing the checks to schedule"),
+    workers: int = typer.Option(4, min=1, help="Maximum checks running concurrently"),  # pyright: ignore[reportCallInDefaultInitializer]
+    splay: bool = typer.Option(True, help="Offset each check's first run by a per-host delay"),  # pyright: ignore[reportCallInDefaultInitializer]
+    iterations: Optional[int] = typer.Option(None, min=1, help="Exit after this many check runs"),  # pyright: ignore[reportCallInDefaultInitializer]
+    location: str = typer.Option("", help="Location identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+    environment: str = typer.Option("", help="Environment name"),  # pyright: ignore[reportCallInDefaultInitializer]
+    function: str = typer.Option("", help="Function identifier"),  # pyright: ignore[reportCallInDefaultInitializer]
+) -> None:
+    """Run ntp and filesystem checks on internal timers, as NDJSON on stdout."""
+    return serve(
+        schedule_path=schedule_path,
+        location=location,
+        environment=environment,
+        function=function,
+        workers=workers,
+        splay=splay,
+        iterations=iterations,
+    )
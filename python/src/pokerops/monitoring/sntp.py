@@ -0,0 +1,269 @@
+"""Concurrent SNTP queries over asyncio UDP and Marzullo source selection."""
+
+import asyncio
+import math
+import socket
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, cast
+
+import ntplib
+
+PORT = 123
+VERSION = 3
+MODE_CLIENT = 3
+MODE_SERVER = 4
+LEAP_UNSYNCHRONIZED = 3
+
+# Offsets of the transmit timestamp in a request and of the originate timestamp
+# echoing it in the reply; replies are matched to requests on these raw bytes
+TRANSMIT = slice(40, 48)
+ORIGINATE = slice(24, 32)
+PACKET_SIZE = 48
+
+# Clock filter constants from RFC 5905: frequency tolerance (s/s) and the
+# dispersion charged for a lost sample (s)
+PHI = 15e-6
+MAXDISP = 16.0
+# Gap between the requests of one burst, keeping their transmit timestamps distinct
+SPACING = 0.002
+
+
+class Reply(NamedTuple):
+    """Offset and delay measured from one server reply, in seconds
+
+    dispersion and jitter are set by clock_filter() for the sample chosen
+    out of a burst.
+    """
+
+    offset: float
+    delay: float
+    stratum: int
+    root_delay: float
+    root_dispersion: float
+    tx_time: float
+    precision: float = 0.0
+    dispersion: float = 0.0
+    jitter: float = 0.0
+
+    @property
+    def distance(self) -> float:
+        """Root distance: the maximum error of the offset, as used by NTP source selection"""
+        return self.delay / 2 + self.root_delay / 2 + self.root_dispersion + self.dispersion + self.jitter
+
+
+class PeerResult(NamedTuple):
+    """Outcome of querying one peer; elapsed is the wall time spent on it, name lookup included"""
+
+    address: str
+    reply: Optional[Reply]
+    error: Optional[str]
+    samples: int = 0
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        reply = self.reply
+        return {
+            "address": self.address,
+            "reachable": reply is not None,
+            "offset": None if reply is None else reply.offset,
+            "delay": None if reply is None else reply.delay,
+            "stratum": None if reply is None else reply.stratum,
+            "samples": self.samples,
+            "jitter": None if reply is None else reply.jitter,
+            "dispersion": None if reply is None else reply.dispersion,
+            "error": self.error,
+        }
+
+
+class Consensus(NamedTuple):
+    """Offset agreed on by a majority of sources, and the intersection it lies in"""
+
+    offset: float
+    low: float
+    high: float
+    survivors: List[int]
+
+
+def endpoint(peer: str) -> Tuple[str, int]:
+    """Split "host", "host:port" or "[ipv6]:port" into a host and a port"""
+    if peer.startswith("["):
+        host, _, port = peer[1:].partition("]")
+        return (host, int(port[1:]) if port.startswith(":") else PORT)
+    if peer.count(":") == 1:
+        host, port = peer.split(":")
+        return (host, int(port))
+    return (peer, PORT)
+
+
+def parse(data: bytes, destination: float) -> Reply:
+    """Decode a server reply received at the given NTP timestamp; raises NTPException for unusable replies"""
+    stats = ntplib.NTPStats()
+    stats.from_data(data)
+    # A float NTP timestamp, though ntplib's int default makes the attribute look int-typed
+    stats.dest_timestamp = destination  # pyright: ignore[reportAttributeAccessIssue]
+    if stats.mode != MODE_SERVER:
+        raise ntplib.NTPException(f"Unexpected reply mode {stats.mode}")
+    if stats.stratum == 0:
+        raise ntplib.NTPException(f"Kiss-of-death reply: {ntplib.ref_id_to_text(stats.ref_id, 0)}")
+    if stats.leap == LEAP_UNSYNCHRONIZED:
+        raise ntplib.NTPException("Server clock is unsynchronized")
+    return Reply(stats.offset, stats.delay, stats.stratum, stats.root_delay, stats.root_dispersion, stats.tx_time, 2.0**stats.precision)
+
+
+def clock_filter(samples: List[Tuple[float, Reply]], sent: int, now: float) -> Reply:
+    """Reduce one burst of (arrival time, reply) samples as the NTP clock filter does (RFC 5905, 10)
+
+    The minimum-delay sample is kept, as its offset suffered the least
+    queueing. Jitter is the RMS difference between the other offsets and it.
+    Dispersion sums the sample dispersions (precision plus PHI times age) in
+    delay order weighted by 1/2^(i+1), with every lost request counted as
+    MAXDISP.
+    """
+    ordered = sorted(samples, key=lambda sample: sample[1].delay)
+    best = ordered[0][1]
+    dispersions = [reply.precision + PHI * max(0.0, now - arrival) for arrival, reply in ordered]
+    dispersions += [MAXDISP] * max(0, sent - len(samples))
+    dispersion = sum(value / 2 ** (index + 1) for index, value in enumerate(dispersions))
+    jitter = 0.0
+    if len(ordered) > 1:
+        jitter = math.sqrt(sum((reply.offset - best.offset) ** 2 for _, reply in ordered[1:]) / (len(ordered) - 1))
+    return best._replace(dispersion=dispersion, jitter=jitter)
+
+
+class Client(asyncio.DatagramProtocol):
+    """Collects replies echoing the transmit timestamp of a request sent on this socket
+
+    `complete` is resolved once `expected` replies arrived, or with the error
+    reported by the socket.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, expected: int):
+        self.expected = expected
+        self.origins: Set[bytes] = set()
+        self.replies: List[Tuple[bytes, float, float]] = []
+        self.complete: "asyncio.Future[None]" = loop.create_future()
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        destination = ntplib.system_to_ntp_time(time.time())
+        if len(data) < PACKET_SIZE or data[ORIGINATE] not in self.origins:
+            return
+        self.origins.discard(data[ORIGINATE])
+        self.replies.append((data, destination, time.monotonic()))
+        if len(self.replies) >= self.expected and not self.complete.done():
+            self.complete.set_result(None)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.complete.done():
+            self.complete.set_exception(exc)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if not self.complete.done():
+            self.complete.set_exception(exc or ConnectionError("Connection closed"))
+
+
+async def exchange(peer: str, deadline: float, samples: int = 1) -> List[Tuple[bytes, float, float]]:
+    """Send a burst of `samples` pipelined requests over one socket
+
+    Returns the (data, NTP destination timestamp, arrival time) of every
+    matching reply received before the deadline, which may be fewer than
+    were sent.
+    """
+    loop = asyncio.get_running_loop()
+    host, port = endpoint(peer)
+    infos = await asyncio.wait_for(loop.getaddrinfo(host, port, type=socket.SOCK_DGRAM), max(0.0, deadline - loop.time()))
+    family, _, _, _, sockaddr = infos[0]
+    # An INET or INET6 address: (host, port), plus flow info and scope id for the latter
+    remote = cast(Tuple[str, int], sockaddr)
+    transport, protocol = await loop.create_datagram_endpoint(lambda: Client(loop, samples), remote_addr=remote, family=family)
+    try:
+        for index in range(samples):
+            if index:
+                await asyncio.sleep(SPACING)
+            # ntplib encodes fractional timestamps, its int defaults notwithstanding
+            request = ntplib.NTPPacket(version=VERSION, mode=MODE_CLIENT, tx_timestamp=ntplib.system_to_ntp_time(time.time())).to_data()  # pyright: ignore[reportArgumentType]
+            protocol.origins.add(request[TRANSMIT])
+            transport.sendto(request)
+        await asyncio.wait([protocol.complete], timeout=max(0.0, deadline - loop.time()))
+        error = protocol.complete.exception() if protocol.complete.done() else None
+        if error is not None and not protocol.replies:
+            raise error
+    finally:
+        if not protocol.complete.done():
+            protocol.complete.cancel()
+        transport.close()
+    return protocol.replies
+
+
+async def query(peer: str, deadline: float, samples: int = 1) -> PeerResult:
+    """Query one peer with a burst of requests, giving up at the given event loop time"""
+    start = time.monotonic()
+    try:
+        received = await exchange(peer, deadline, samples)
+    except asyncio.TimeoutError:
+        return PeerResult(peer, None, f"No response received from {peer}.", elapsed=time.monotonic() - start)
+    except (OSError, ValueError) as e:
+        return PeerResult(peer, None, str(e) or type(e).__name__, elapsed=time.monotonic() - start)
+    elapsed = time.monotonic() - start
+
+    replies: List[Tuple[float, Reply]] = []
+    error: Optional[str] = None
+    for data, destination, arrival in received:
+        try:
+            replies.append((arrival, parse(data, destination)))
+        except ntplib.NTPException as e:
+            error = str(e)
+    if not replies:
+        return PeerResult(peer, None, error or f"No response received from {peer}.", elapsed=elapsed)
+    return PeerResult(peer, clock_filter(replies, samples, time.monotonic()), error, len(replies), elapsed)
+
+
+def query_all(peers: List[str], timeout: float, samples: int = 1) -> List[PeerResult]:
+    """Query every peer concurrently, all sharing one deadline `timeout` seconds away
+
+    Results are in the order of `peers`. The event loop is closed without
+    waiting on resolver threads, so a hung DNS lookup cannot outlast the
+    deadline either.
+    """
+
+    async def gather() -> List[PeerResult]:
+        deadline = asyncio.get_running_loop().time() + timeout
+        return list(await asyncio.gather(*(query(peer, deadline, samples) for peer in peers)))
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(gather())
+    finally:
+        loop.close()
+
+
+def select(replies: List[Reply]) -> Optional[Consensus]:
+    """Marzullo's algorithm over the offset ± root distance interval of every reply
+
+    Finds the intersection shared by the largest number of intervals. A
+    consensus needs a strict majority of the replies; those whose interval
+    contains the intersection survive and are combined into an offset
+    weighted by the inverse of their root distance. Returns None without a
+    majority.
+    """
+    edges: List[Tuple[float, int]] = []
+    for reply in replies:
+        edges.append((reply.offset - reply.distance, -1))
+        edges.append((reply.offset + reply.distance, 1))
+    edges.sort()
+
+    best = count = 0
+    low = high = 0.0
+    for index, (value, kind) in enumerate(edges):
+        count -= kind
+        if count > best:
+            best = count
+            low = value
+            high = edges[index + 1][0]
+
+    if best * 2 <= len(replies):
+        return None
+
+    survivors = [index for index, reply in enumerate(replies) if reply.offset - reply.distance <= low and high <= reply.offset + reply.distance]
+    weights = {index: 1 / max(replies[index].distance, 1e-9) for index in survivors}
+    offset = sum(weight * replies[index].offset for index, weight in weights.items()) / sum(weights.values())
+    return Consensus(offset, low, high, survivors)
@@ -0,0 +1,108 @@
+"""Single-pass aggregates over filesystem scan results."""
+
+import bisect
+import heapq
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+HOUR = 3600
+DAY = 24 * HOUR
+
+SIZE_BUCKETS: Sequence[Tuple[str, float]] = (
+    ("0", 0),
+    ("1K", KB),
+    ("10K", 10 * KB),
+    ("100K", 100 * KB),
+    ("1M", MB),
+    ("10M", 10 * MB),
+    ("100M", 100 * MB),
+    ("1G", GB),
+    ("10G", 10 * GB),
+    ("inf", float("inf")),
+)
+
+AGE_BUCKETS: Sequence[Tuple[str, float]] = (
+    ("1h", HOUR),
+    ("6h", 6 * HOUR),
+    ("1d", DAY),
+    ("7d", 7 * DAY),
+    ("30d", 30 * DAY),
+    ("90d", 90 * DAY),
+    ("365d", 365 * DAY),
+    ("inf", float("inf")),
+)
+
+
+class Histogram:
+    """Fixed bucket counts keyed by inclusive upper bound"""
+
+    __slots__ = ("labels", "bounds", "counts")
+
+    def __init__(self, buckets: Sequence[Tuple[str, float]]):
+        self.labels = [label for label, _ in buckets]
+        self.bounds = [bound for _, bound in buckets]
+        self.counts = [0] * len(buckets)
+
+    def add(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        return {label: self.counts[index] for index, label in enumerate(self.labels)}
+
+
+class Summary:
+    """Count, bytes, size/age histograms and top-N largest/oldest files in O(top) memory
+
+    Ages are measured from mtime relative to the given reference time, which
+    should be the start of the scan.
+    """
+
+    def __init__(self, now: float, top: int = 10):
+        self.now = now
+        self.top = top
+        self.count = 0
+        self.bytes = 0
+        self.sizes = Histogram(SIZE_BUCKETS)
+        self.ages = Histogram(AGE_BUCKETS)
+        self._largest: List[Tuple[int, str]] = []
+        self._oldest: List[Tuple[float, str]] = []
+
+    def add(self, path: str, size: Optional[int] = None, mtime: Optional[float] = None) -> None:
+        self.count += 1
+        if size is not None:
+            self.bytes += size
+            self.sizes.add(size)
+            if self.top > 0:
+                push(self._largest, (size, path), self.top)
+        if mtime is not None:
+            self.ages.add(self.now - mtime)
+            if self.top > 0:
+                push(self._oldest, (-mtime, path), self.top)
+
+    def largest(self) -> List[Dict[str, Any]]:
+        return [{"path": path, "size": size} for size, path in sorted(self._largest, reverse=True)]
+
+    def oldest(self) -> List[Dict[str, Any]]:
+        return [{"path": path, "age": int(self.now + negated)} for negated, path in sorted(self._oldest, reverse=True)]
+
+    def to_dict(self, stat: bool = True) -> Dict[str, Any]:
+        if not stat:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "size_histogram": self.sizes.to_dict(),
+            "age_histogram": self.ages.to_dict(),
+            "largest": self.largest(),
+            "oldest": self.oldest(),
+        }
+
+
+def push(heap: List[Any], item: Any, limit: int) -> None:
+    """Keep the `limit` greatest items seen so far in a min-heap"""
+    if len(heap) < limit:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
@@ -0,0 +1,132 @@
+"""Whole lines appended to a log file since the previous run, across rotation and copytruncate."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Generator, Iterator, Optional, Tuple, Union
+
+from pokerops.monitoring import tools
+
+# (st_dev, st_ino, offset of the first unread byte, hex of the first bytes of the file)
+Position = Tuple[int, int, int, str]
+
+
+class Tail:
+    """Reads a log from where the previous run stopped
+
+    The position is kept keyed by device and inode, so a log renamed away by
+    rotation is recognized: its remainder is read from the sibling it was
+    renamed to, if still there, and the new file from its start. A log
+    truncated in place, as logrotate's copytruncate does, is noticed by its
+    size dropping below the offset or its first bytes changing, and read
+    again from its start. Only whole lines are consumed; a line still being
+    written is left for the next run.
+    """
+
+    VERSION = 1
+    CHUNK = 4 * 1024 * 1024
+    HEAD = 64
+
+    def __init__(self, path: str, state: Optional[Path] = None):
+        self.path = path
+        self.state = state
+        self.previous = self.load()
+        self.position: Optional[Position] = None
+        self.bytes = 0
+        self.rotated = False
+        self.truncated = False
+
+    @classmethod
+    def open(cls, path: str, state_dir: Optional[Union[str, Path]], name: str) -> "Tail":
+        """The tail of a log as seen by one kind of check; without state_dir, the whole log is read every run"""
+        if state_dir is None:
+            return cls(path)
+        key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+        return cls(path, Path(state_dir) / f"{name}-{key}.json")
+
+    def load(self) -> Optional[Position]:
+        if self.state is None:
+            return None
+        try:
+            data = json.loads(self.state.read_bytes())
+            if data["version"] == self.VERSION:
+                return (data["dev"], data["ino"], data["offset"], data["head"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def save(self) -> None:
+        """Store the position reached, once the lines read have been accounted for; raises OSError"""
+        if self.state is None or self.position is None:
+            return
+        dev, ino, offset, head = self.position
+        data = {"version": self.VERSION, "dev": dev, "ino": ino, "offset": offset, "head": head}
+        tools.atomic_write(self.state, json.dumps(data).encode())
+
+    def advance(self) -> None:
+        """Start the next read where the last one stopped, for a tail read repeatedly by one process"""
+        if self.position is not None:
+            self.previous = self.position
+        self.bytes = 0
+        self.rotated = False
+        self.truncated = False
+
+    def chunks(self) -> Iterator[bytes]:
+        """Chunks of whole lines appended since the previous run; raises OSError when the log cannot be read"""
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            head = os.pread(f.fileno(), self.HEAD, 0)
+            start = 0
+            if self.previous is not None:
+                dev, ino, offset, previous = self.previous
+                if (dev, ino) != (st.st_dev, st.st_ino):
+                    self.rotated = True
+                    yield from self.remainder(dev, ino, offset)
+                elif st.st_size < offset or not head.startswith(bytes.fromhex(previous)):
+                    self.truncated = True
+                else:
+                    start = offset
+            end = yield from self.read(f, start)
+            self.position = (st.st_dev, st.st_ino, end, head.hex())
+
+    def remainder(self, dev: int, ino: int, offset: int) -> Iterator[bytes]:
+        """The unread end of a rotated log, found by its inode next to the log under another name"""
+        directory, name = os.path.split(self.path)
+        try:
+            with os.scandir(directory or ".") as entries:
+                for entry in entries:
+                    if entry.name != name and entry.name.startswith(name) and entry.inode() == ino:
+                        with open(entry.path, "rb") as f:
+                            st = os.fstat(f.fileno())
+                            if (st.st_dev, st.st_ino) == (dev, ino) and st.st_size >= offset:
+                                yield from self.read(f, offset, final=True)
+                        return
+        except OSError:
+            return
+
+    def read(self, f: BinaryIO, start: int, final: bool = False) -> Generator[bytes, None, int]:
+        """Chunks of the whole lines from start, returning the offset after the last one
+
+        A final read also yields a last line without its newline, since the
+        file is no longer written to.
+        """
+        f.seek(start)
+        end = start
+        rest = b""
+        while True:
+            data = f.read(self.CHUNK)
+            if not data:
+                break
+            if rest:
+                data = rest + data
+            cut = data.rfind(b"\n") + 1
+            rest = data[cut:]
+            if cut:
+                end += cut
+                self.bytes += cut
+                yield data if cut == len(data) else data[:cut]
+        if final and rest:
+            self.bytes += len(rest)
+            yield rest + b"\n"
+        return end
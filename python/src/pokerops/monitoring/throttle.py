@@ -0,0 +1,102 @@
+"""Limits keeping filesystem scans from competing with the workload of the host."""
+
+import os
+import platform
+import threading
+import time
+from typing import Callable, List, Optional
+
+# ioprio_set(2) syscall numbers; glibc has no wrapper
+IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314, "ppc64le": 273, "s390x": 282}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+
+def io_idle() -> None:
+    """Move this thread, and the threads it starts afterwards, to the idle I/O scheduling class
+
+    Raises OSError where ioprio_set(2) is unavailable or refused.
+    """
+    import ctypes
+    import ctypes.util
+
+    number = IOPRIO_SET.get(platform.machine())
+    if number is None:
+        raise OSError(f"ioprio_set is not supported on {platform.system()} {platform.machine()}")
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if libc.syscall(number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"ioprio_set: {os.strerror(errno)}")
+
+
+def renice(level: int) -> None:
+    """Set the CPU nice level of this thread and the threads it starts afterwards; raises OSError"""
+    os.setpriority(os.PRIO_PROCESS, 0, level)
+
+
+def prioritize(idle: bool = False, nice: Optional[int] = None) -> List[str]:
+    """Apply the requested priorities, returning a message for each one that could not be set"""
+    failures: List[str] = []
+    if idle:
+        try:
+            io_idle()
+        except OSError as e:
+            failures.append(f"Unable to set idle I/O priority: {e}")
+    if nice is not None:
+        try:
+            renice(nice)
+        except (OSError, AttributeError) as e:
+            failures.append(f"Unable to set nice level {nice}: {e}")
+    return failures
+
+
+class Throttle:
+    """Rate limit on directory reads and stats, and a time budget for a whole scan
+
+    Every operation calls acquire(), which waits for a token from a bucket
+    refilled at `rate` per second and holding up to a tenth of a second of
+    tokens. Once the budget has run out, or would run out while waiting,
+    acquire() returns False and the throttle stays truncated, so the scan stops
+    with a partial result. Safe to share between walker threads.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        budget: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.rate = rate
+        self.deadline = None if budget is None else now + budget
+        self.capacity = 1.0 if rate is None else max(1.0, rate / 10)
+        self.tokens = self.capacity
+        self.last = now
+        self.truncated = False
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if self.truncated:
+            return False
+        with self.lock:
+            now = self.clock()
+            if self.deadline is not None and now >= self.deadline:
+                self.truncated = True
+                return False
+            if self.rate is None:
+                return True
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if self.deadline is not None and now + wait > self.deadline:
+                self.tokens += 1
+                self.truncated = True
+                return False
+        if wait:
+            self.sleep(wait)
+        return True
@@ -0,0 +1,144 @@
+"""Minimal ctypes binding for the Linux adjtimex(2) kernel clock status."""
+
+import ctypes
+import ctypes.util
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Clock states returned by adjtimex
+TIME_OK = 0
+TIME_INS = 1
+TIME_DEL = 2
+TIME_OOP = 3
+TIME_WAIT = 4
+TIME_ERROR = 5
+
+STATES = {
+    TIME_OK: "ok",
+    TIME_INS: "insert-leap",
+    TIME_DEL: "delete-leap",
+    TIME_OOP: "leap-in-progress",
+    TIME_WAIT: "leap-occurred",
+    TIME_ERROR: "error",
+}
+
+# Status flags
+STA_PLL = 0x0001
+STA_PPSFREQ = 0x0002
+STA_PPSTIME = 0x0004
+STA_FLL = 0x0008
+STA_INS = 0x0010
+STA_DEL = 0x0020
+STA_UNSYNC = 0x0040
+STA_FREQHOLD = 0x0080
+STA_PPSSIGNAL = 0x0100
+STA_PPSJITTER = 0x0200
+STA_PPSWANDER = 0x0400
+STA_PPSERROR = 0x0800
+STA_CLOCKERR = 0x1000
+STA_NANO = 0x2000
+STA_MODE = 0x4000
+STA_CLK = 0x8000
+
+FLAGS = {
+    STA_PLL: "PLL",
+    STA_PPSFREQ: "PPSFREQ",
+    STA_PPSTIME: "PPSTIME",
+    STA_FLL: "FLL",
+    STA_INS: "INS",
+    STA_DEL: "DEL",
+    STA_UNSYNC: "UNSYNC",
+    STA_FREQHOLD: "FREQHOLD",
+    STA_PPSSIGNAL: "PPSSIGNAL",
+    STA_PPSJITTER: "PPSJITTER",
+    STA_PPSWANDER: "PPSWANDER",
+    STA_PPSERROR: "PPSERROR",
+    STA_CLOCKERR: "CLOCKERR",
+    STA_NANO: "NANO",
+    STA_MODE: "MODE",
+    STA_CLK: "CLK",
+}
+
+# The kernel reports maxerror at this bound (16s, in microseconds) once the clock is unsynchronized
+MAXERROR_LIMIT = 16_000_000
+# freq and ppsfreq are scaled ppm with a 16 bit fraction
+FREQUENCY_SCALE = 65536.0
+
+
+class Timex(ctypes.Structure):
+    """struct timex from <sys/timex.h>"""
+
+    _fields_ = [
+        ("modes", ctypes.c_uint),
+        ("offset", ctypes.c_long),
+        ("freq", ctypes.c_long),
+        ("maxerror", ctypes.c_long),
+        ("esterror", ctypes.c_long),
+        ("status", ctypes.c_int),
+        ("constant", ctypes.c_long),
+        ("precision", ctypes.c_long),
+        ("tolerance", ctypes.c_long),
+        ("time_sec", ctypes.c_long),
+        ("time_usec", ctypes.c_long),
+        ("tick", ctypes.c_long),
+        ("ppsfreq", ctypes.c_long),
+        ("jitter", ctypes.c_long),
+        ("shift", ctypes.c_int),
+        ("stabil", ctypes.c_long),
+        ("jitcnt", ctypes.c_long),
+        ("calcnt", ctypes.c_long),
+        ("errcnt", ctypes.c_long),
+        ("stbcnt", ctypes.c_long),
+        ("tai", ctypes.c_int),
+        ("_reserved", ctypes.c_int * 11),
+    ]
+
+
+_libc: Optional[ctypes.CDLL] = None
+
+
+def libc() -> ctypes.CDLL:
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(_libc, "adjtimex") and not hasattr(_libc, "ntp_adjtime"):
+            raise OSError("adjtimex is not available on this platform")
+    return _libc
+
+
+def read() -> Tuple[int, Timex]:
+    """Read the kernel clock status without changing it; returns (state, timex)"""
+    c = libc()
+    call = c.adjtimex if hasattr(c, "adjtimex") else c.ntp_adjtime
+    timex = Timex()
+    state = call(ctypes.byref(timex))
+    if state < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return (state, timex)
+
+
+def flags(status: int) -> List[str]:
+    return [name for flag, name in FLAGS.items() if status & flag]
+
+
+def synchronized(state: int, timex: Timex) -> bool:
+    return state != TIME_ERROR and not timex.status & STA_UNSYNC and timex.maxerror < MAXERROR_LIMIT
+
+
+def to_dict(state: int, timex: Timex) -> Dict[str, Any]:
+    """Kernel clock status with times in seconds and frequencies in ppm"""
+    offset_scale = 1e-9 if timex.status & STA_NANO else 1e-6
+    return {
+        "offset": timex.offset * offset_scale,
+        "frequency": timex.freq / FREQUENCY_SCALE,
+        "maxerror": timex.maxerror * 1e-6,
+        "esterror": timex.esterror * 1e-6,
+        "jitter": timex.jitter * offset_scale,
+        "constant": timex.constant,
+        "tai": timex.tai,
+        "status": timex.status,
+        "flags": flags(timex.status),
+        "state": STATES.get(state, str(state)),
+        "synchronized": synchronized(state, timex),
+    }
@@ -1,7 +1,11 @@
 import datetime
-import platform
+import os
+import tempfile
+from pathlib import Path
 from typing import Dict, Optional, Union
 
+from pokerops.monitoring import output
+
 Field = Dict[str, str]
 Fields = Dict[str, Union[str, "Fields"]]
 
@@ -13,14 +17,24 @@ def metadata(
     log_id: str,
     timestamp: Optional[datetime.datetime] = None,
 ) -> Fields:
+    """The metadata envelope of a document; `host` and `fields` are shared per process and must not be modified"""
     if timestamp is None:
         timestamp = datetime.datetime.now(datetime.timezone.utc)
-    timestamp_field: Field = {"timestamp": timestamp.isoformat()}
-    host_field: Fields = {"host": {"name": platform.node()}}
-    log_field: Fields = {"log": {"description": log_id}}
-    location_field: Field = {} if location == "" else {"location": location}
-    environment_field: Field = {} if environment == "" else {"environment": environment}
-    function_field: Field = {} if function == "" else {"function": function}
-    fields_field: Fields = {"fields": {**log_field, **location_field, **environment_field, **function_field}}
-    _metadata = {**timestamp_field, **host_field, **fields_field}
-    return _metadata
+    static = output.envelope(location, environment, function, log_id)
+    return {"timestamp": timestamp.isoformat(), "host": static.host, "fields": static.fields}
+
+
+def atomic_write(path: Union[str, Path], data: bytes) -> None:
+    """Replace a file's contents so readers only ever see the old or the new version"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,74 @@
+"""du-style disk usage per directory, rolled up from a single traversal."""
+
+import heapq
+import os
+import stat
+from typing import Any, Dict, List, Set, Tuple
+
+# Unit of st_blocks, whatever the block size of the filesystem
+BLOCK = 512
+
+
+class Usage:
+    """Allocated bytes and file counts of every directory down to a depth below the root
+
+    Each entry adds its st_blocks to its directory and every ancestor up to
+    the root, as du does, with entries deeper than `depth` rolled up into
+    their ancestor at that depth. Memory is bounded by the directories within
+    `depth`. Files with more than one link are counted once per (device,
+    inode); only the inodes of such files are remembered.
+    """
+
+    def __init__(self, root: str, depth: int = 1):
+        self.root = root
+        self.depth = depth
+        self.prefix = root if root.endswith(os.sep) else root + os.sep
+        # Relative directory path -> [bytes, files]
+        self.totals: Dict[str, List[int]] = {}
+        self.linked: Set[Tuple[int, int]] = set()
+        self.directories = 0
+        self.hardlinks = 0
+
+    def add(self, path: str, st: os.stat_result) -> None:
+        directory = stat.S_ISDIR(st.st_mode)
+        if not directory and st.st_nlink > 1:
+            inode = (st.st_dev, st.st_ino)
+            if inode in self.linked:
+                self.hardlinks += 1
+                return
+            self.linked.add(inode)
+        relative = path[len(self.prefix) :] if path.startswith(self.prefix) else ""
+        parts = relative.split(os.sep, self.depth) if relative else []
+        # A file counts toward its parent directories, a directory toward itself as well
+        levels = max(0, min(len(parts) if directory else len(parts) - 1, self.depth))
+        allocated = st.st_blocks * BLOCK
+        files = 0 if directory else 1
+        if directory:
+            self.directories += 1
+        for level in range(levels + 1):
+            key = os.sep.join(parts[:level])
+            total = self.totals.get(key)
+            if total is None:
+                self.totals[key] = [allocated, files]
+            else:
+                total[0] += allocated
+                total[1] += files
+
+    def path(self, key: str) -> str:
+        return self.prefix + key if key else self.root
+
+    def heaviest(self, top: int) -> List[Dict[str, Any]]:
+        """The `top` directories below the root holding the most allocated bytes"""
+        below = ((total[0], key) for key, total in self.totals.items() if key)
+        return [{"path": self.path(key), "bytes": allocated, "files": self.totals[key][1]} for allocated, key in heapq.nlargest(top, below)]
+
+    def to_dict(self, top: int = 10) -> Dict[str, Any]:
+        allocated, files = self.totals.get("", [0, 0])
+        return {
+            "depth": self.depth,
+            "bytes": allocated,
+            "files": files,
+            "directories": self.directories,
+            "hardlinks": self.hardlinks,
+            "top": self.heaviest(top),
+        }
@@ -0,0 +1,672 @@
+"""Native directory walker implementing the find(1) subset used by filesystem checks."""
+
+import fnmatch
+import hashlib
+import heapq
+import json
+import os
+import queue
+import re
+import stat
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Generator, Generic, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from pokerops.monitoring import tools
+from pokerops.monitoring.throttle import Throttle
+
+DAY = 86400
+
+SIZE_UNITS = {"b": 512, "c": 1, "w": 2, "k": 1024, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+TYPES = ("f", "d", "l")
+
+Comparison = Tuple[int, int]
+
+T = TypeVar("T")
+
+
+class PathEntry:
+    """Minimal os.DirEntry look-alike for paths that were not produced by scandir."""
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path: Union[str, Path], st: Optional[os.stat_result] = None, name: Optional[str] = None):
+        self.path = str(path)
+        self.name = name or os.path.basename(self.path.rstrip(os.sep)) or self.path
+        self._stat = st
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if self._stat is None:
+            self._stat = os.lstat(self.path)
+        return self._stat
+
+    def inode(self) -> int:
+        return self.stat().st_ino
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISDIR(self.stat().st_mode)
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return stat.S_ISREG(self.stat().st_mode)
+
+    def is_symlink(self) -> bool:
+        return stat.S_ISLNK(self.stat().st_mode)
+
+
+class CachedEntry(PathEntry):
+    """Directory entry replayed from a DirectoryCache; the type is known without stat."""
+
+    __slots__ = ("kind",)
+
+    def __init__(self, path: str, name: str, kind: str):
+        super().__init__(path, name=name)
+        self.kind = kind
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self.kind == "d"
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return self.kind == "f"
+
+    def is_symlink(self) -> bool:
+        return self.kind == "l"
+
+
+Entry = Union["os.DirEntry[str]", PathEntry]
+
+# (st_dev, st_ino, st_mtime_ns, st_ctime_ns, NUL separated names, one kind character per name)
+CachedListing = Tuple[int, int, int, int, str, str]
+
+
+def kind(entry: Entry) -> str:
+    if entry.is_symlink():
+        return "l"
+    if entry.is_dir(follow_symlinks=False):
+        return "d"
+    if entry.is_file(follow_symlinks=False):
+        return "f"
+    return "o"
+
+
+class DirectoryCache:
+    """Directory listings from the previous scan of a root, validated by directory stat
+
+    A listing is replayed only while the directory's device, inode, mtime and
+    ctime are unchanged, so renames, creations and deletions inside it force a
+    fresh read. Directories modified within the timestamp granularity of the
+    scan start are not recorded, since a later change in the same tick would go
+    unnoticed. The cache is stored as zlib compressed JSON with paths relative
+    to the root and is replaced atomically.
+    """
+
+    VERSION = 1
+    GRANULARITY_NS = 1_000_000_000
+
+    def __init__(self, root: str, path: Path, previous: Optional[Dict[str, CachedListing]] = None):
+        self.root = root
+        self.path = path
+        self.previous: Dict[str, CachedListing] = previous or {}
+        self.current: Dict[str, CachedListing] = {}
+        self.started = time.time_ns()
+        self.hits = 0
+
+    @classmethod
+    def load(cls, state_dir: Union[str, Path], root: str) -> "DirectoryCache":
+        path = Path(state_dir) / f"walk-{hashlib.sha1(root.encode()).hexdigest()[:16]}.cache"
+        try:
+            data = json.loads(zlib.decompress(path.read_bytes()))
+            if data["version"] == cls.VERSION and data["root"] == root:
+                return cls(root, path, {k: tuple(v) for k, v in data["dirs"].items()})  # pyright: ignore[reportArgumentType]
+        except (OSError, ValueError, KeyError, zlib.error):
+            pass
+        return cls(root, path)
+
+    def key(self, path: str) -> str:
+        return path[len(self.root) :]
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[List[CachedEntry]]:
+        key = self.key(path)
+        cached = self.previous.get(key)
+        if cached is None or cached[:4] != (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_ctime_ns):
+            return None
+        self.current[key] = cached
+        self.hits += 1
+        if not cached[4]:
+            return []
+        prefix = path if path.endswith(os.sep) else path + os.sep
+        kinds = cached[5]
+        return [CachedEntry(prefix + name, name, kinds[index]) for index, name in enumerate(cached[4].split("\0"))]
+
+    def record(self, path: str, st: os.stat_result, entries: List["os.DirEntry[str]"]) -> None:
+        if st.st_mtime_ns >= self.started - self.GRANULARITY_NS:
+            return
+        names = "\0".join(entry.name for entry in entries)
+        self.current[self.key(path)] = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_ctime_ns, names, "".join(kind(e) for e in entries))
+
+    def save(self) -> None:
+        data = {"version": self.VERSION, "root": self.root, "dirs": self.current}
+        tools.atomic_write(self.path, zlib.compress(json.dumps(data, separators=(",", ":")).encode()))
+
+
+def comparison(option: str, value: str) -> Comparison:
+    """Parse a find numeric argument (``+n``, ``-n`` or ``n``) into (sign, n)"""
+    sign = {"+": 1, "-": -1}.get(value[:1], 0)
+    digits = value[1:] if sign else value
+    if not digits.isdigit():
+        raise ValueError(f"invalid argument `{value}' to `{option}'")
+    return (sign, int(digits))
+
+
+def compare(actual: int, expected: Comparison) -> bool:
+    sign, n = expected
+    if sign > 0:
+        return actual > n
+    if sign < 0:
+        return actual < n
+    return actual == n
+
+
+def size_comparison(value: str) -> Tuple[Comparison, int]:
+    """Parse a find -size argument into a comparison and its unit in bytes"""
+    unit = SIZE_UNITS["b"]
+    if value and not value[-1].isdigit():
+        if value[-1] not in SIZE_UNITS:
+            raise ValueError(f"invalid -size type `{value[-1]}'")
+        unit = SIZE_UNITS[value[-1]]
+        value = value[:-1]
+    return (comparison("-size", value), unit)
+
+
+Patterns = Union[str, Sequence[str], None]
+
+
+class Matcher:
+    """Glob patterns compiled into one regular expression per subject
+
+    Patterns holding a path separator match the whole path of an entry, the
+    others its name, both with the case sensitive semantics of fnmatchcase.
+    """
+
+    __slots__ = ("names", "paths")
+
+    def __init__(self, patterns: Iterable[str]):
+        patterns = list(patterns)
+        self.names = self.compile(p for p in patterns if os.sep not in p)
+        self.paths = self.compile(p for p in patterns if os.sep in p)
+
+    @staticmethod
+    def compile(patterns: Iterable[str]) -> Optional[Callable[[str], Optional["re.Match[str]"]]]:
+        expression = "|".join(fnmatch.translate(p) for p in patterns)
+        return re.compile(expression).match if expression else None
+
+    @classmethod
+    def of(cls, patterns: Patterns) -> Optional["Matcher"]:
+        """A matcher for one pattern or several, or None when there are none"""
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        patterns = [p for p in patterns or () if p]
+        return cls(patterns) if patterns else None
+
+    def match(self, entry: Entry) -> bool:
+        if self.names is not None and self.names(entry.name) is not None:
+            return True
+        return self.paths is not None and self.paths(entry.path) is not None
+
+
+class Predicate:
+    """Compiled find expression for -type, -name, -mtime, -ctime and -size
+
+    Time and size tests follow find semantics: ages are truncated to whole days
+    and sizes are rounded up to whole units before comparing. Several name
+    patterns match when any of them does; entries matching an exclude pattern
+    never match.
+    """
+
+    def __init__(
+        self,
+        type: Optional[str] = None,
+        name: Patterns = None,
+        mtime: Optional[str] = None,
+        ctime: Optional[str] = None,
+        size: Optional[str] = None,
+        now: Optional[float] = None,
+        exclude: Patterns = None,
+    ):
+        if type and type not in TYPES:
+            raise ValueError(f"Unknown argument to -type: {type}")
+        self.type = type or None
+        self.name = Matcher.of(name)
+        self.exclude = Matcher.of(exclude)
+        self.mtime = comparison("-mtime", mtime) if mtime else None
+        self.ctime = comparison("-ctime", ctime) if ctime else None
+        self.size = size_comparison(size) if size else None
+        self.now = time.time() if now is None else now
+
+    @property
+    def needs_stat(self) -> bool:
+        return self.mtime is not None or self.ctime is not None or self.size is not None
+
+    def match(self, entry: Entry) -> bool:
+        """Evaluate the expression, cheapest tests first; may raise OSError on stat"""
+        if not self.prefilter(entry):
+            return False
+        return not self.needs_stat or self.match_stat(entry.stat(follow_symlinks=False))
+
+    def prefilter(self, entry: Entry) -> bool:
+        """Evaluate the type, name and exclude tests, which need no stat"""
+        if self.type == "f" and not entry.is_file(follow_symlinks=False):
+            return False
+        if self.type == "d" and not entry.is_dir(follow_symlinks=False):
+            return False
+        if self.type == "l" and not entry.is_symlink():
+            return False
+        if self.name is not None and not self.name.match(entry):
+            return False
+        return self.exclude is None or not self.exclude.match(entry)
+
+    def match_stat(self, st: os.stat_result) -> bool:
+        """Evaluate the time and size tests against an entry's lstat result"""
+        if self.mtime is not None and not compare(int((self.now - st.st_mtime) // DAY), self.mtime):
+            return False
+        if self.ctime is not None and not compare(int((self.now - st.st_ctime) // DAY), self.ctime):
+            return False
+        if self.size is not None:
+            (expected, unit) = self.size
+            if not compare(-(-st.st_size // unit), expected):
+                return False
+        return True
+
+
+class Listing:
+    """Entries of one directory with their predicate and descend decisions."""
+
+    __slots__ = ("entries", "errors", "children", "stat_calls")
+
+    def __init__(self):
+        self.entries: List[Tuple[Entry, bool, bool]] = []
+        self.errors: List[str] = []
+        self.children: Dict[int, "Future[Listing]"] = {}
+        self.stat_calls = 0
+
+
+class Truncated(Exception):
+    """Raised inside a walk once its throttle refuses another operation"""
+
+
+def message(path: str, error: OSError) -> str:
+    return f"find: '{path}': {error.strerror or error}"
+
+
+class Stalled(Exception):
+    """Raised by Deadline.call when the call did not return in time; it is left running"""
+
+    def __init__(self, elapsed: float):
+        super().__init__(elapsed)
+        self.elapsed = elapsed
+
+
+class Task(Generic[T]):
+    """One call handed to a supervised thread"""
+
+    __slots__ = ("function", "done", "result", "error")
+
+    def __init__(self, function: Callable[[], T]):
+        self.function = function
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        try:
+            self.result = self.function()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class Deadline:
+    """Runs calls on supervised daemon threads, giving up on those that outlive the timeout
+
+    Each calling thread hands its calls to a thread of its own. A call stuck
+    in a syscall, as on a hung mount, cannot be cancelled: its thread is
+    abandoned to finish or stay blocked, and the next call gets a new one.
+    Daemon threads do not keep the process from exiting.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.queues: List["queue.SimpleQueue[Optional[Task[Any]]]"] = []
+
+    @staticmethod
+    def serve(tasks: "queue.SimpleQueue[Optional[Task[Any]]]") -> None:
+        task = tasks.get()
+        while task is not None:
+            task.run()
+            task = tasks.get()
+
+    def call(self, function: Callable[[], T]) -> T:
+        """Call function on the supervised thread; raises Stalled once the timeout passes"""
+        tasks: Optional["queue.SimpleQueue[Optional[Task[Any]]]"] = getattr(self.local, "tasks", None)
+        if tasks is None:
+            tasks = self.local.tasks = queue.SimpleQueue()
+            with self.lock:
+                self.queues.append(tasks)
+            threading.Thread(target=self.serve, args=(tasks,), daemon=True).start()
+        task = Task(function)
+        start = time.monotonic()
+        tasks.put(task)
+        if not task.done.wait(self.timeout):
+            # The thread exits once the call returns, if it ever does
+            tasks.put(None)
+            self.local.tasks = None
+            with self.lock:
+                self.queues.remove(tasks)
+            raise Stalled(time.monotonic() - start)
+        if task.error is not None:
+            raise task.error
+        return task.result  # pyright: ignore[reportReturnType]
+
+    def close(self) -> None:
+        """Stop the idle supervised threads"""
+        with self.lock:
+            queues, self.queues = self.queues, []
+        for tasks in queues:
+            tasks.put(None)
+
+
+class Walker:
+    """Pre-order scandir traversal in the same order find(1) reports entries
+
+    Each directory is read once and entry types come from d_type, so entries are
+    only statted when a predicate or the caller asks for it; the stat result is
+    cached on the entry. Errors are collected in find's stderr format instead of
+    aborting the walk.
+
+    With more than one worker, directories are read and their entries evaluated
+    on a thread pool as soon as their parent has been listed, while results are
+    still reported in serial order. At most LOOKAHEAD directories per worker
+    are read ahead of the consumer, the first ones in walk order, so memory
+    stays flat however wide the tree.
+
+    The directories listed, entries seen and entries statted are counted as
+    results are reported, in the consuming thread.
+
+    With a throttle, every directory read and stat waits for it. Once it
+    refuses one, the walk stops and `truncated` is set; what was reported
+    until then is a partial result.
+
+    Directories in `exclude` are neither read nor descended into, but are
+    still reported when they match; an excluded root yields nothing. Below
+    the root, directories matching `prune` are skipped the same way and, with
+    `one_filesystem`, so are those on another device than the root, at the
+    cost of one lstat per directory.
+
+    With a timeout, the root and every directory are read on supervised
+    threads under that deadline, statting entries included. A directory that
+    takes longer, as on a hung mount, is skipped and passed to `stalled` with
+    the seconds waited; a stalled root is reported as an error.
+    """
+
+    # Directories read ahead of the consumer per worker
+    LOOKAHEAD = 16
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        predicate: Optional[Predicate] = None,
+        maxdepth: Optional[int] = None,
+        prefetch: bool = False,
+        workers: int = 1,
+        cache: Optional[DirectoryCache] = None,
+        throttle: Optional[Throttle] = None,
+        exclude: Collection[str] = (),
+        prune: Optional[Matcher] = None,
+        one_filesystem: bool = False,
+        timeout: Optional[float] = None,
+        stalled: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.root = str(root)
+        self.predicate = predicate
+        self.maxdepth = maxdepth
+        self.prefetch = prefetch
+        self.workers = workers
+        self.cache = cache
+        self.throttle = throttle
+        self.exclude = exclude
+        self.prune = prune
+        self.one_filesystem = one_filesystem
+        self.timeout = timeout
+        self.deadline = Deadline(timeout) if timeout is not None else None
+        self.stalled = stalled
+        self.device: Optional[int] = None
+        self.truncated = False
+        self.errors: List[str] = []
+        # Whether accepted entries are statted during the walk
+        self.eager = prefetch or (predicate is not None and predicate.needs_stat)
+        self.directories = 0
+        self.entries = 0
+        self.stat_calls = 0
+
+    def acquire(self) -> None:
+        if self.throttle is not None and not self.throttle.acquire():
+            raise Truncated()
+
+    def accept(self, entry: Entry, listing: Listing) -> bool:
+        predicate = self.predicate
+        try:
+            if predicate is not None and not predicate.prefilter(entry):
+                return False
+            if self.eager:
+                self.acquire()
+                listing.stat_calls += 1
+                st = entry.stat(follow_symlinks=False)
+                if predicate is not None and predicate.needs_stat and not predicate.match_stat(st):
+                    return False
+            return True
+        except OSError as e:
+            listing.errors.append(message(entry.path, e))
+            return False
+
+    def descend(self, entry: Entry, depth: int, listing: Listing) -> bool:
+        if self.maxdepth is not None and depth >= self.maxdepth:
+            return False
+        if not entry.is_dir(follow_symlinks=False) or entry.path in self.exclude:
+            return False
+        if depth == 0:
+            return True
+        if self.prune is not None and self.prune.match(entry):
+            return False
+        if self.device is None:
+            return True
+        try:
+            self.acquire()
+            listing.stat_calls += 1
+            return entry.stat(follow_symlinks=False).st_dev == self.device
+        except OSError as e:
+            listing.errors.append(message(entry.path, e))
+            return False
+
+    def listdir(self, path: str, listing: Listing) -> Sequence[Entry]:
+        if self.cache is None:
+            self.acquire()
+            with os.scandir(path) as it:
+                return list(it)
+        self.acquire()
+        listing.stat_calls += 1
+        st = os.lstat(path)
+        cached = self.cache.lookup(path, st)
+        if cached is not None:
+            return cached
+        self.acquire()
+        with os.scandir(path) as it:
+            children = list(it)
+        self.cache.record(path, st, children)
+        return children
+
+    def read(self, path: str, depth: int) -> Listing:
+        """List a directory whose entries sit at the given depth; raises Truncated once throttled"""
+        listing = Listing()
+        try:
+            children = self.listdir(path, listing)
+        except OSError as e:
+            listing.errors.append(message(path, e))
+            return listing
+        for entry in children:
+            listing.entries.append((entry, self.accept(entry, listing), self.descend(entry, depth, listing)))
+        return listing
+
+    def fetch(self, path: str, depth: int) -> Listing:
+        """Read a directory, under the deadline if there is one; a stalled directory lists as empty"""
+        if self.deadline is None:
+            return self.read(path, depth)
+        try:
+            return self.deadline.call(lambda: self.read(path, depth))
+        except Stalled as e:
+            self.stall(path, e)
+            return Listing()
+
+    def stall(self, path: str, error: Stalled) -> None:
+        if path == self.root:
+            self.errors.append(f"find: '{path}': directory did not respond within {self.timeout} seconds")
+        if self.stalled is not None:
+            self.stalled(path, error.elapsed)
+
+    def traverse(self, first: Listing, child: Callable[[Listing, int, Entry, int], Listing]) -> Iterator[Entry]:
+        stack: List[Tuple[Listing, int, int]] = [(first, 0, 1)]
+        self.count(first)
+        while stack:
+            (listing, index, depth) = stack[-1]
+            if index == len(listing.entries):
+                stack.pop()
+                continue
+            stack[-1] = (listing, index + 1, depth)
+            (entry, accepted, descend) = listing.entries[index]
+            if accepted:
+                yield entry
+            if descend:
+                sub = child(listing, index, entry, depth)
+                self.count(sub)
+                stack.append((sub, 0, depth + 1))
+
+    def count(self, listing: Listing) -> None:
+        self.errors.extend(listing.errors)
+        self.directories += 1
+        self.entries += len(listing.entries)
+        self.stat_calls += listing.stat_calls
+
+    def serial(self, root: str) -> Iterator[Entry]:
+        yield from self.traverse(self.fetch(root, 1), lambda _, __, entry, depth: self.fetch(entry.path, depth + 1))
+
+    def parallel(self, root: str) -> Iterator[Entry]:
+        stopped: List[bool] = []
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        lock = threading.Lock()
+        # Subdirectories listed but not submitted yet; keys of child indexes sort in walk order
+        pending: List[Tuple[Tuple[int, ...], str, int, Listing, int]] = []
+        # Listings submitted and not taken by the consumer yet
+        ahead = 0
+
+        def submit() -> None:
+            """Submit the first pending directory in walk order; call with lock held"""
+            nonlocal ahead
+            key, path, depth, parent, index = heapq.heappop(pending)
+            parent.children[index] = pool.submit(read, path, depth, key)
+            ahead += 1
+
+        def fill() -> None:
+            while pending and ahead < self.workers * self.LOOKAHEAD and not stopped:
+                submit()
+
+        def read(path: str, depth: int, key: Tuple[int, ...]) -> Listing:
+            if stopped:
+                return Listing()
+            listing = self.fetch(path, depth)
+            with lock:
+                for index, (entry, _, descend) in enumerate(listing.entries):
+                    if descend:
+                        heapq.heappush(pending, (key + (index,), entry.path, depth + 1, listing, index))
+                fill()
+            return listing
+
+        def child(listing: Listing, index: int, _: Entry, __: int) -> Listing:
+            nonlocal ahead
+            with lock:
+                if index not in listing.children:
+                    # Everything before it in walk order was taken, so this directory is first in line
+                    submit()
+                future = listing.children.pop(index)
+            sub = future.result()
+            with lock:
+                ahead -= 1
+                fill()
+            return sub
+
+        try:
+            first = pool.submit(read, root, 1, ()).result()
+            yield from self.traverse(first, child)
+        finally:
+            stopped.append(True)
+            pool.shutdown(wait=True)
+
+    def __iter__(self) -> Generator[Entry, None, None]:
+        try:
+            yield from self.walk()
+        except Truncated:
+            self.truncated = True
+            return
+        finally:
+            if self.deadline is not None:
+                self.deadline.close()
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except OSError as e:
+                self.errors.append(message(str(self.cache.path), e))
+
+    def walk(self) -> Iterator[Entry]:
+        if self.root in self.exclude:
+            return
+        root = PathEntry(self.root)
+        self.entries += 1
+        self.stat_calls += 1
+        try:
+            st = root.stat() if self.deadline is None else self.deadline.call(root.stat)
+        except OSError as e:
+            self.errors.append(message(self.root, e))
+            return
+        except Stalled as e:
+            self.stall(self.root, e)
+            return
+        if self.one_filesystem:
+            self.device = st.st_dev
+        top = Listing()
+        accepted = self.accept(root, top)
+        self.errors.extend(top.errors)
+        if accepted:
+            yield root
+        if not self.descend(root, 0, top):
+            return
+        if self.workers > 1:
+            yield from self.parallel(root.path)
+        else:
+            yield from self.serial(root.path)
+
+    def stat(self, entry: Entry) -> Optional[os.stat_result]:
+        """Stat an entry reported by the walk, recording failures like find would; None once throttled"""
+        if not self.eager:
+            if self.throttle is not None and not self.throttle.acquire():
+                self.truncated = True
+                return None
+            self.stat_calls += 1
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError as e:
+            self.errors.append(message(entry.path, e))
+            return None
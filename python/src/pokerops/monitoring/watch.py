@@ -0,0 +1,266 @@
+"""Live file index kept current with inotify for filesystem watch."""
+
+import os
+import select
+import signal
+import stat
+import time
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from pokerops.monitoring import inotify
+from pokerops.monitoring.walker import PathEntry, Predicate
+
+DIRECTORY_EVENTS = (
+    inotify.IN_CREATE
+    | inotify.IN_DELETE
+    | inotify.IN_MODIFY
+    | inotify.IN_ATTRIB
+    | inotify.IN_CLOSE_WRITE
+    | inotify.IN_MOVED_FROM
+    | inotify.IN_MOVED_TO
+    | inotify.IN_DELETE_SELF
+    | inotify.IN_MOVE_SELF
+    | inotify.IN_ONLYDIR
+    | inotify.IN_DONT_FOLLOW
+    | inotify.IN_EXCL_UNLINK
+)
+
+
+class FileIndex:
+    """Regular files under a root with their size, mtime and ctime
+
+    Directory paths are interned once and referenced by id; per-file metadata
+    lives in parallel typed arrays indexed by slot, with freed slots reused.
+    Changes reported by inotify only mark (directory, name) pairs dirty; they
+    are statted once when the index is next queried, however many writes
+    happened in between. An event queue overflow triggers a full resync.
+    """
+
+    def __init__(self, root: str, recursive: bool = True, watcher: Optional[inotify.Inotify] = None):
+        self.root = root
+        self.recursive = recursive
+        self.watcher = watcher or inotify.Inotify()
+        self.errors: List[str] = []
+        self.resyncs = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.directories: List[Optional[str]] = []
+        self.directory_ids: Dict[str, int] = {}
+        self.watches: Dict[int, int] = {}
+        self.entries: Dict[int, Dict[str, int]] = {}
+        self.names: List[Optional[str]] = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.ctimes = array("d")
+        self.free: List[int] = []
+        self.dirty: Set[Tuple[int, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self.names) - len(self.free)
+
+    def build(self) -> None:
+        self.errors = []
+        self.add_directory(self.root)
+
+    def resync(self) -> None:
+        for wd in list(self.watches):
+            self.watcher.rm_watch(wd)
+        self.reset()
+        self.resyncs += 1
+        self.build()
+
+    def add_directory(self, path: str) -> None:
+        """Watch and index a directory, then its subdirectories when recursive"""
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            try:
+                wd = self.watcher.add_watch(path, DIRECTORY_EVENTS)
+            except OSError as e:
+                self.errors.append(f"watch: '{path}': {e.strerror or e}")
+                continue
+            directory = self.directory_ids.get(path)
+            if directory is None:
+                directory = len(self.directories)
+                self.directories.append(path)
+                self.directory_ids[path] = directory
+                self.entries[directory] = {}
+            self.watches[wd] = directory
+            try:
+                with os.scandir(path) as it:
+                    children = list(it)
+            except OSError as e:
+                self.errors.append(f"watch: '{path}': {e.strerror or e}")
+                continue
+            for entry in children:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive:
+                        pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        self.set(directory, entry.name, entry.stat(follow_symlinks=False))
+                    except OSError:
+                        continue
+
+    def remove_directory(self, path: str) -> None:
+        """Forget a directory and everything indexed below it"""
+        prefix = path + os.sep
+        for other, directory in list(self.directory_ids.items()):
+            if other != path and not other.startswith(prefix):
+                continue
+            for slot in self.entries.pop(directory, {}).values():
+                self.release(slot)
+            del self.directory_ids[other]
+            self.directories[directory] = None
+            for wd in [wd for wd, d in self.watches.items() if d == directory]:
+                del self.watches[wd]
+                self.watcher.rm_watch(wd)
+
+    def set(self, directory: int, name: str, st: os.stat_result) -> None:
+        slot = self.entries[directory].get(name)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+                self.names[slot] = name
+            else:
+                slot = len(self.names)
+                self.names.append(name)
+                self.sizes.append(0)
+                self.mtimes.append(0.0)
+                self.ctimes.append(0.0)
+            self.entries[directory][name] = slot
+        self.sizes[slot] = st.st_size
+        self.mtimes[slot] = st.st_mtime
+        self.ctimes[slot] = st.st_ctime
+
+    def release(self, slot: int) -> None:
+        self.names[slot] = None
+        self.free.append(slot)
+
+    def discard(self, directory: int, name: str) -> None:
+        slot = self.entries[directory].pop(name, None)
+        if slot is not None:
+            self.release(slot)
+
+    def refresh(self, directory: int, name: str) -> None:
+        path = self.directories[directory]
+        if path is None:
+            return
+        try:
+            st = os.lstat(os.path.join(path, name))
+        except OSError:
+            self.discard(directory, name)
+            return
+        if stat.S_ISREG(st.st_mode):
+            self.set(directory, name, st)
+        else:
+            self.discard(directory, name)
+
+    def handle(self, event: inotify.Event) -> None:
+        if event.mask & inotify.IN_Q_OVERFLOW:
+            self.resync()
+            return
+        directory = self.watches.get(event.wd)
+        if directory is None:
+            return
+        path = self.directories[directory]
+        if event.mask & inotify.IN_IGNORED:
+            del self.watches[event.wd]
+            return
+        if path is None:
+            return
+        if event.mask & (inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF):
+            if path == self.root:
+                self.resync()
+            else:
+                self.remove_directory(path)
+            return
+        if not event.name:
+            return
+        if event.mask & inotify.IN_ISDIR:
+            child = os.path.join(path, event.name)
+            if event.mask & (inotify.IN_CREATE | inotify.IN_MOVED_TO) and self.recursive:
+                self.add_directory(child)
+            elif event.mask & (inotify.IN_DELETE | inotify.IN_MOVED_FROM):
+                self.remove_directory(child)
+            return
+        self.dirty.add((directory, event.name))
+
+    def poll(self) -> int:
+        """Apply all queued inotify events without blocking; returns the number of events"""
+        count = 0
+        while True:
+            events = list(self.watcher.read())
+            if not events:
+                return count
+            count += len(events)
+            for event in events:
+                self.handle(event)
+
+    def flush(self) -> None:
+        dirty, self.dirty = self.dirty, set()
+        for directory, name in dirty:
+            self.refresh(directory, name)
+
+    def files(self, predicate: Optional[Predicate] = None) -> Iterator[Tuple[str, int]]:
+        """Yield (path, size) for indexed files matching the predicate"""
+        self.flush()
+        for directory, names in self.entries.items():
+            prefix = self.directories[directory]
+            if prefix is None:
+                continue
+            for name, slot in names.items():
+                path = os.path.join(prefix, name)
+                if predicate is not None:
+                    st = stat_result(self.sizes[slot], self.mtimes[slot], self.ctimes[slot])
+                    if not predicate.match(PathEntry(path, st, name=name)):
+                        continue
+                yield (path, self.sizes[slot])
+
+    def close(self) -> None:
+        self.watcher.close()
+
+
+def stat_result(size: int, mtime: float, ctime: float) -> os.stat_result:
+    """Regular file stat_result rebuilt from indexed metadata, with float timestamps"""
+    return os.stat_result((stat.S_IFREG, 0, 0, 1, 0, 0, size, 0, int(mtime), int(ctime), 0.0, mtime, ctime))
+
+
+def serve(
+    index: FileIndex,
+    emit: Callable[[], None],
+    interval: float,
+    iterations: Optional[int] = None,
+) -> None:
+    """Apply inotify events and call emit right away, then every interval seconds or on SIGUSR1"""
+    (wakeup_r, wakeup_w) = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    previous_wakeup = signal.set_wakeup_fd(wakeup_w)
+    previous_handler = signal.signal(signal.SIGUSR1, lambda *_: None)
+    poller = select.poll()
+    poller.register(index.watcher.fd, select.POLLIN)
+    poller.register(wakeup_r, select.POLLIN)
+    emitted = 0
+    deadline = time.monotonic()
+    try:
+        while iterations is None or emitted < iterations:
+            timeout = max(0.0, deadline - time.monotonic())
+            requested = False
+            for fd, _ in poller.poll(timeout * 1000):
+                if fd == wakeup_r:
+                    requested = signal.SIGUSR1 in os.read(wakeup_r, 512)
+                else:
+                    index.poll()
+            if requested or time.monotonic() >= deadline:
+                index.poll()
+                emit()
+                emitted += 1
+                deadline = time.monotonic() + interval
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
+        signal.set_wakeup_fd(previous_wakeup)
+        os.close(wakeup_r)
+        os.close(wakeup_w)
@@ -0,0 +1,86 @@
+"""Shared fixtures for the test suite."""
+
+import socket
+import threading
+import time
+
+import ntplib
+import pytest
+
+
+class NTPServer:
+    """UDP NTP server on localhost whose clock runs `offset` seconds ahead of ours.
+
+    `delays` holds, per request, seconds the reply is held back after being
+    timestamped, which skews that sample's offset by half as much; requests
+    whose index is in `drop` are ignored.
+    """
+
+    def __init__(self, offset=0.0, delay=0.0, stratum=2, leap=0, respond=True, delays=(), drop=()):
+        self.offset = offset
+        self.delay = delay
+        self.delays = list(delays)
+        self.drop = set(drop)
+        self.stratum = stratum
+        self.leap = leap
+        self.respond = respond
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.05)
+        self.address = f"127.0.0.1:{self.sock.getsockname()[1]}"
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            index = self.requests
+            self.requests += 1
+            if not self.respond or index in self.drop:
+                continue
+            received = ntplib.system_to_ntp_time(time.time() + self.offset)
+            time.sleep(self.delay)
+            reply = ntplib.NTPPacket(version=3, mode=4, tx_timestamp=ntplib.system_to_ntp_time(time.time() + self.offset))  # pyright: ignore[reportArgumentType]
+            reply.stratum = self.stratum
+            reply.leap = self.leap
+            reply.recv_timestamp = received
+            packet = bytearray(reply.to_data())
+            packet[24:32] = data[40:48]
+            held = self.delays[index] if index < len(self.delays) else 0.0
+            if held:
+                threading.Timer(held, self.send, (bytes(packet), addr)).start()
+            else:
+                self.send(bytes(packet), addr)
+
+    def send(self, packet, addr):
+        try:
+            self.sock.sendto(packet, addr)
+        except OSError:
+            pass
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.sock.close()
+
+
+@pytest.fixture
+def ntp_server():
+    """Factory starting local NTP servers that are stopped after the test."""
+    servers = []
+
+    def start(**kwargs):
+        server = NTPServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -0,0 +1,126 @@
+"""Tests for mount capacity from statvfs."""
+
+import os
+
+import pytest
+from pokerops.monitoring import capacity
+from pokerops.monitoring.capacity import Capacity, Space, select
+from pokerops.monitoring.mounts import Mount
+
+# Sleeps far longer than any test deadline, like statvfs blocked on a dead server
+HANG = "import time\ntime.sleep(60)\n"
+
+
+@pytest.fixture
+def mounted(tmp_path, monkeypatch):
+    """Mount table with a local and an NFS mount on directories of tmp_path, and proc."""
+    (tmp_path / "local").mkdir()
+    (tmp_path / "remote").mkdir()
+    table = [
+        Mount("/proc", "proc", "proc"),
+        Mount(str(tmp_path / "local"), "/dev/sda1", "ext4"),
+        Mount(str(tmp_path / "remote"), "nas:/export", "nfs4"),
+    ]
+    monkeypatch.setattr(capacity, "table", lambda path=capacity.MOUNTINFO: table)
+    return tmp_path
+
+
+class TestSpace:
+    """Test usage computed from statvfs fields."""
+
+    def test_df(self):
+        """Test that the used percentage leaves out the blocks reserved for root, as df does."""
+        space = Space(frsize=4096, blocks=1000, bfree=300, bavail=200, files=100, ffree=40, favail=40, flag=os.ST_RDONLY)
+
+        assert space.to_dict() == {
+            "bytes_total": 4096000,
+            "bytes_used": 2867200,
+            "bytes_available": 819200,
+            "bytes_used_percent": 77.78,
+            "inodes_total": 100,
+            "inodes_used": 60,
+            "inodes_available": 40,
+            "inodes_used_percent": 60.0,
+            "readonly": True,
+        }
+
+    def test_without_inodes(self):
+        """Test that filesystems without an inode count have no inode percentage."""
+        assert Space(4096, 10, 5, 5, 0, 0, 0, 0).to_dict()["inodes_used_percent"] is None
+
+    def test_parse(self):
+        """Test that the output of the child process is read back, and its errors rejected."""
+        assert Space.parse("4096 10 5 5 0 0 0 1\n").to_dict()["readonly"] is True
+        with pytest.raises(ValueError):
+            Space.parse("[Errno 13] Permission denied: '/mnt'")
+
+
+class TestSelect:
+    """Test which mounts are reported."""
+
+    TABLE = [Mount("/", "/dev/sda1", "ext4"), Mount("/var/lib", "/dev/sdb1", "xfs"), Mount("/mnt", "host:/a", "fuse.sshfs")]
+
+    def test_all(self):
+        """Test that every mount is selected without globs."""
+        assert select(self.TABLE) == self.TABLE
+
+    def test_fstype(self):
+        """Test that type globs select any of several types."""
+        assert select(self.TABLE, fstype=["xfs", "fuse.*"]) == self.TABLE[1:]
+
+    def test_mountpoint(self):
+        """Test that mount point globs match the whole mount point."""
+        assert select(self.TABLE, mountpoint="/var/*") == [self.TABLE[1]]
+        assert select(self.TABLE, mountpoint="/var") == []
+
+    def test_overmounted(self):
+        """Test that only the last mount over a mount point is reported."""
+        table = [Mount("/mnt", "host:/a", "nfs"), Mount("/", "/dev/sda1", "ext4"), Mount("/mnt", "host:/b", "nfs")]
+
+        assert select(table) == [table[1], table[2]]
+
+
+class TestCapacity:
+    """Test statvfs of the selected mounts."""
+
+    def test_measure(self, mounted):
+        """Test that local and remote mounts are reported as statvfs sees them, and empty ones left out."""
+        reported = Capacity(timeout=10.0).measure()
+
+        assert [m["path"] for m in reported] == [str(mounted / "local"), str(mounted / "remote")]
+        expected = Space.of(os.statvfs(mounted)).to_dict()
+        for mount in reported:
+            assert mount["error"] is None
+            assert (mount["bytes_total"], mount["inodes_total"]) == (expected["bytes_total"], expected["inodes_total"])
+
+    def test_include_empty(self, mounted):
+        """Test that mounts without blocks are reported when asked."""
+        reported = Capacity(timeout=10.0).measure(fstype="proc", include_empty=True)
+
+        assert [(m["path"], m["bytes_total"]) for m in reported] == [("/proc", 0)]
+
+    def test_unresponsive(self, mounted, monkeypatch):
+        """Test that a remote mount that does not answer is skipped and the others reported."""
+        monkeypatch.setattr(capacity, "STATVFS", HANG)
+        mounts = Capacity(timeout=0.1)
+
+        assert [m["path"] for m in mounts.measure()] == [str(mounted / "local")]
+        [skipped] = mounts.to_list()
+        assert (skipped["path"], skipped["source"], skipped["fstype"]) == (str(mounted / "remote"), "nas:/export", "nfs4")
+        assert skipped["elapsed"] >= 0.1
+
+    def test_error(self, mounted):
+        """Test that a mount point that cannot be statted is listed with the error."""
+        (mounted / "remote").rmdir()
+        (mounted / "local").rmdir()
+
+        reported = Capacity(timeout=10.0).measure(fstype=["ext4", "nfs4"])
+
+        assert [m["path"] for m in reported] == [str(mounted / "local"), str(mounted / "remote")]
+        assert all("No such file or directory" in m["error"] and "bytes_total" not in m for m in reported)
+
+    def test_in_process(self, mounted, monkeypatch):
+        """Test that a timeout of 0 stats remote mounts in process."""
+        monkeypatch.setattr(capacity, "run", lambda script, paths, timeout: pytest.fail("statted in a child process"))
+
+        assert len(Capacity(timeout=0).measure()) == 2
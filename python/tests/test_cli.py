@@ -1,5 +1,13 @@
 """Tests for CLI entrypoint."""
 
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pokerops.monitoring
+import pytest
 from pokerops.monitoring.cli import app
 from typer.testing import CliRunner
 
@@ -28,3 +36,51 @@ def test_ntp_command_exists():
     assert result.exit_code == 0
     assert "NTP monitoring commands" in result.stdout
     assert "drift" in result.stdout
+
+
+def test_serve_command_exists():
+    """Test that serve command is registered."""
+    result = runner.invoke(app, ["serve", "--help"])
+    assert result.exit_code == 0
+    assert "internal timers" in result.stdout
+
+
+PROBE = """
+import json
+import sys
+from unittest import mock
+
+from pokerops.monitoring import sntp
+
+reply = sntp.Reply(offset=0.1, delay=0.01, stratum=2, root_delay=0.0, root_dispersion=0.0, tx_time=0.0)
+with mock.patch.object(sntp, "query_all", return_value=[sntp.PeerResult("time.cloudflare.com", reply, None)]):
+    from pokerops.monitoring.cli import app
+
+    try:
+        app(sys.argv[1:])
+    except SystemExit:
+        pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def imported(*args):
+    """Modules loaded by a fresh interpreter running the CLI with the given arguments."""
+    source = str(Path(pokerops.monitoring.__file__).parents[2])
+    env = {**os.environ, "PYTHONPATH": source}
+    result = subprocess.run([sys.executable, "-c", PROBE, *args], env=env, capture_output=True, text=True, check=True)
+    return set(json.loads(result.stderr.splitlines()[-1]))
+
+
+@pytest.mark.parametrize(
+    "args,loaded,skipped",
+    [
+        (["--help"], [], ["pokerops.monitoring.ntp", "pokerops.monitoring.filesystem", "pokerops.monitoring.serve", "pokerops.monitoring.metrics"]),
+        (["ntp", "drift"], ["pokerops.monitoring.ntp"], ["pokerops.monitoring.filesystem", "pokerops.monitoring.serve", "rich"]),
+    ],
+)
+def test_commands_are_imported_lazily(args, loaded, skipped):
+    """Test that only the invoked command's module is imported, and rich only when needed."""
+    modules = imported(*args)
+    assert all(module in modules for module in loaded)
+    assert not any(module in modules for module in skipped)
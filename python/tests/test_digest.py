@@ -0,0 +1,152 @@
+"""Tests for file content digests and their cache."""
+
+import hashlib
+import os
+
+import pytest
+from pokerops.monitoring import digest
+from pokerops.monitoring.digest import ALGORITHM, HashCache, Hasher
+
+
+@pytest.fixture
+def blake2b(monkeypatch):
+    """Hash with the standard library backend even where xxhash is installed."""
+    monkeypatch.setattr(digest, "xxhash", None)
+    monkeypatch.setattr(digest, "ALGORITHM", "blake2b-256")
+
+
+@pytest.fixture
+def cacheable(monkeypatch):
+    """Record digests of files however recently they were modified."""
+    monkeypatch.setattr(HashCache, "GRANULARITY_NS", -(10**12))
+
+
+class TestDigest:
+    """Test digests of single files."""
+
+    def test_blake2b(self, tmp_path, blake2b):
+        """Test that digests name their algorithm and cover blocks beyond the first."""
+        content = os.urandom(digest.BLOCK + 123)
+        (tmp_path / "f").write_bytes(content)
+
+        assert digest.digest(str(tmp_path / "f")) == "blake2b-256:" + hashlib.blake2b(content, digest_size=32).hexdigest()
+
+    def test_empty(self, tmp_path, blake2b):
+        """Test that empty files have a digest."""
+        (tmp_path / "f").write_bytes(b"")
+
+        assert digest.digest(str(tmp_path / "f")) == "blake2b-256:" + hashlib.blake2b(b"", digest_size=32).hexdigest()
+
+    def test_unreadable(self, tmp_path):
+        """Test that files which cannot be read have no digest."""
+        assert digest.digest(str(tmp_path / "missing")) is None
+
+
+class TestHashCache:
+    """Test reuse of digests between runs."""
+
+    def test_reuse(self, tmp_path, cacheable):
+        """Test that unchanged files are not read again."""
+        (tmp_path / "f").write_bytes(b"one")
+        st = os.lstat(tmp_path / "f")
+        first = HashCache.load(tmp_path, "/root")
+        first.record(st, "x:1")
+        first.save()
+
+        second = HashCache.load(tmp_path, "/root")
+        assert second.lookup(st) == "x:1"
+        assert second.hits == 1
+
+    def test_changed(self, tmp_path, cacheable):
+        """Test that a change of size or timestamps invalidates a digest."""
+        (tmp_path / "f").write_bytes(b"one")
+        st = os.lstat(tmp_path / "f")
+        cache = HashCache(tmp_path / "cache", {HashCache.key(st): (st.st_size, st.st_mtime_ns, st.st_ctime_ns, "x:1")})
+        (tmp_path / "f").write_bytes(b"three")
+
+        assert cache.lookup(os.lstat(tmp_path / "f")) is None
+
+    def test_recent_not_recorded(self, tmp_path):
+        """Test that files modified just before the run are not recorded."""
+        (tmp_path / "f").write_bytes(b"one")
+        cache = HashCache(tmp_path / "cache")
+        cache.record(os.lstat(tmp_path / "f"), "x:1")
+
+        assert cache.current == {}
+
+    def test_other_algorithm(self, tmp_path, cacheable, monkeypatch):
+        """Test that a cache written with another algorithm is discarded."""
+        (tmp_path / "f").write_bytes(b"one")
+        st = os.lstat(tmp_path / "f")
+        cache = HashCache.load(tmp_path, "/root")
+        cache.record(st, "x:1")
+        cache.save()
+        monkeypatch.setattr(digest, "ALGORITHM", "other")
+
+        assert HashCache.load(tmp_path, "/root").lookup(st) is None
+
+    def test_partial_run_keeps_unreached(self, tmp_path):
+        """Test that a partial run keeps digests of files it did not reach, and a complete one drops them."""
+        cache = HashCache.load(tmp_path, "/root")
+        cache.previous = {"1:1": (1, 1, 1, "x:1")}
+        cache.save(complete=False)
+
+        partial = HashCache.load(tmp_path, "/root")
+        assert partial.previous == {"1:1": (1, 1, 1, "x:1")}
+        partial.save(complete=True)
+
+        assert HashCache.load(tmp_path, "/root").previous == {}
+
+
+class TestHasher:
+    """Test batches of digests."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        for index in range(6):
+            (tmp_path / f"f{index}").write_bytes(os.urandom(1000 + index))
+        return [(str(tmp_path / f"f{index}"), os.lstat(tmp_path / f"f{index}")) for index in range(6)]
+
+    def test_serial(self, tree):
+        """Test that every queued file is hashed and counted."""
+        hasher = Hasher()
+        for path, st in tree:
+            hasher.add(path, st)
+
+        digests = hasher.hash()
+        hasher.close()
+
+        assert digests == {path: digest.digest(path) for path, _ in tree}
+        assert hasher.counters() == {"hashed_files": 6, "hashed_bytes": sum(st.st_size for _, st in tree), "hash_cache_hits": 0}
+        assert hasher.hash() == {}
+
+    def test_pool(self, tree):
+        """Test that a process pool hashes the same as one process."""
+        hasher = Hasher(workers=2)
+        for path, st in tree:
+            hasher.add(path, st)
+
+        try:
+            digests = hasher.hash()
+        finally:
+            hasher.close()
+
+        assert digests == {path: digest.digest(path) for path, _ in tree}
+        assert hasher.pool is None
+
+    def test_cached(self, tmp_path, tree, cacheable):
+        """Test that files with a cached digest are not read."""
+        cache = HashCache(tmp_path / "cache")
+        cache.previous = {HashCache.key(st): (st.st_size, st.st_mtime_ns, st.st_ctime_ns, "x:1") for _, st in tree[:4]}
+        hasher = Hasher(cache=cache)
+        for path, st in tree:
+            hasher.add(path, st)
+
+        digests = hasher.hash()
+
+        assert [digests[path] for path, _ in tree[:4]] == ["x:1"] * 4
+        digest = digests[tree[4][0]]
+        assert digest is not None
+        assert digest.startswith(ALGORITHM + ":")
+        assert hasher.counters()["hashed_files"] == 2
+        assert hasher.counters()["hash_cache_hits"] == 4
@@ -3,12 +3,14 @@
 import json
 import os
 import subprocess
+import threading
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 import typer
-from pokerops.monitoring.filesystem import argument, files, find
+from pokerops.monitoring.filesystem import app, argument, capacity, files, find, usage
+from typer.testing import CliRunner
 
 
 @pytest.fixture
@@ -414,3 +416,551 @@ class TestFiles:
             assert "files" in output["filesystem"]
         finally:
             os.chdir(original_cwd)
+
+    def test_files_sorted_with_workers(self, temp_file_structure, capsys):
+        """Test files function with parallel traversal and sorted output."""
+        root = temp_file_structure["root"]
+
+        files(
+            path=str(root),
+            location="test",
+            environment="test",
+            function="test",
+            workers=4,
+            sort=True,
+        )
+
+        captured = capsys.readouterr()
+        output = json.loads(captured.out)
+
+        paths = [f["path"] for f in output["filesystem"]["files"]]
+        assert paths == sorted(paths)
+        assert output["filesystem"]["count"] == 5
+
+
+class TestStreamFiles:
+    """Tests for streamed files output."""
+
+    def test_stream_chunks(self, temp_file_structure, capsys):
+        """Test that matches are split into sequenced chunk events."""
+        root = temp_file_structure["root"]
+
+        files(
+            path=str(root),
+            location="test",
+            environment="test",
+            function="test",
+            stream=True,
+            chunk_size=2,
+        )
+
+        captured = capsys.readouterr()
+        events = [json.loads(line) for line in captured.out.splitlines()]
+
+        assert [e["filesystem"]["sequence"] for e in events] == [0, 1, 2, 3]
+        assert [len(e["filesystem"]["files"]) for e in events[:-1]] == [2, 2, 1]
+        assert events[-1]["filesystem"]["count"] == 5
+        assert events[-1]["filesystem"]["error"] is None
+        assert "files" not in events[-1]["filesystem"]
+        assert all(e["fields"]["log"]["description"] == "filesystem-files" for e in events)
+        assert all("host" in e and "timestamp" in e for e in events)
+
+    def test_stream_matches_single_document(self, temp_file_structure, capsys):
+        """Test that streamed files are the same as the single document files."""
+        root = temp_file_structure["root"]
+
+        files(path=str(root), location="", environment="", function="")
+        document = json.loads(capsys.readouterr().out)
+
+        files(path=str(root), location="", environment="", function="", stream=True)
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+        streamed = [f for e in events[:-1] for f in e["filesystem"]["files"]]
+        assert streamed == document["filesystem"]["files"]
+
+    def test_stream_empty_directory(self, tmp_path, capsys):
+        """Test that an empty scan only emits the summary event."""
+        files(path=str(tmp_path), location="", environment="", function="", stream=True)
+
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+        assert len(events) == 1
+        assert events[0]["filesystem"]["count"] == 0
+        assert events[0]["filesystem"]["sequence"] == 0
+
+    def test_stream_handles_errors(self, capsys):
+        """Test that scan errors are reported in the summary event."""
+        with pytest.raises(typer.Exit) as exc_info:
+            files(
+                path="/nonexistent/path/that/does/not/exist",
+                location="",
+                environment="",
+                function="",
+                stream=True,
+            )
+
+        assert exc_info.value.exit_code == 1
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert events[-1]["filesystem"]["count"] == 0
+        assert "find command failed" in events[-1]["filesystem"]["error"]
+
+    def test_stream_rejects_sort(self, tmp_path):
+        """Test that streaming cannot be combined with sorting."""
+        with pytest.raises(typer.BadParameter):
+            files(path=str(tmp_path), location="", environment="", function="", stream=True, sort=True)
+
+
+class TestSummaryFiles:
+    """Tests for summarized files output."""
+
+    def test_summary_output(self, temp_file_structure, capsys):
+        """Test that the summary reports aggregates instead of files."""
+        root = temp_file_structure["root"]
+
+        files(path=str(root), location="test", environment="test", function="test", summary=True, top=2)
+
+        output = json.loads(capsys.readouterr().out)
+
+        assert "files" not in output["filesystem"]
+        assert output["filesystem"]["count"] == 5
+        assert output["filesystem"]["bytes"] == sum(p.stat().st_size for k, p in temp_file_structure.items() if k != "root")
+        assert output["filesystem"]["largest"][0]["path"] == str(temp_file_structure["old_file"])
+        assert len(output["filesystem"]["largest"]) == 2
+        assert len(output["filesystem"]["oldest"]) == 2
+        assert sum(output["filesystem"]["size_histogram"].values()) == 5
+        assert output["fields"]["log"]["description"] == "filesystem-files"
+
+    def test_summary_count_only_skips_stat(self, temp_file_structure, capsys):
+        """Test that count-only summaries never stat entries."""
+        root = temp_file_structure["root"]
+
+        with patch("pokerops.monitoring.walker.Walker.stat", side_effect=AssertionError("stat called")):
+            files(path=str(root), location="", environment="", function="", summary=True, count_only=True)
+
+        output = json.loads(capsys.readouterr().out)
+
+        assert output["filesystem"]["count"] == 5
+        assert "bytes" not in output["filesystem"]
+
+    def test_summary_handles_errors(self, capsys):
+        """Test that summary scan errors are reported."""
+        with pytest.raises(typer.Exit):
+            files(path="/nonexistent/path/that/does/not/exist", location="", environment="", function="", summary=True)
+
+        output = json.loads(capsys.readouterr().out)
+        assert "find command failed" in output["filesystem"]["error"]
+
+
+class TestStats:
+    """Tests for the monitor.perf object added with --stats."""
+
+    def test_files_stats(self, temp_file_structure, capsys):
+        """Test that the scan cost is reported with the document."""
+        root = temp_file_structure["root"]
+
+        files(path=str(root), location="", environment="", function="", stats=True)
+
+        line = capsys.readouterr().out
+        output = json.loads(line)
+        perf = output["monitor"]["perf"]
+        assert perf["directories"] == 3
+        assert perf["entries"] == 8
+        assert perf["stat_calls"] == 6
+        assert perf["wall_seconds"] >= 0
+        assert perf["cpu_seconds"] >= 0
+        assert perf["peak_rss_bytes"] > 0
+        # The line up to the monitor object, closed and terminated
+        assert perf["output_bytes"] == len(line[: line.index(',"monitor":')].encode()) + 2
+
+    def test_files_without_stats(self, temp_file_structure, capsys):
+        """Test that no monitor object is added by default."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="")
+
+        assert "monitor" not in json.loads(capsys.readouterr().out)
+
+    def test_stream_stats_on_final_event(self, temp_file_structure, capsys):
+        """Test that streamed scans report stats once, counting every event's bytes."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", stream=True, chunk_size=2, stats=True)
+
+        lines = capsys.readouterr().out.splitlines(keepends=True)
+        events = [json.loads(line) for line in lines]
+        assert ["monitor" in event for event in events] == [False] * (len(events) - 1) + [True]
+        perf = events[-1]["monitor"]["perf"]
+        assert perf["entries"] == 8
+        assert sum(len(line.encode()) for line in lines[:-1]) < perf["output_bytes"] < sum(len(line.encode()) for line in lines)
+
+    def test_summary_stats(self, temp_file_structure, capsys):
+        """Test that count-only summaries report a single stat call for the root."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", summary=True, count_only=True, stats=True)
+
+        perf = json.loads(capsys.readouterr().out)["monitor"]["perf"]
+        assert perf["stat_calls"] == 1
+        assert perf["directories"] == 3
+
+
+class TestThrottledFiles:
+    """Tests for scans cut short by a time budget."""
+
+    def test_truncated_result(self, temp_file_structure, capsys):
+        """Test that a scan out of budget reports a partial result without failing."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", time_budget=0.0)
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["filesystem"]["truncated"] is True
+        assert output["filesystem"]["count"] == 0
+        assert output["filesystem"]["error"] is None
+
+    def test_not_truncated(self, temp_file_structure, capsys):
+        """Test that a scan within its limits is complete."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", time_budget=60.0, max_rate=10000.0)
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["filesystem"]["truncated"] is False
+        assert output["filesystem"]["count"] == 5
+
+    def test_stream_truncated(self, temp_file_structure, capsys):
+        """Test that the final streamed event is flagged."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", stream=True, time_budget=0.0)
+
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert events[-1]["filesystem"]["truncated"] is True
+
+    def test_summary_truncated(self, temp_file_structure, capsys):
+        """Test that summaries are flagged."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", summary=True, time_budget=0.0)
+
+        assert json.loads(capsys.readouterr().out)["filesystem"]["truncated"] is True
+
+
+class TestMountIsolation:
+    """Tests for scans of trees holding unresponsive mounts."""
+
+    @pytest.fixture
+    def hung(self, temp_file_structure, monkeypatch):
+        """Declare subdir a hung NFS mount."""
+        from pokerops.monitoring import mounts
+
+        subdir = str(temp_file_structure["root"] / "subdir")
+        monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: [mounts.Mount(subdir, "nas:/export", "nfs")])
+        monkeypatch.setattr(mounts, "PROBE", "import time\ntime.sleep(60)\n")
+        return subdir
+
+    def test_skips_unresponsive(self, temp_file_structure, hung, capsys):
+        """Test that the healthy rest of the tree is reported along with the skipped mount."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", sort=True, mount_timeout=0.1)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert [Path(f["path"]).name for f in output["files"]] == ["file1.txt", "file2.txt", "old_file.txt"]
+        assert [(m["path"], m["source"]) for m in output["unresponsive"]] == [(hung, "nas:/export")]
+        assert output["error"] is None
+
+    def test_summary_unresponsive(self, temp_file_structure, hung, capsys):
+        """Test that summaries list skipped mounts."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", summary=True, mount_timeout=0.1)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert output["count"] == 3
+        assert [m["path"] for m in output["unresponsive"]] == [hung]
+
+    def test_stream_unresponsive(self, temp_file_structure, hung, capsys):
+        """Test that the final streamed event lists skipped mounts."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", stream=True, mount_timeout=0.1)
+
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [m["path"] for m in events[-1]["filesystem"]["unresponsive"]] == [hung]
+
+    def test_disabled(self, temp_file_structure, hung, capsys):
+        """Test that a zero mount timeout scans everything without probing."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", mount_timeout=0)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert output["count"] == 5
+        assert output["unresponsive"] == []
+
+    def test_root_unresponsive(self, temp_file_structure, monkeypatch, capsys):
+        """Test that a root on a hung mount is an error, not an empty tree."""
+        from pokerops.monitoring import mounts
+
+        root = str(temp_file_structure["root"])
+        monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: [mounts.Mount(root, "nas:/export", "nfs")])
+        monkeypatch.setattr(mounts, "PROBE", "import time\ntime.sleep(60)\n")
+        with pytest.raises(typer.Exit) as exc_info:
+            files(path=root, location="", environment="", function="", mount_timeout=0.1)
+
+        assert exc_info.value.exit_code == 1
+        assert "did not respond" in json.loads(capsys.readouterr().out)["filesystem"]["error"]
+
+    def test_directory_stalls_after_probe(self, temp_file_structure, monkeypatch, capsys):
+        """Test that a directory hanging on a mount that was not probed is skipped once the deadline passes."""
+        subdir = str(temp_file_structure["root"] / "subdir")
+        original = os.scandir
+        release = threading.Event()
+
+        def scandir(path):
+            if str(path) == subdir:
+                release.wait()
+            return original(path)
+
+        monkeypatch.setattr(os, "scandir", scandir)
+        try:
+            files(path=str(temp_file_structure["root"]), location="", environment="", function="", sort=True, mount_timeout=0.1)
+        finally:
+            release.set()
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert [Path(f["path"]).name for f in output["files"]] == ["file1.txt", "file2.txt", "old_file.txt"]
+        assert [m["path"] for m in output["unresponsive"]] == [subdir]
+        assert output["error"] is None
+
+    def test_usage_root_unresponsive(self, temp_file_structure, monkeypatch, capsys):
+        """Test that usage of a root on a hung mount is an error."""
+        from pokerops.monitoring import mounts
+
+        root = str(temp_file_structure["root"])
+        monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: [mounts.Mount(root, "nas:/export", "nfs")])
+        monkeypatch.setattr(mounts, "PROBE", "import time\ntime.sleep(60)\n")
+        with pytest.raises(typer.Exit):
+            usage(path=root, location="", environment="", function="", mount_timeout=0.1)
+
+        assert "did not respond" in json.loads(capsys.readouterr().out)["filesystem"]["error"]
+
+
+class TestPatterns:
+    """Tests for several names, excludes and pruned directories."""
+
+    def test_several_names(self, temp_file_structure, capsys):
+        """Test that files matching any name are reported."""
+        (temp_file_structure["root"] / "app.log").write_text("log")
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", name=["*.log", "file1*"], sort=True)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert [Path(f["path"]).name for f in output["files"]] == ["app.log", "file1.txt"]
+
+    def test_exclude(self, temp_file_structure, capsys):
+        """Test that excluded files are left out."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", exclude=["file*"])
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert [Path(f["path"]).name for f in output["files"]] == ["old_file.txt"]
+
+    def test_exclude_dir(self, temp_file_structure, capsys):
+        """Test that excluded directories are not read."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", exclude_dir=["nested"], stats=True)
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["filesystem"]["count"] == 4
+        assert output["monitor"]["perf"]["directories"] == 2
+
+    def test_command_line(self, temp_file_structure):
+        """Test that the patterns can be repeated on the command line."""
+        root = str(temp_file_structure["root"])
+        args = ["files", root, "--name", "file*", "--name", "old*", "--exclude", "file2*", "--exclude-dir", "subdir", "--one-filesystem", "--sort"]
+        result = CliRunner().invoke(app, args)
+
+        assert result.exit_code == 0
+        output = json.loads(result.output)["filesystem"]
+        assert [Path(f["path"]).name for f in output["files"]] == ["file1.txt", "old_file.txt"]
+
+
+class TestHash:
+    """Tests for content digests of reported files."""
+
+    def test_hash(self, temp_file_structure, capsys):
+        """Test that every file carries the digest of its content."""
+        from pokerops.monitoring.digest import digest
+
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", hash=True, hash_workers=1)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert output["count"] == 5
+        assert all(f["hash"] == digest(f["path"]) for f in output["files"])
+
+    def test_stream_hash(self, temp_file_structure, capsys):
+        """Test that streamed chunks carry digests."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="", stream=True, chunk_size=2, hash=True, hash_workers=2)
+
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        reported = [f for event in events[:-1] for f in event["filesystem"]["files"]]
+        assert len(reported) == 5
+        assert all(f["hash"] for f in reported)
+
+    def test_cache(self, temp_file_structure, tmp_path_factory, capsys, monkeypatch):
+        """Test that a second run only reads files that changed."""
+        from pokerops.monitoring.digest import HashCache
+
+        monkeypatch.setattr(HashCache, "GRANULARITY_NS", -(10**12))
+        state_dir = str(tmp_path_factory.mktemp("state"))
+        options = {"location": "", "environment": "", "function": "", "hash": True, "hash_workers": 1, "state_dir": state_dir, "stats": True}
+        files(path=str(temp_file_structure["root"]), **options)
+        first = json.loads(capsys.readouterr().out)
+        temp_file_structure["file1"].write_text("changed")
+        files(path=str(temp_file_structure["root"]), **options)
+        second = json.loads(capsys.readouterr().out)
+
+        assert first["monitor"]["perf"]["hashed_files"] == 5
+        assert (second["monitor"]["perf"]["hashed_files"], second["monitor"]["perf"]["hash_cache_hits"]) == (1, 4)
+        digests = {f["path"]: f["hash"] for f in first["filesystem"]["files"]}
+        changed = str(temp_file_structure["file1"])
+        assert [f["path"] for f in second["filesystem"]["files"] if f["hash"] != digests[f["path"]]] == [changed]
+
+    def test_failed_scan_keeps_cache(self, temp_file_structure, tmp_path_factory, capsys, monkeypatch):
+        """Test that a scan failing on its root does not prune the digests of the previous run."""
+        from pokerops.monitoring.digest import HashCache
+
+        monkeypatch.setattr(HashCache, "GRANULARITY_NS", -(10**12))
+        root = temp_file_structure["root"]
+        options = {"location": "", "environment": "", "function": "", "hash": True, "hash_workers": 1, "state_dir": str(tmp_path_factory.mktemp("state"))}
+        files(path=str(root), **options)
+        root.rename(root.with_name(root.name + ".moved"))
+        with pytest.raises(typer.Exit):
+            files(path=str(root), **options)
+        root.with_name(root.name + ".moved").rename(root)
+        capsys.readouterr()
+        files(path=str(root), **options, stats=True)
+
+        perf = json.loads(capsys.readouterr().out)["monitor"]["perf"]
+        assert (perf["hashed_files"], perf["hash_cache_hits"]) == (0, 5)
+
+    def test_without_hash(self, temp_file_structure, capsys):
+        """Test that files carry no digest unless asked."""
+        files(path=str(temp_file_structure["root"]), location="", environment="", function="")
+
+        assert all("hash" not in f for f in json.loads(capsys.readouterr().out)["filesystem"]["files"])
+
+    def test_hash_with_summary(self, temp_file_structure):
+        """Test that --hash cannot be combined with --summary."""
+        with pytest.raises(typer.BadParameter):
+            files(path=str(temp_file_structure["root"]), location="", environment="", function="", summary=True, hash=True)
+
+
+class TestGrowth:
+    """Tests for growth rates between runs."""
+
+    @pytest.fixture
+    def options(self, tmp_path_factory):
+        return {"location": "", "environment": "", "function": "", "growth": True, "state_dir": str(tmp_path_factory.mktemp("state"))}
+
+    def test_first_run(self, temp_file_structure, options, capsys):
+        """Test that files seen for the first time have no rate yet."""
+        files(path=str(temp_file_structure["root"]), **options)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert all(f["growth_rate"] is None and not f["rotated"] for f in output["files"])
+        assert output["growth"]["bytes"] == sum(f["size"] for f in output["files"])
+        assert output["growth"]["rate"] is None
+        assert output["growth"]["available_bytes"] > 0
+
+    def test_growth(self, temp_file_structure, options, capsys):
+        """Test that an appended file grows, the others do not, and the root grows by the appended bytes."""
+        files(path=str(temp_file_structure["root"]), **options)
+        capsys.readouterr()
+        with open(temp_file_structure["file1"], "a") as f:
+            f.write("x" * 1000)
+        files(path=str(temp_file_structure["root"]), **options)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        rates = {f["path"]: f["growth_rate"] for f in output["files"]}
+        assert rates.pop(str(temp_file_structure["file1"])) > 0
+        assert set(rates.values()) == {0}
+        assert output["growth"]["rate"] > 0
+        assert output["growth"]["interval"] > 0
+
+    def test_failed_scan(self, temp_file_structure, options, capsys):
+        """Test that a scan failing on its root is not taken as an empty root by the next run."""
+        root = temp_file_structure["root"]
+        files(path=str(root), **options)
+        root.rename(root.with_name(root.name + ".moved"))
+        with pytest.raises(typer.Exit):
+            files(path=str(root), **options)
+        root.with_name(root.name + ".moved").rename(root)
+        with open(temp_file_structure["file1"], "a") as f:
+            f.write("x" * 1000)
+        capsys.readouterr()
+        files(path=str(root), **options)
+
+        growth = json.loads(capsys.readouterr().out)["filesystem"]["growth"]
+        assert growth["rate"] * growth["interval"] == pytest.approx(1000)
+
+    def test_rotation(self, temp_file_structure, options, capsys):
+        """Test that a file replaced by another inode is reported as rotated."""
+        files(path=str(temp_file_structure["root"]), **options, stream=True, chunk_size=2)
+        capsys.readouterr()
+        rotated = temp_file_structure["file2"]
+        (rotated.parent / "new").write_text("fresh")
+        os.replace(rotated.parent / "new", rotated)
+        files(path=str(temp_file_structure["root"]), **options, stream=True, chunk_size=2)
+
+        events = [json.loads(line)["filesystem"] for line in capsys.readouterr().out.splitlines()]
+        reported = {f["path"]: f for event in events[:-1] for f in event["files"]}
+        assert [path for path, f in reported.items() if f["rotated"]] == [str(rotated)]
+        assert events[-1]["growth"]["rotated"] == 1
+
+    def test_requires_state_dir(self, temp_file_structure):
+        """Test that --growth needs somewhere to keep samples."""
+        with pytest.raises(typer.BadParameter):
+            files(path=str(temp_file_structure["root"]), location="", environment="", function="", growth=True)
+
+    def test_growth_with_summary(self, temp_file_structure, options):
+        """Test that --growth cannot be combined with --summary."""
+        with pytest.raises(typer.BadParameter):
+            files(path=str(temp_file_structure["root"]), **options, summary=True)
+
+
+class TestUsage:
+    """Tests for the filesystem usage command."""
+
+    def test_usage(self, temp_file_structure, capsys):
+        """Test that usage reports totals and the heaviest directories."""
+        root = temp_file_structure["root"]
+        usage(path=str(root), location="", environment="", function="", depth=1)
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["filesystem"]["files"] == 5
+        assert output["filesystem"]["directories"] == 3
+        assert [d["path"] for d in output["filesystem"]["top"]] == [str(root / "subdir")]
+        assert output["filesystem"]["top"][0]["files"] == 2
+        assert output["fields"]["log"]["description"] == "filesystem-usage"
+
+    @pytest.mark.skipif(subprocess.run(["du", "--version"], capture_output=True).returncode != 0, reason="GNU du not available")
+    def test_same_as_du(self, temp_file_structure, capsys):
+        """Test that allocated bytes match du, hardlinks included."""
+        root = temp_file_structure["root"]
+        (root / "subdir" / "big").write_bytes(os.urandom(100000))
+        os.link(root / "subdir" / "big", root / "link")
+        usage(path=str(root), location="", environment="", function="", depth=1)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        du = subprocess.run(["du", "-B1", "-d", "1", str(root)], capture_output=True, text=True, check=True).stdout
+        expected = {path: int(size) for size, path in (line.split("\t") for line in du.splitlines())}
+        assert output["bytes"] == expected[str(root)]
+        assert {d["path"]: d["bytes"] for d in output["top"]} == {path: size for path, size in expected.items() if path != str(root)}
+        assert output["hardlinks"] == 1
+
+    def test_usage_error(self, tmp_path, capsys):
+        """Test that a missing path is reported as an error."""
+        with pytest.raises(typer.Exit):
+            usage(path=str(tmp_path / "missing"), location="", environment="", function="")
+
+        assert "No such file or directory" in json.loads(capsys.readouterr().out)["filesystem"]["error"]
+
+
+class TestCapacity:
+    """Tests for the filesystem capacity command."""
+
+    def test_capacity(self, capsys):
+        """Test that the root mount is reported as df reports it."""
+        capacity(location="", environment="", function="", mountpoint="/")
+
+        output = json.loads(capsys.readouterr().out)
+        [mount] = output["filesystem"]["mounts"]
+        st = os.statvfs("/")
+        assert (mount["path"], mount["bytes_total"]) == ("/", st.f_blocks * st.f_frsize)
+        assert output["filesystem"]["unresponsive"] == []
+        assert "timestamp" in output
+
+    def test_cli(self):
+        """Test that type and mount point globs are repeatable options."""
+        result = CliRunner().invoke(app, ["capacity", "--fstype", "nosuchfs", "--fstype", "proc", "--mountpoint", "/proc", "--all"])
+
+        assert result.exit_code == 0
+        assert [m["path"] for m in json.loads(result.stdout)["filesystem"]["mounts"]] == ["/proc"]
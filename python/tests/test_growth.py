@@ -0,0 +1,131 @@
+"""Tests for growth rates between runs."""
+
+import os
+import sqlite3
+
+import pytest
+from pokerops.monitoring.growth import GrowthStore, Tracker, rate
+
+
+def stat(dev: int = 1, ino: int = 1, size: int = 0) -> os.stat_result:
+    return os.stat_result((0o100644, ino, dev, 1, 0, 0, size, 0, 0, 0))
+
+
+class TestRate:
+    """Test the growth of single files."""
+
+    def test_new(self):
+        """Test that a file without a previous sample has no rate."""
+        assert rate(None, stat(size=10), 100.0) == (None, False)
+
+    def test_growth(self):
+        """Test that the rate is the size difference over the interval."""
+        assert rate((1, 1, 100, 90.0), stat(size=300), 100.0) == (20.0, False)
+
+    def test_unchanged(self):
+        """Test that a file of the same size does not grow."""
+        assert rate((1, 1, 100, 90.0), stat(size=100), 100.0) == (0.0, False)
+
+    def test_new_inode(self):
+        """Test that a file replaced by another inode is rotated and grows by its whole size."""
+        assert rate((1, 1, 100, 90.0), stat(ino=2, size=50), 100.0) == (5.0, True)
+
+    def test_truncated(self):
+        """Test that a file that shrank in place is rotated."""
+        assert rate((1, 1, 100, 90.0), stat(size=10), 100.0) == (1.0, True)
+
+    def test_clock_went_back(self):
+        """Test that no rate is given without time elapsed since the sample."""
+        assert rate((1, 1, 100, 100.0), stat(size=300), 100.0) == (None, False)
+
+
+class TestGrowthStore:
+    """Test samples kept between runs."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that the samples and totals of a complete run are read back."""
+        store = GrowthStore.open(tmp_path, "/root")
+        store.save({"/root/a": (1, 2, 3, 4.0)}, (3, 4.0))
+        store.close()
+
+        store = GrowthStore.open(tmp_path, "/root")
+        assert store.samples() == {"/root/a": (1, 2, 3, 4.0)}
+        assert store.last_run() == (3, 4.0)
+        store.close()
+
+    def test_per_root(self, tmp_path):
+        """Test that every root has its own samples."""
+        store = GrowthStore.open(tmp_path, "/root")
+        store.save({"/root/a": (1, 2, 3, 4.0)}, (3, 4.0))
+        store.close()
+
+        other = GrowthStore.open(tmp_path, "/other")
+        assert other.samples() == {}
+        assert other.last_run() is None
+        other.close()
+
+    def test_complete_run_replaces(self, tmp_path):
+        """Test that a complete run drops samples of files that are gone, and a partial one keeps them."""
+        store = GrowthStore.open(tmp_path, "/root")
+        store.save({"/root/a": (1, 1, 1, 1.0), "/root/b": (1, 2, 1, 1.0)}, (2, 1.0))
+        store.save({"/root/a": (1, 1, 5, 2.0)}, None)
+        assert store.samples() == {"/root/a": (1, 1, 5, 2.0), "/root/b": (1, 2, 1, 1.0)}
+        assert store.last_run() == (2, 1.0)
+
+        store.save({"/root/a": (1, 1, 6, 3.0)}, (6, 3.0))
+        assert store.samples() == {"/root/a": (1, 1, 6, 3.0)}
+        store.close()
+
+    def test_unwritable(self, tmp_path):
+        """Test that a store that cannot be created raises sqlite3.Error."""
+        with pytest.raises(sqlite3.Error):
+            GrowthStore.open(tmp_path / "missing", "/root")
+
+
+class TestTracker:
+    """Test growth of a whole run."""
+
+    def run(self, tmp_path, now, sizes, complete=True):
+        tracker = Tracker(GrowthStore.open(tmp_path, str(tmp_path)), str(tmp_path), now=now)
+        for ino, size in enumerate(sizes):
+            tracker.add(f"{tmp_path}/f{ino}", stat(ino=ino, size=size))
+        rates = tracker.rates()
+        summary = tracker.summary(complete)
+        tracker.close(complete)
+        return rates, summary
+
+    def test_rates(self, tmp_path):
+        """Test that the rates of files added are handed out once."""
+        self.run(tmp_path, 100.0, [10, 20])
+        tracker = Tracker(GrowthStore.open(tmp_path, str(tmp_path)), str(tmp_path), now=110.0)
+        tracker.add(f"{tmp_path}/f0", stat(ino=0, size=110))
+
+        assert tracker.rates() == {f"{tmp_path}/f0": (10.0, False)}
+        assert tracker.rates() == {}
+        tracker.close()
+
+    def test_forecast(self, tmp_path):
+        """Test that the filesystem is forecast to fill up at the rate of the root."""
+        _, first = self.run(tmp_path, 100.0, [10, 20])
+        _, second = self.run(tmp_path, 110.0, [60, 70])
+
+        assert first["rate"] is None and first["seconds_until_full"] is None
+        assert (second["bytes"], second["rate"], second["interval"]) == (130, 10.0, 10.0)
+        assert second["seconds_until_full"] == second["available_bytes"] / 10.0
+
+    def test_shrinking(self, tmp_path):
+        """Test that a shrinking root has no forecast."""
+        self.run(tmp_path, 100.0, [100])
+        _, summary = self.run(tmp_path, 110.0, [50])
+
+        assert summary["rate"] == -5.0
+        assert summary["seconds_until_full"] is None
+
+    def test_partial(self, tmp_path):
+        """Test that a partial run has no total rate and does not replace the last complete one."""
+        self.run(tmp_path, 100.0, [10, 20])
+        _, partial = self.run(tmp_path, 110.0, [60], complete=False)
+        _, summary = self.run(tmp_path, 120.0, [60, 20])
+
+        assert partial["rate"] is None
+        assert summary["rate"] == 50 / 20
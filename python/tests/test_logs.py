@@ -0,0 +1,209 @@
+"""Tests for log monitoring functionality."""
+
+import json
+import re
+from typing import Any, Dict
+
+import pytest
+import typer
+from pokerops.monitoring.cli import app
+from pokerops.monitoring.logs import Latency, count, mongod_latency, scan
+from typer.testing import CliRunner
+
+MONGOD = b"""{"t":{"$date":"2026-10-17T02:00:00.000+00:00"},"s":"I","c":"NETWORK","id":22943,"msg":"Connection accepted"}
+{"t":{"$date":"2026-10-17T02:00:01.000+00:00"},"s":"E","c":"STORAGE","id":22435,"msg":"WiredTiger error"}
+{"t":{"$date":"2026-10-17T02:00:02.000+00:00"},"s":"W","c":"COMMAND","id":51803,"msg":"Slow query"}
+{"t":{"$date":"2026-10-17T02:00:03.000+00:00"},"s":"E","c":"REPL","id":21235,"msg":"Error in heartbeat"}
+"""
+
+MYSQLROUTER = b"""2026-10-17 02:00:00 main SYSTEM [7f3c9a7fe700] Starting 'mysqlrouter', version: 8.0.36
+2026-10-17 02:00:01 routing ERROR [7f3c9a7fe700] Can't connect to remote MySQL server for client
+2026-10-17 02:00:02 metadata_cache WARNING [7f3c9a7fe700] Failed connecting with Metadata Server: ERROR 2003
+"""
+
+
+def document(capsys):
+    return json.loads(capsys.readouterr().out)["logs"]
+
+
+class TestCount:
+    """Test counting matching lines."""
+
+    def test_lines(self):
+        """Test that a line with several matches counts once."""
+        assert count(re.compile(rb"x", re.MULTILINE), b"xx\ny\nx\n") == 2
+
+    def test_anchor(self):
+        """Test that anchored patterns match at every line start."""
+        assert count(re.compile(rb"^a", re.MULTILINE), b"ab\nba\nac\n") == 2
+
+    def test_no_newline(self):
+        """Test that a match on a last line without newline ends the count."""
+        assert count(re.compile(rb"z", re.MULTILINE), b"a\nz") == 1
+
+
+class TestScan:
+    """Tests for the logs scan command."""
+
+    def test_mongod(self, tmp_path, capsys):
+        """Test that mongod errors and fatals are counted by default."""
+        (tmp_path / "mongod.log").write_bytes(MONGOD)
+
+        scan(path=str(tmp_path / "mongod.log"), location="", environment="", function="", format="mongod")
+
+        output = document(capsys)
+        assert output["matches"] == {"F": 0, "E": 2}
+        assert (output["lines"], output["bytes"], output["error"]) == (4, len(MONGOD), None)
+
+    def test_mysqlrouter(self, tmp_path, capsys):
+        """Test that only the severity field of mysqlrouter lines is matched, not the message."""
+        (tmp_path / "mysqlrouter.log").write_bytes(MYSQLROUTER)
+
+        scan(path=str(tmp_path / "mysqlrouter.log"), location="", environment="", function="", format="mysqlrouter", severity=["ERROR", "WARNING"])
+
+        assert document(capsys)["matches"] == {"ERROR": 1, "WARNING": 1}
+
+    def test_patterns(self, tmp_path, capsys):
+        """Test that patterns are counted alongside severities, each under its own key."""
+        (tmp_path / "mongod.log").write_bytes(MONGOD)
+
+        scan(
+            path=str(tmp_path / "mongod.log"),
+            location="",
+            environment="",
+            function="",
+            pattern=['"c":"(REPL|STORAGE)"', "Slow"],
+            format="mongod",
+            severity=["W"],
+        )
+
+        assert document(capsys)["matches"] == {'"c":"(REPL|STORAGE)"': 2, "Slow": 1, "W": 1}
+
+    def test_incremental(self, tmp_path, capsys):
+        """Test that a second run only counts what was appended."""
+        log = tmp_path / "mongod.log"
+        log.write_bytes(MONGOD)
+        options: Dict[str, Any] = {"location": "", "environment": "", "function": "", "format": "mongod", "state_dir": str(tmp_path / "state")}
+        scan(path=str(log), **options)
+        capsys.readouterr()
+        with open(log, "ab") as f:
+            f.write(MONGOD.splitlines(keepends=True)[1])
+
+        scan(path=str(log), **options)
+
+        output = document(capsys)
+        assert (output["matches"]["E"], output["lines"]) == (1, 1)
+
+    def test_missing(self, tmp_path, capsys):
+        """Test that a log that cannot be read is reported as an error."""
+        with pytest.raises(typer.Exit):
+            scan(path=str(tmp_path / "missing"), location="", environment="", function="", pattern=["x"])
+
+        assert "No such file or directory" in document(capsys)["error"]
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {},
+            {"pattern": ["("]},
+            {"format": "syslog"},
+            {"severity": ["E"]},
+        ],
+    )
+    def test_bad_parameters(self, tmp_path, options):
+        """Test that missing, invalid and inconsistent patterns are rejected."""
+        with pytest.raises(typer.BadParameter):
+            scan(path=str(tmp_path), location="", environment="", function="", **options)
+
+    def test_cli(self, tmp_path):
+        """Test that the command is registered and patterns are repeatable."""
+        (tmp_path / "mongod.log").write_bytes(MONGOD)
+
+        result = CliRunner().invoke(app, ["logs", "scan", str(tmp_path / "mongod.log"), "--pattern", "NETWORK", "--pattern", "REPL"])
+
+        assert result.exit_code == 0
+        assert json.loads(result.stdout)["logs"]["matches"] == {"NETWORK": 1, "REPL": 1}
+
+
+def slow(ns, command, millis):
+    """A mongod slow query line."""
+    attr = {"type": "command", "ns": ns, "command": {command: ns.split(".")[1], "filter": {}}, "planSummary": "COLLSCAN", "durationMillis": millis}
+    return (
+        json.dumps({"t": {"$date": "2026-10-17T02:00:00.000+00:00"}, "s": "I", "c": "COMMAND", "id": 51803, "msg": "Slow query", "attr": attr}).encode() + b"\n"
+    )
+
+
+class TestLatency:
+    """Test aggregation of slow operation durations."""
+
+    def test_groups(self):
+        """Test that durations are grouped by namespace and command, and lines without durations skipped."""
+        latency = Latency()
+        latency.feed(MONGOD + b"".join(slow("app.users", "find", millis) for millis in range(1, 101)) + slow("app.orders", "insert", 7))
+
+        summary = latency.to_dict()
+
+        assert [(op["namespace"], op["operation"], op["count"]) for op in summary["operations"]] == [("app.orders", "insert", 1), ("app.users", "find", 100)]
+        users = summary["operations"][1]
+        assert users["max"] == 100
+        assert users["p50"] == pytest.approx(50, rel=0.01)
+        assert users["p99"] == pytest.approx(99, rel=0.01)
+        assert summary["total"]["count"] == 101
+        assert summary["ignored"] == 0
+
+    def test_fast_path(self, monkeypatch):
+        """Test that only lines holding durationMillis are decoded."""
+        decoded = []
+        monkeypatch.setattr(json, "loads", lambda line: decoded.append(line) or {})
+        latency = Latency()
+
+        latency.feed(MONGOD + slow("app.users", "find", 3))
+
+        assert len(decoded) == 1
+        assert latency.ignored == 1
+
+    def test_without_namespace(self):
+        """Test that durations of lines without a namespace are not attributed to one."""
+        latency = Latency()
+
+        latency.feed(b'{"s":"I","msg":"Slow WT transaction","attr":{"durationMillis":5}}\nnot json "durationMillis":1\n')
+
+        assert latency.to_dict() == {"operations": [], "total": {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}, "ignored": 2}
+
+
+class TestMongodLatency:
+    """Tests for the logs mongod-latency command."""
+
+    def test_incremental(self, tmp_path, capsys):
+        """Test that every run reports the operations appended since the previous one."""
+        log = tmp_path / "mongod.log"
+        log.write_bytes(slow("app.users", "find", 10))
+        options: Dict[str, Any] = {"location": "", "environment": "", "function": "", "state_dir": str(tmp_path / "state")}
+        mongod_latency(path=str(log), **options)
+        with open(log, "ab") as f:
+            f.write(slow("app.users", "aggregate", 20))
+        mongod_latency(path=str(log), **options, sketch=True)
+
+        first, second = [json.loads(line)["logs"] for line in capsys.readouterr().out.splitlines()]
+        assert [op["operation"] for op in first["operations"]] == ["find"]
+        [operation] = second["operations"]
+        assert (operation["operation"], operation["count"], operation["max"]) == ("aggregate", 1, 20)
+        assert sum(operation["sketch"]["bins"].values()) == 1
+
+    def test_follow(self, tmp_path, capsys):
+        """Test that a followed log is reported every interval."""
+        log = tmp_path / "mongod.log"
+        log.write_bytes(slow("app.users", "find", 10))
+
+        mongod_latency(path=str(log), location="", environment="", function="", interval=0, iterations=2)
+
+        first, second = [json.loads(line)["logs"] for line in capsys.readouterr().out.splitlines()]
+        assert first["total"]["count"] == 1
+        assert second["total"]["count"] == 0
+
+    def test_missing(self, tmp_path, capsys):
+        """Test that a log that cannot be read is reported as an error."""
+        with pytest.raises(typer.Exit):
+            mongod_latency(path=str(tmp_path / "missing"), location="", environment="", function="")
+
+        assert "No such file or directory" in document(capsys)["error"]
@@ -0,0 +1,215 @@
+"""Tests for the OpenMetrics endpoint."""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict
+
+import pytest
+import typer
+from pokerops.monitoring.metrics import CONTENT_TYPE, Checks, metrics_server, samples, server
+from pokerops.monitoring.serve import Job
+
+NTP = Job("ntp-0", "ntp", 60.0, {})
+FILES = Job("logs", "files", 300.0, {"path": "/var/log"})
+
+
+def files_document(sizes, error=None):
+    files = [{"path": f"/var/log/{index}", "size": size} for index, size in enumerate(sizes)]
+    return {"filesystem": {"path": "/var/log", "files": files, "count": len(files), "error": error}}
+
+
+def wait(checks, count):
+    """Wait for the runs in flight to finish and count results."""
+    deadline = time.monotonic() + 5
+    while len(checks.results) < count or any(checks.inflight.values()):
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+class Clock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSamples:
+    """Test metrics taken from check documents."""
+
+    def test_ntp(self):
+        """Test that the consensus offset is exposed in seconds."""
+        found = samples(NTP, {"ntp_peer_offset": 0.002}, 0.5, 1700000000.0)
+
+        assert found["ntp_peer_offset_seconds"] == [({"check": "ntp-0"}, 0.002)]
+        assert found["monitor_check_success"] == [({"check": "ntp-0"}, 1)]
+        assert found["monitor_check_duration_seconds"] == [({"check": "ntp-0"}, 0.5)]
+
+    def test_ntp_failed(self):
+        """Test that a failed ntp check only has its status."""
+        found = samples(NTP, {"ntp_peer_offset": None, "error": "No NTP peer replied"}, 0.5, 1700000000.0)
+
+        assert "ntp_peer_offset_seconds" not in found
+        assert found["monitor_check_success"] == [({"check": "ntp-0"}, 0)]
+
+    def test_files(self):
+        """Test that files checks expose their count and total size per path."""
+        found = samples(FILES, files_document([10, 32]), 0.5, 1700000000.0)
+
+        assert found["filesystem_files"] == [({"check": "logs", "path": "/var/log"}, 2)]
+        assert found["filesystem_bytes"] == [({"check": "logs", "path": "/var/log"}, 42)]
+
+    def test_raised(self):
+        """Test that a check that raised is reported as failed."""
+        assert samples(FILES, None, 0.5, 1700000000.0)["monitor_check_success"] == [({"check": "logs"}, 0)]
+
+
+class TestChecks:
+    """Test the TTL cache of check results."""
+
+    def test_render(self):
+        """Test that families are grouped, typed and terminated as OpenMetrics requires."""
+        checks = Checks([NTP, Job("other", "ntp", 60.0, {})], run=lambda job: {"ntp_peer_offset": 0.25})
+        checks.refresh()
+        wait(checks, 2)
+
+        text = checks.render()
+        checks.close()
+
+        assert text.endswith("# EOF\n")
+        families = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+        assert families == ["ntp_peer_offset_seconds", "monitor_check_success", "monitor_check_duration_seconds", "monitor_check_timestamp_seconds"]
+        assert 'ntp_peer_offset_seconds{check="ntp-0"} 0.25\nntp_peer_offset_seconds{check="other"} 0.25\n' in text
+        assert "# UNIT ntp_peer_offset_seconds seconds\n" in text
+
+    def test_escape(self):
+        """Test that label values are escaped."""
+        job = Job("logs", "files", 300.0, {})
+        document = files_document([1])
+        document["filesystem"]["path"] = 'C:\\ "quoted"'
+        checks = Checks([job], run=lambda job: document)
+        checks.refresh()
+        wait(checks, 1)
+
+        assert 'filesystem_files{check="logs",path="C:\\\\ \\"quoted\\""} 1.0\n' in checks.render()
+        checks.close()
+
+    def test_ttl(self):
+        """Test that a check runs again only once its result is older than its TTL."""
+        clock = Clock()
+        runs = []
+        checks = Checks([NTP], run=lambda job: runs.append(job.id) or {"ntp_peer_offset": float(len(runs))}, clock=clock)
+        checks.refresh()
+        wait(checks, 1)
+
+        clock.now += 59
+        checks.refresh()
+        wait(checks, 1)
+        assert runs == ["ntp-0"]
+
+        clock.now += 1
+        checks.refresh()
+        wait(checks, 1)
+        assert runs == ["ntp-0", "ntp-0"]
+        assert 'ntp_peer_offset_seconds{check="ntp-0"} 2.0' in checks.render()
+        checks.close()
+
+    def test_single_flight(self):
+        """Test that concurrent scrapes share one run, and are served without waiting for it."""
+        release = threading.Event()
+        runs = []
+
+        def run(job):
+            runs.append(job.id)
+            release.wait(5)
+            return {"ntp_peer_offset": 0.1}
+
+        checks = Checks([NTP], run=run, workers=4)
+        scrapes = [threading.Thread(target=checks.refresh) for _ in range(8)]
+        for scrape in scrapes:
+            scrape.start()
+        for scrape in scrapes:
+            scrape.join()
+
+        assert checks.render() == "# EOF\n"
+        release.set()
+        wait(checks, 1)
+        assert runs == ["ntp-0"]
+        checks.close()
+
+    def test_raised(self):
+        """Test that a check that raises is reported as failed."""
+
+        def run(job: Job) -> Dict[str, Any]:
+            raise ZeroDivisionError("division by zero")
+
+        checks = Checks([FILES], run=run)
+        checks.refresh()
+        wait(checks, 1)
+
+        assert 'monitor_check_success{check="logs"} 0.0' in checks.render()
+        checks.close()
+
+
+class TestServer:
+    """Test the HTTP endpoint."""
+
+    @pytest.fixture
+    def endpoint(self):
+        release = threading.Event()
+
+        def run(job):
+            release.wait(5)
+            return files_document([5])
+
+        checks = Checks([FILES], run=run)
+        httpd = server(checks, port=0)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{httpd.server_address[1]}", checks, release
+        release.set()
+        httpd.shutdown()
+        httpd.server_close()
+        checks.close()
+
+    def test_scrape(self, endpoint):
+        """Test that scrapes are answered at once from the cache and start the first run."""
+        url, checks, release = endpoint
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            first = response.read().decode()
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+        # The run cannot finish before release is set, so the scrape did not wait for it
+        assert checks.inflight[FILES.id]
+        assert first == "# EOF\n"
+
+        release.set()
+        wait(checks, 1)
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert 'filesystem_bytes{check="logs",path="/var/log"} 5.0' in response.read().decode()
+
+    def test_not_found(self, endpoint):
+        """Test that only /metrics is served."""
+        url, _, _ = endpoint
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/other")
+
+        assert error.value.code == 404
+
+
+class TestMetricsServer:
+    """Test the command."""
+
+    def test_invalid_schedule(self, tmp_path, capsys):
+        """Test that an invalid schedule is reported without listening."""
+        path = tmp_path / "schedule.json"
+        path.write_text(json.dumps([{"check": "disk", "interval": 60}]))
+
+        with pytest.raises(typer.Exit):
+            metrics_server(str(path), location="", environment="", function="", port=0)
+
+        assert "Invalid schedule" in json.loads(capsys.readouterr().out)["serve"]["error"]
@@ -0,0 +1,107 @@
+"""Tests for mount table parsing and hung mount isolation."""
+
+import time
+
+import pytest
+from pokerops.monitoring import mounts
+from pokerops.monitoring.mounts import Isolation, Mount, containing, parse, probe, table
+
+# Sleeps far longer than any test deadline, like a probe blocked on a dead server
+HANG = "import time\ntime.sleep(60)\n"
+
+
+class TestMountTable:
+    """Test parsing /proc/self/mountinfo."""
+
+    def test_parse(self):
+        """Test that optional fields are skipped and octal escapes decoded."""
+        mount = parse("36 35 98:0 /export /mnt/shared\\040data rw,noatime master:1 shared:2 - nfs4 10.0.0.1:/export rw,vers=4.2")
+
+        assert mount == Mount("/mnt/shared data", "10.0.0.1:/export", "nfs4")
+        assert mount.remote is True
+
+    def test_remote(self):
+        """Test that local filesystems are trusted and FUSE ones are not."""
+        assert Mount("/", "/dev/sda1", "ext4").remote is False
+        assert Mount("/mnt/s3", "s3fs", "fuse.s3fs").remote is True
+
+    def test_table(self, tmp_path):
+        """Test that malformed lines are skipped."""
+        mountinfo = tmp_path / "mountinfo"
+        mountinfo.write_text("22 1 8:1 / / rw - ext4 /dev/sda1 rw\ngarbage\n40 22 0:50 / /mnt rw - cifs //server/share rw\n")
+
+        assert table(str(mountinfo)) == [Mount("/", "/dev/sda1", "ext4"), Mount("/mnt", "//server/share", "cifs")]
+
+    def test_table_unavailable(self, tmp_path):
+        """Test that a missing mount table yields no mounts."""
+        assert table(str(tmp_path / "missing")) == []
+
+    def test_containing(self):
+        """Test that the most recent mount over a path wins."""
+        table = [Mount("/", "/dev/sda1", "ext4"), Mount("/mnt", "server:/a", "nfs"), Mount("/mnt", "server:/b", "nfs")]
+
+        assert containing("/mnt/data", table) == Mount("/mnt", "server:/b", "nfs")
+        assert containing("/mntx", table) == Mount("/", "/dev/sda1", "ext4")
+
+
+class TestProbe:
+    """Test out of process probes."""
+
+    def test_responsive(self, tmp_path):
+        """Test that a readable directory answers in time."""
+        assert probe([str(tmp_path)], timeout=10.0) == {}
+
+    def test_hung(self, tmp_path, monkeypatch):
+        """Test that a probe past its deadline is killed and reported."""
+        monkeypatch.setattr(mounts, "PROBE", HANG)
+        start = time.monotonic()
+
+        hung = probe([str(tmp_path)], timeout=0.2)
+
+        assert list(hung) == [str(tmp_path)]
+        assert 0.2 <= hung[str(tmp_path)] < 5
+        assert time.monotonic() - start < 5
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """Mount table declaring tmp_path/remote an NFS mount."""
+    (tmp_path / "remote").mkdir()
+    table = [Mount("/", "/dev/sda1", "ext4"), Mount(str(tmp_path / "remote"), "nas:/export", "nfs")]
+    monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: table)
+    return tmp_path / "remote"
+
+
+class TestIsolation:
+    """Test which mounts a scan skips."""
+
+    def test_healthy(self, tmp_path, remote):
+        """Test that responsive mounts are kept."""
+        isolation = Isolation(timeout=10.0)
+
+        assert isolation.check(str(tmp_path)) == set()
+        assert isolation.to_list() == []
+
+    def test_unresponsive(self, tmp_path, remote, monkeypatch):
+        """Test that hung mounts are skipped with their source."""
+        monkeypatch.setattr(mounts, "PROBE", HANG)
+        isolation = Isolation(timeout=0.1)
+
+        assert isolation.check(str(tmp_path)) == {str(remote)}
+        [skipped] = isolation.to_list()
+        assert (skipped["path"], skipped["source"], skipped["fstype"]) == (str(remote), "nas:/export", "nfs")
+        assert skipped["elapsed"] >= 0.1
+
+    def test_root_on_mount(self, remote, monkeypatch):
+        """Test that a root inside a hung mount is skipped itself."""
+        monkeypatch.setattr(mounts, "PROBE", HANG)
+        root = str(remote / "data")
+
+        assert Isolation(timeout=0.1).check(root) == {root}
+
+    def test_local_only(self, tmp_path, monkeypatch):
+        """Test that local mounts are not probed."""
+        monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: [Mount("/", "/dev/sda1", "ext4")])
+        monkeypatch.setattr(mounts, "probe", lambda paths, timeout: pytest.fail("probed a local mount"))
+
+        assert Isolation(timeout=0.1).check(str(tmp_path)) == set()
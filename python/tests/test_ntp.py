@@ -1,121 +1,284 @@
 """Tests for NTP drift functionality."""
 
 import json
-from unittest.mock import MagicMock, patch
+import time
 
 import pytest
-from pokerops.monitoring.ntp import ntp_drift
+import typer
+from pokerops.monitoring import timex
+from pokerops.monitoring.ntp import ntp_drift, ntp_kernel
 
 
-@pytest.fixture
-def mock_ntp_response():
-    """Mock NTP response."""
-    response = MagicMock()
-    response.tx_time = 1704067200.0  # 2024-01-01 00:00:00 UTC
-    response.offset = 0.005  # 5ms offset
-    return response
+def test_ntp_drift_success(ntp_server, capsys):
+    """Test successful NTP drift check."""
+    server = ntp_server(offset=0.5)
 
+    ntp_drift(
+        peer=[server.address],
+        location="test-location",
+        environment="test-env",
+        function="test-function",
+        log_id="test-log",
+    )
 
-def test_ntp_drift_success(mock_ntp_response, capsys):
-    """Test successful NTP drift check."""
-    with patch("pokerops.monitoring.ntp.ntplib.NTPClient") as mock_client_class:
-        mock_client = MagicMock()
-        mock_client.request.return_value = mock_ntp_response
-        mock_client_class.return_value = mock_client
-
-        # Call the function
-        ntp_drift(
-            peer="time.cloudflare.com",
-            location="test-location",
-            environment="test-env",
-            function="test-function",
-            log_id="test-log",
-        )
-
-        # Verify NTP client was called
-        mock_client.request.assert_called_once_with("time.cloudflare.com")
-
-        # Capture and verify output
-        captured = capsys.readouterr()
-        output = json.loads(captured.out)
-
-        assert output["ntp_peer_address"] == "time.cloudflare.com"
-        assert output["ntp_peer_offset"] == 0.005
-        assert output["fields"]["location"] == "test-location"
-        assert output["fields"]["environment"] == "test-env"
-        assert output["fields"]["function"] == "test-function"
-        assert output["fields"]["log"]["description"] == "test-log"
-        assert "timestamp" in output
-        assert "host" in output
-        assert "name" in output["host"]
-
-
-def test_ntp_drift_with_negative_offset(capsys):
-    """Test NTP drift with negative offset (should be absolute value)."""
-    mock_response = MagicMock()
-    mock_response.tx_time = 1704067200.0
-    mock_response.offset = -0.010  # -10ms offset
+    assert server.requests == 1
+
+    captured = capsys.readouterr()
+    output = json.loads(captured.out)
 
-    with patch("pokerops.monitoring.ntp.ntplib.NTPClient") as mock_client_class:
-        mock_client = MagicMock()
-        mock_client.request.return_value = mock_response
-        mock_client_class.return_value = mock_client
+    assert output["ntp_peer_address"] == server.address
+    assert output["ntp_peer_offset"] == pytest.approx(0.5, abs=0.05)
+    assert output["ntp_peers"][0]["reachable"] is True
+    assert output["ntp_peers"][0]["stratum"] == 2
+    assert output["ntp_peers"][0]["delay"] >= 0
+    assert output["fields"]["location"] == "test-location"
+    assert output["fields"]["environment"] == "test-env"
+    assert output["fields"]["function"] == "test-function"
+    assert output["fields"]["log"]["description"] == "test-log"
+    assert "timestamp" in output
+    assert "host" in output
+    assert "name" in output["host"]
 
-        ntp_drift(
-            peer="test.ntp.server",
-            location="test",
-            environment="test",
-            function="test",
-        )
 
-        captured = capsys.readouterr()
-        output = json.loads(captured.out)
+def test_ntp_drift_with_negative_offset(ntp_server, capsys):
+    """Test NTP drift with negative offset (should be absolute value)."""
+    server = ntp_server(offset=-0.5)
+
+    ntp_drift(
+        peer=[server.address],
+        location="test",
+        environment="test",
+        function="test",
+    )
 
-        # Offset should be absolute value
-        assert output["ntp_peer_offset"] == 0.010
+    captured = capsys.readouterr()
+    output = json.loads(captured.out)
 
+    # Offset should be absolute value
+    assert output["ntp_peer_offset"] == pytest.approx(0.5, abs=0.05)
+    assert output["ntp_consensus"]["offset"] == pytest.approx(-0.5, abs=0.05)
 
-def test_ntp_drift_default_log_id(mock_ntp_response, capsys):
+
+def test_ntp_drift_default_log_id(ntp_server, capsys):
     """Test NTP drift with default log_id."""
-    with patch("pokerops.monitoring.ntp.ntplib.NTPClient") as mock_client_class:
-        mock_client = MagicMock()
-        mock_client.request.return_value = mock_ntp_response
-        mock_client_class.return_value = mock_client
+    server = ntp_server()
 
-        ntp_drift(
-            peer="test.ntp.server",
-            location="test",
-            environment="test",
-            function="test",
-        )
+    ntp_drift(
+        peer=[server.address],
+        location="test",
+        environment="test",
+        function="test",
+    )
 
-        captured = capsys.readouterr()
-        output = json.loads(captured.out)
+    captured = capsys.readouterr()
+    output = json.loads(captured.out)
 
-        # Should use default log_id
-        assert output["fields"]["log"]["description"] == "ntp-drift"
+    # Should use default log_id
+    assert output["fields"]["log"]["description"] == "ntp-drift"
 
 
-def test_ntp_drift_json_format(mock_ntp_response, capsys):
+def test_ntp_drift_json_format(ntp_server, capsys):
     """Test that output is valid JSON."""
-    with patch("pokerops.monitoring.ntp.ntplib.NTPClient") as mock_client_class:
-        mock_client = MagicMock()
-        mock_client.request.return_value = mock_ntp_response
-        mock_client_class.return_value = mock_client
-
-        ntp_drift(
-            peer="test.ntp.server",
-            location="test",
-            environment="test",
-            function="test",
-        )
-
-        captured = capsys.readouterr()
-
-        # Should not raise JSONDecodeError
-        output = json.loads(captured.out)
-
-        # Verify structure
-        assert isinstance(output, dict)
-        assert isinstance(output["fields"], dict)
-        assert isinstance(output["host"], dict)
+    server = ntp_server()
+
+    ntp_drift(
+        peer=[server.address],
+        location="test",
+        environment="test",
+        function="test",
+    )
+
+    captured = capsys.readouterr()
+
+    # Should not raise JSONDecodeError
+    output = json.loads(captured.out)
+
+    # Verify structure
+    assert isinstance(output, dict)
+    assert isinstance(output["fields"], dict)
+    assert isinstance(output["host"], dict)
+
+
+def test_ntp_drift_outvotes_falseticker(ntp_server, capsys):
+    """Test that the consensus ignores a peer disagreeing with the majority."""
+    truechimers = [ntp_server(offset=0.2), ntp_server(offset=0.2)]
+    falseticker = ntp_server(offset=30.0)
+
+    ntp_drift(peer=[falseticker.address, *(s.address for s in truechimers)], location="", environment="", function="")
+
+    output = json.loads(capsys.readouterr().out)
+    assert output["ntp_peer_offset"] == pytest.approx(0.2, abs=0.05)
+    assert output["ntp_peer_address"] in [s.address for s in truechimers]
+    assert sorted(output["ntp_consensus"]["survivors"]) == sorted(s.address for s in truechimers)
+    assert [peer["reachable"] for peer in output["ntp_peers"]] == [True, True, True]
+
+
+def test_ntp_drift_latency_is_bounded_by_timeout(ntp_server, capsys):
+    """Test that unresponsive peers share one deadline instead of adding up."""
+    silent = [ntp_server(respond=False) for _ in range(10)]
+    responsive = ntp_server(offset=0.1)
+
+    start = time.monotonic()
+    ntp_drift(peer=[*(s.address for s in silent), responsive.address], location="", environment="", function="", timeout=0.5)
+    elapsed = time.monotonic() - start
+
+    # Deadlines adding up would take 5 seconds; the bound leaves room for a loaded runner
+    assert elapsed < 2.5
+    output = json.loads(capsys.readouterr().out)
+    assert [peer["reachable"] for peer in output["ntp_peers"]] == [False] * 10 + [True]
+    assert output["ntp_peer_address"] == responsive.address
+
+
+def test_ntp_drift_unreachable(ntp_server, capsys):
+    """Test that an error document is printed when no peer replies."""
+    server = ntp_server(respond=False)
+
+    with pytest.raises(typer.Exit) as exc_info:
+        ntp_drift(peer=[server.address], location="", environment="", function="", timeout=0.1)
+
+    assert exc_info.value.exit_code == 1
+    output = json.loads(capsys.readouterr().out)
+    assert output["ntp_peer_offset"] is None
+    assert "No NTP peer replied" in output["error"]
+
+
+def test_ntp_drift_without_majority(ntp_server, capsys):
+    """Test that two disagreeing peers do not produce a consensus."""
+    servers = [ntp_server(offset=0.0), ntp_server(offset=30.0)]
+
+    with pytest.raises(typer.Exit):
+        ntp_drift(peer=[s.address for s in servers], location="", environment="", function="")
+
+    output = json.loads(capsys.readouterr().out)
+    assert output["ntp_consensus"] is None
+    assert "majority" in output["error"]
+
+
+def test_ntp_drift_burst_keeps_minimum_delay_sample(ntp_server, capsys):
+    """Test that a burst reports the least delayed sample with its jitter."""
+    server = ntp_server(offset=0.5, delays=[0.15, 0.0, 0.1, 0.05])
+
+    ntp_drift(peer=[server.address], location="", environment="", function="", samples=4)
+
+    assert server.requests == 4
+    output = json.loads(capsys.readouterr().out)
+    peer = output["ntp_peers"][0]
+    assert peer["samples"] == 4
+    assert peer["offset"] == pytest.approx(0.5, abs=0.01)
+    assert peer["delay"] < 0.02
+    assert 0.03 < peer["jitter"] < 0.08
+    assert output["ntp_peer_offset"] == pytest.approx(0.5, abs=0.01)
+
+
+def test_ntp_drift_burst_charges_lost_samples(ntp_server, capsys):
+    """Test that lost burst samples add dispersion without failing the check."""
+    server = ntp_server(drop=[1])
+
+    start = time.monotonic()
+    ntp_drift(peer=[server.address], location="", environment="", function="", samples=4, timeout=0.3)
+
+    # The lost sample is given up at the deadline; the bound only rules out waiting on it much longer
+    assert time.monotonic() - start < 3
+    peer = json.loads(capsys.readouterr().out)["ntp_peers"][0]
+    assert peer["samples"] == 3
+    assert peer["dispersion"] >= 1.0
+
+
+def test_ntp_drift_stats(ntp_server, capsys):
+    """Test that --stats reports the check cost and per-peer round-trip times."""
+    servers = [ntp_server(delays=[0.02]), ntp_server()]
+
+    ntp_drift(peer=[server.address for server in servers], location="test", environment="test", function="test", stats=True)
+
+    output = json.loads(capsys.readouterr().out)
+    perf = output["monitor"]["perf"]
+    assert [peer["address"] for peer in perf["peers"]] == [server.address for server in servers]
+    assert perf["peers"][0]["delay"] >= 0.02
+    assert perf["peers"][0]["elapsed"] >= perf["peers"][0]["delay"]
+    assert perf["wall_seconds"] >= perf["peers"][0]["elapsed"]
+    assert perf["output_bytes"] > 0
+
+
+class TestNtpKernel:
+    """Test the kernel clock status check."""
+
+    @pytest.fixture
+    def kernel_status(self, monkeypatch):
+        def set_status(state, **fields):
+            value = timex.Timex(status=timex.STA_PLL, maxerror=1500, offset=-2500)
+            for name, field in fields.items():
+                setattr(value, name, field)
+            monkeypatch.setattr(timex, "read", lambda: (state, value))
+
+        return set_status
+
+    def test_synchronized(self, kernel_status, ntp_server, capsys):
+        """Test that a synchronized kernel clock is reported without querying peers."""
+        server = ntp_server(offset=0.5)
+        kernel_status(timex.TIME_OK)
+
+        ntp_kernel(location="test", environment="test", function="test", peer=[server.address])
+
+        output = json.loads(capsys.readouterr().out)
+        assert server.requests == 0
+        assert output["ntp_peer_offset"] == pytest.approx(0.0025)
+        assert output["ntp_peer_address"] is None
+        assert output["ntp_kernel"]["synchronized"] is True
+        assert output["ntp_kernel"]["flags"] == ["PLL"]
+        assert output["fields"]["log"]["description"] == "ntp-kernel"
+
+    def test_unsynchronized_without_peers(self, kernel_status, capsys):
+        """Test that an unsynchronized clock without fallback peers has no offset."""
+        kernel_status(timex.TIME_ERROR, status=timex.STA_UNSYNC, maxerror=timex.MAXERROR_LIMIT)
+
+        ntp_kernel(location="test", environment="test", function="test")
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["ntp_peer_offset"] is None
+        assert output["ntp_kernel"]["state"] == "error"
+        assert output["ntp_kernel"]["synchronized"] is False
+        assert "error" not in output
+
+    def test_unsynchronized_falls_back_to_peers(self, kernel_status, ntp_server, capsys):
+        """Test that peers are queried once the kernel reports unsynchronized."""
+        server = ntp_server(offset=0.5)
+        kernel_status(timex.TIME_ERROR, status=timex.STA_UNSYNC)
+
+        ntp_kernel(location="test", environment="test", function="test", peer=[server.address])
+
+        output = json.loads(capsys.readouterr().out)
+        assert server.requests == 1
+        assert output["ntp_peer_address"] == server.address
+        assert output["ntp_peer_offset"] == pytest.approx(0.5, abs=0.05)
+        assert output["ntp_kernel"]["synchronized"] is False
+        assert output["fields"]["log"]["description"] == "ntp-kernel"
+
+    def test_fallback_unreachable(self, kernel_status, ntp_server, capsys):
+        """Test that an unreachable fallback peer exits with error."""
+        server = ntp_server(respond=False)
+        kernel_status(timex.TIME_ERROR, status=timex.STA_UNSYNC)
+
+        with pytest.raises(typer.Exit) as exc_info:
+            ntp_kernel(location="test", environment="test", function="test", peer=[server.address], timeout=0.2)
+
+        assert exc_info.value.exit_code == 1
+        output = json.loads(capsys.readouterr().out)
+        assert output["ntp_peer_offset"] is None
+        assert output["ntp_kernel"]["synchronized"] is False
+        assert "error" in output
+
+    def test_read_error(self, monkeypatch, capsys):
+        """Test that a failing adjtimex call exits with error."""
+
+        def fail():
+            raise OSError(1, "Operation not permitted")
+
+        monkeypatch.setattr(timex, "read", fail)
+
+        with pytest.raises(typer.Exit) as exc_info:
+            ntp_kernel(location="test", environment="test", function="test")
+
+        assert exc_info.value.exit_code == 1
+        output = json.loads(capsys.readouterr().out)
+        assert output["ntp_kernel"] is None
+        assert output["error"].startswith("adjtimex:")
@@ -0,0 +1,123 @@
+"""Tests for document serialization."""
+
+import io
+import json
+import sys
+
+import pytest
+from pokerops.monitoring import output, tools
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    """Run a test with each JSON backend, skipping orjson when it is not installed."""
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(output, "orjson", None)
+    return request.param
+
+
+class TestEncode:
+    """Test encoding of documents."""
+
+    def test_envelope_is_cached(self):
+        """Test that metadata shares one envelope per set of values."""
+        first = tools.metadata(location="a", environment="b", function="c", log_id="d")
+        second = tools.metadata(location="a", environment="b", function="c", log_id="d")
+        other = tools.metadata(location="a", environment="b", function="c", log_id="e")
+
+        assert first["host"] is second["host"]
+        assert first["fields"] is second["fields"]
+        assert other["fields"] is not first["fields"]
+        assert other["fields"] == {"log": {"description": "e"}, "location": "a", "environment": "b", "function": "c"}
+
+    def test_empty_fields_omitted(self):
+        """Test that empty location, environment and function are left out."""
+        data = tools.metadata(location="", environment="", function="", log_id="d")
+
+        assert data["fields"] == {"log": {"description": "d"}}
+
+    def test_spliced_envelope(self, backend):
+        """Test that a document with a cached envelope encodes to the same JSON as without."""
+        data = {"ntp_peer_offset": 0.25, "ntp_peers": [{"address": "peer", "reachable": True}]}
+        data.update(tools.metadata(location="a", environment="", function="c", log_id="d"))
+
+        encoded = output.encode(data)
+
+        assert json.loads(encoded) == json.loads(json.dumps(data))
+        assert list(json.loads(encoded)) == ["ntp_peer_offset", "ntp_peers", "timestamp", "host", "fields"]
+
+    def test_envelope_only(self, backend):
+        """Test splicing into a document holding nothing but the envelope."""
+        data = tools.metadata(location="", environment="", function="", log_id="d")
+        data.pop("timestamp")
+
+        assert json.loads(output.encode(data)) == data
+
+    def test_copied_envelope_not_spliced(self):
+        """Test that a document with fields equal to, but not the cached, envelope is encoded in full."""
+        data = tools.metadata(location="", environment="", function="", log_id="d")
+        fields = data["fields"]
+        assert isinstance(fields, dict)
+        data["fields"] = {**fields, "extra": "value"}
+
+        assert json.loads(output.encode(data))["fields"]["extra"] == "value"
+
+    def test_undecodable_path(self, backend):
+        """Test that file names that are not valid UTF-8 are escaped."""
+        path = b"/tmp/\xff".decode(errors="surrogateescape")
+
+        assert json.loads(output.encode({"path": path})) == {"path": path}
+
+    def test_non_string_keys(self, backend):
+        """Test that non-string keys are converted as json does."""
+        assert json.loads(output.dumps({1: "a"})) == {"1": "a"}
+
+
+class TestWrite:
+    """Test writing documents to stdout."""
+
+    def test_write(self, capsys):
+        """Test that documents are written as NDJSON lines."""
+        output.write({"a": 1})
+        output.write({"b": 2}, flush=True)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [json.loads(line) for line in lines] == [{"a": 1}, {"b": 2}]
+
+    def test_buffered(self, monkeypatch):
+        """Test that lines stay buffered until flushed on a non-interactive stdout."""
+        raw = io.BytesIO()
+        buffer = io.BufferedWriter(raw)
+        monkeypatch.setattr(sys, "stdout", io.TextIOWrapper(buffer))
+
+        output.write({"a": 1})
+        assert raw.getvalue() == b""
+
+        output.write({"b": 2}, flush=True)
+        assert raw.getvalue() == b'{"a":1}\n{"b":2}\n'
+
+    def test_trailer(self, capsys):
+        """Test that trailer fields are appended and told the size of the rest of the line."""
+        sizes = []
+
+        def trailer(size):
+            sizes.append(size)
+            return {"size": size}
+
+        written = output.write({"a": 1}, trailer=trailer)
+
+        line = capsys.readouterr().out
+        assert json.loads(line) == {"a": 1, "size": len('{"a":1}\n')}
+        assert sizes == [len('{"a":1}\n')]
+        assert written == len(line)
+
+    def test_text_stream(self, monkeypatch):
+        """Test writing to a stdout without a binary buffer."""
+        stream = io.StringIO()
+        monkeypatch.setattr(sys, "stdout", stream)
+
+        output.write({"a": "é"})
+
+        assert json.loads(stream.getvalue()) == {"a": "é"}
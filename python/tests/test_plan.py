@@ -0,0 +1,137 @@
+"""Tests for batch filesystem check plans."""
+
+import json
+import os
+
+import pytest
+import typer
+from pokerops.monitoring.filesystem import files, plan
+from pokerops.monitoring.plan import Check, groups, load, run
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a log tree with nested directories."""
+    (tmp_path / "logs" / "app").mkdir(parents=True)
+    (tmp_path / "logs" / "a.log").write_bytes(b"x" * 10)
+    (tmp_path / "logs" / "b.txt").write_bytes(b"x" * 2000)
+    (tmp_path / "logs" / "app" / "c.log").write_bytes(b"x" * 3000)
+    (tmp_path / "other").mkdir()
+    (tmp_path / "other" / "d.log").write_bytes(b"d")
+    return tmp_path
+
+
+def write_plan(tmp_path, checks):
+    path = tmp_path / "plan.json"
+    path.write_text(json.dumps(checks))
+    return str(path)
+
+
+class TestLoad:
+    """Tests for plan loading."""
+
+    def test_load_list_and_object(self, tmp_path):
+        """Test that plans may be a list or an object with checks."""
+        checks = [{"path": "/var/log", "mtime": -1, "recursive": False}]
+        assert load(write_plan(tmp_path, checks)) == [Check(path="/var/log", mtime="-1", recursive=False)]
+        assert load(write_plan(tmp_path, {"checks": checks})) == [Check(path="/var/log", mtime="-1", recursive=False)]
+
+    def test_load_names(self, tmp_path):
+        """Test that name takes one pattern or a list of them."""
+        checks = [{"path": "/var/log", "name": "*.log"}, {"path": "/var/log", "name": ["*.log", "*.gz"]}]
+
+        assert [check.name for check in load(write_plan(tmp_path, checks))] == [["*.log"], ["*.log", "*.gz"]]
+
+    @pytest.mark.parametrize(
+        "checks",
+        [
+            {"path": "/var/log"},
+            [{"name": "*.log"}],
+            [{"path": "/", "colour": "red"}],
+            [{"path": "/", "recursive": "no"}],
+            [{"path": "/", "name": ["*.log", 1]}],
+            [{"path": "/", "size": 100}],
+            [{"path": "/", "mtime": 1.5}],
+            [{"path": None}],
+        ],
+    )
+    def test_load_rejects_malformed_plans(self, tmp_path, checks):
+        """Test that malformed plans are rejected."""
+        with pytest.raises(ValueError):
+            load(write_plan(tmp_path, checks))
+
+
+class TestRun:
+    """Tests for plan execution."""
+
+    def test_groups_by_resolved_root(self, tree):
+        """Test that checks on the same root are grouped."""
+        checks = [Check(path=str(tree / "logs")), Check(path=str(tree / "other")), Check(path=str(tree / "logs" / "app" / ".."))]
+        assert list(groups(checks).values()) == [[0, 2], [1]]
+
+    def test_walks_each_root_once(self, tree, monkeypatch):
+        """Test that checks sharing a root share one traversal."""
+        calls = []
+        original = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda p: calls.append(p) or original(p))
+        checks = [
+            Check(path=str(tree / "logs"), name=["*.log"]),
+            Check(path=str(tree / "logs"), size="+1k"),
+            Check(path=str(tree / "logs"), recursive=False),
+        ]
+
+        results = run(checks)
+
+        assert len(calls) == 2
+        found = [sorted(os.path.basename(p) for p, _ in result.files or []) for result in results]
+        assert found == [["a.log", "c.log"], ["b.txt", "c.log"], ["a.log", "b.txt"]]
+
+    def test_invalid_check_only_fails_itself(self, tree):
+        """Test that an invalid filter does not affect other checks."""
+        results = run([Check(path=str(tree / "logs"), size="10Q"), Check(path=str(tree / "logs"))])
+
+        assert results[0].files is None
+        assert results[0].errors
+        assert results[1].files is not None
+        assert len(results[1].files) == 3
+
+
+class TestPlan:
+    """Tests for the plan command."""
+
+    def test_matches_individual_files_runs(self, tree, tmp_path, capsys):
+        """Test that every check reports what a separate files() run would."""
+        checks = [
+            {"path": str(tree / "logs"), "name": "*.log", "log_id": "logs"},
+            {"path": str(tree / "other"), "mtime": "-1", "log_id": "other", "location": "elsewhere"},
+        ]
+
+        plan(plan_path=write_plan(tmp_path, checks), location="here", environment="env", function="fn")
+        outputs = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+        files(path=str(tree / "logs"), location="here", environment="env", function="fn", name="*.log", log_id="logs")
+        files(path=str(tree / "other"), location="elsewhere", environment="env", function="fn", mtime="-1", log_id="other")
+        expected = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+        assert [o["filesystem"] for o in outputs] == [e["filesystem"] for e in expected]
+        assert [o["fields"] for o in outputs] == [e["fields"] for e in expected]
+
+    def test_failed_check_exits_with_error(self, tree, tmp_path, capsys):
+        """Test that failing checks are reported after all checks ran."""
+        checks = [{"path": str(tree / "missing")}, {"path": str(tree / "other")}]
+
+        with pytest.raises(typer.Exit) as exc_info:
+            plan(plan_path=write_plan(tmp_path, checks), location="", environment="", function="")
+
+        assert exc_info.value.exit_code == 1
+        outputs = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert "find command failed" in outputs[0]["filesystem"]["error"]
+        assert outputs[1]["filesystem"]["count"] == 1
+
+    def test_invalid_plan(self, tmp_path, capsys):
+        """Test that unreadable plans are reported."""
+        with pytest.raises(typer.Exit):
+            plan(plan_path=str(tmp_path / "missing.json"), location="", environment="", function="")
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["filesystem"]["error"].startswith("Invalid plan")
@@ -0,0 +1,189 @@
+"""Tests for the resident check scheduler."""
+
+import json
+import threading
+import time
+
+import pytest
+import typer
+from pokerops.monitoring.serve import Job, Scheduler, load, serve, splay
+
+
+def write_schedule(tmp_path, checks):
+    path = tmp_path / "schedule.json"
+    path.write_text(json.dumps(checks))
+    return str(path)
+
+
+class TestLoad:
+    """Tests for schedule loading."""
+
+    def test_load_checks(self, tmp_path):
+        """Test that checks get ids, intervals and string options."""
+        checks = {
+            "checks": [{"check": "ntp", "interval": 60}, {"check": "files", "interval": 300, "id": "logs", "path": "/var/log", "mtime": -1, "mount_timeout": 2}]
+        }
+
+        jobs = load(write_schedule(tmp_path, checks))
+
+        assert jobs == [
+            Job("ntp-0", "ntp", 60.0, {"peer": ["time.cloudflare.com"], "timeout": 5.0}),
+            Job("logs", "files", 300.0, {"path": "/var/log", "mtime": "-1", "mount_timeout": 2.0}),
+        ]
+
+    def test_load_patterns(self, tmp_path):
+        """Test that name and exclude options keep their patterns, one or several."""
+        checks = [{"check": "files", "interval": 60, "path": "/var/log", "name": ["*.log", "*.gz"], "exclude": "*.tmp", "exclude_dir": ["cache"]}]
+
+        (job,) = load(write_schedule(tmp_path, checks))
+
+        assert job.options == {"path": "/var/log", "name": ["*.log", "*.gz"], "exclude": ["*.tmp"], "exclude_dir": ["cache"]}
+
+    @pytest.mark.parametrize(
+        "checks",
+        [
+            {"check": "ntp", "interval": 60},
+            [{"check": "disk", "interval": 60}],
+            [{"check": "ntp"}],
+            [{"check": "ntp", "interval": 0}],
+            [{"check": "ntp", "interval": 60, "path": "/"}],
+            [{"check": "files", "interval": 60}],
+            [{"check": "files", "interval": 60, "path": "/", "recursive": "yes"}],
+            [{"check": "ntp", "interval": 60, "timeout": "soon"}],
+            [{"check": "files", "interval": 60, "path": "/", "mount_timeout": -1}],
+            [{"check": "files", "interval": 60, "path": "/", "name": ["*.log", 7]}],
+            [{"check": "files", "interval": 60, "path": "/", "exclude": {"glob": "*.tmp"}}],
+            [{"check": "files", "interval": 60, "path": "/", "mtime": ["+7"]}],
+            [{"check": "ntp", "interval": 60, "id": "a"}, {"check": "ntp", "interval": 60, "id": "a"}],
+        ],
+    )
+    def test_load_rejects_malformed_schedules(self, tmp_path, checks):
+        """Test that malformed schedules are rejected."""
+        with pytest.raises(ValueError):
+            load(write_schedule(tmp_path, checks))
+
+
+class TestSplay:
+    """Tests for per-host splay."""
+
+    def test_splay_is_deterministic_and_bounded(self):
+        """Test that splay depends only on host and check, within the interval."""
+        job = Job("logs", "files", 300.0, {})
+        offsets = {splay(f"host-{n}", job) for n in range(50)}
+
+        assert splay("host-1", job) == splay("host-1", job)
+        assert all(0 <= offset < 300 for offset in offsets)
+        assert len(offsets) == 50
+
+
+class TestScheduler:
+    """Tests for the scheduler loop."""
+
+    def test_runs_jobs_on_their_intervals(self):
+        """Test that every job runs and results are emitted."""
+        emitted = []
+        jobs = [Job("a", "ntp", 0.01, {}), Job("b", "ntp", 0.01, {})]
+        scheduler = Scheduler(jobs, run=lambda job: {"id": job.id}, emit=emitted.append)
+
+        scheduler.loop(iterations=6)
+
+        assert len(emitted) == 6
+        assert {data["id"] for data in emitted} == {"a", "b"}
+
+    def test_overlapping_runs_are_skipped(self):
+        """Test that a slow job never runs concurrently with itself."""
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def run(job):
+            with lock:
+                overlaps.append(job.id in active)
+                active.append(job.id)
+            time.sleep(0.05)
+            with lock:
+                active.remove(job.id)
+            return {"id": job.id}
+
+        scheduler = Scheduler([Job("slow", "ntp", 0.005, {})], run=run, emit=lambda data: None)
+        thread = threading.Thread(target=scheduler.loop)
+        thread.start()
+        time.sleep(0.2)
+        scheduler.stop()
+        thread.join()
+
+        assert overlaps
+        assert not any(overlaps)
+        assert scheduler.skipped["slow"] > 0
+
+    def test_failing_job_emits_error(self):
+        """Test that exceptions become error documents."""
+        emitted = []
+
+        def run(job):
+            raise RuntimeError("boom")
+
+        Scheduler([Job("bad", "ntp", 1.0, {})], run=run, emit=emitted.append).loop(iterations=1)
+
+        assert emitted == [{"serve": {"check": "bad", "error": "RuntimeError: boom"}}]
+
+
+class TestServe:
+    """Tests for the serve command."""
+
+    def test_serve_runs_checks(self, tmp_path, ntp_server, capsys):
+        """Test that ntp and files checks print their command documents."""
+        (tmp_path / "logs").mkdir()
+        (tmp_path / "logs" / "a.log").write_bytes(b"abc")
+        server = ntp_server(offset=-0.5)
+        checks = [
+            {"check": "ntp", "interval": 60, "peer": server.address},
+            {"check": "files", "interval": 60, "path": str(tmp_path / "logs"), "log_id": "logs", "location": "elsewhere"},
+        ]
+
+        serve(write_schedule(tmp_path, checks), location="here", environment="env", function="fn", splay=False, iterations=2)
+
+        outputs = sorted((json.loads(line) for line in capsys.readouterr().out.splitlines()), key=lambda o: o["fields"]["log"]["description"])
+        assert [o["fields"]["log"]["description"] for o in outputs] == ["logs", "ntp-drift"]
+        assert outputs[0]["filesystem"]["count"] == 1
+        assert outputs[0]["fields"]["location"] == "elsewhere"
+        assert outputs[1]["ntp_peer_address"] == server.address
+        assert outputs[1]["ntp_peer_offset"] == pytest.approx(0.5, abs=0.05)
+        assert outputs[1]["fields"]["location"] == "here"
+        assert server.requests == 1
+
+    def test_serve_skips_unresponsive_mounts(self, tmp_path, monkeypatch, capsys):
+        """Test that files checks skip hung mounts under their path instead of blocking on them."""
+        from pokerops.monitoring import mounts
+
+        (tmp_path / "logs" / "nfs").mkdir(parents=True)
+        (tmp_path / "logs" / "a.log").write_bytes(b"abc")
+        (tmp_path / "logs" / "nfs" / "b.log").write_bytes(b"abc")
+        hung = str(tmp_path / "logs" / "nfs")
+        monkeypatch.setattr(mounts, "table", lambda path=mounts.MOUNTINFO: [mounts.Mount(hung, "nas:/export", "nfs")])
+        monkeypatch.setattr(mounts, "PROBE", "import time\ntime.sleep(60)\n")
+        checks = [{"check": "files", "interval": 60, "path": str(tmp_path / "logs"), "mount_timeout": 0.1}]
+
+        serve(write_schedule(tmp_path, checks), location="", environment="", function="", splay=False, iterations=1)
+
+        output = json.loads(capsys.readouterr().out)["filesystem"]
+        assert [f["path"] for f in output["files"]] == [str(tmp_path / "logs" / "a.log")]
+        assert [m["path"] for m in output["unresponsive"]] == [hung]
+
+    def test_serve_reports_ntp_errors(self, tmp_path, ntp_server, capsys):
+        """Test that a failing ntp check is reported without stopping the scheduler."""
+        server = ntp_server(respond=False)
+        checks = [{"check": "ntp", "interval": 60, "peer": [server.address], "timeout": 0.1}]
+
+        serve(write_schedule(tmp_path, checks), location="", environment="", function="", splay=False, iterations=1)
+
+        output = json.loads(capsys.readouterr().out)
+        assert "No NTP peer replied" in output["error"]
+
+    def test_invalid_schedule(self, tmp_path, capsys):
+        """Test that unreadable schedules are reported."""
+        with pytest.raises(typer.Exit):
+            serve(str(tmp_path / "missing.json"), location="", environment="", function="")
+
+        output = json.loads(capsys.readouterr().out)
+        assert output["serve"]["error"].startswith("Invalid schedule")
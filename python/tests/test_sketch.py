@@ -0,0 +1,67 @@
+"""Tests for DDSketch quantile estimates."""
+
+import random
+
+import pytest
+from pokerops.monitoring.sketch import DDSketch
+
+
+def exact(values, q):
+    """The value at rank q * (n - 1), as DDSketch defines quantiles."""
+    return sorted(values)[int(q * (len(values) - 1))]
+
+
+class TestDDSketch:
+    """Test quantile estimates and merging."""
+
+    @pytest.fixture
+    def values(self):
+        generator = random.Random(7)
+        return [generator.lognormvariate(3, 2) for _ in range(20000)]
+
+    @pytest.mark.parametrize("q", [0.0, 0.5, 0.95, 0.99, 1.0])
+    def test_relative_accuracy(self, values, q):
+        """Test that every quantile is within the relative accuracy of the exact one."""
+        sketch = DDSketch(0.01)
+        for value in values:
+            sketch.add(value)
+
+        assert sketch.quantile(q) == pytest.approx(exact(values, q), rel=0.01)
+
+    def test_bounded(self, values):
+        """Test that the number of buckets follows the value range, not the count."""
+        sketch = DDSketch(0.01)
+        for value in values:
+            sketch.add(value)
+
+        assert len(sketch.bins) < 1000
+        assert (sketch.count, sketch.max) == (len(values), max(values))
+
+    def test_zero(self):
+        """Test that zero durations are counted apart and reported as zero."""
+        sketch = DDSketch()
+        for value in [0, 0, 0, 10]:
+            sketch.add(value)
+
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1.0) == pytest.approx(10, rel=0.01)
+
+    def test_empty(self):
+        """Test that an empty sketch has no quantiles."""
+        assert DDSketch().quantile(0.5) is None
+
+    def test_merge(self, values):
+        """Test that merged sketches equal one sketch of all values."""
+        whole, first, second = DDSketch(), DDSketch(), DDSketch()
+        for index, value in enumerate(values):
+            whole.add(value)
+            (first if index % 2 else second).add(value)
+
+        first.merge(second)
+
+        assert (first.bins, first.zero, first.count, first.max) == (whole.bins, whole.zero, whole.count, whole.max)
+
+    def test_merge_other_accuracy(self):
+        """Test that sketches of different accuracy are not merged."""
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
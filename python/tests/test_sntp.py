@@ -0,0 +1,131 @@
+"""Tests for SNTP queries and source selection."""
+
+import ntplib
+import pytest
+from pokerops.monitoring.sntp import MAXDISP, PORT, Reply, clock_filter, endpoint, parse, query_all, select
+
+
+def reply(offset, delay=0.02, root_dispersion=0.0):
+    return Reply(offset=offset, delay=delay, stratum=2, root_delay=0.0, root_dispersion=root_dispersion, tx_time=0.0)
+
+
+class TestEndpoint:
+    """Tests for peer address parsing."""
+
+    @pytest.mark.parametrize(
+        "peer,expected",
+        [
+            ("time.example.com", ("time.example.com", PORT)),
+            ("127.0.0.1:1123", ("127.0.0.1", 1123)),
+            ("[::1]:1123", ("::1", 1123)),
+            ("[::1]", ("::1", PORT)),
+            ("::1", ("::1", PORT)),
+        ],
+    )
+    def test_endpoint(self, peer, expected):
+        """Test host and port splitting."""
+        assert endpoint(peer) == expected
+
+
+class TestParse:
+    """Tests for reply decoding."""
+
+    def packet(self, **fields):
+        packet = ntplib.NTPPacket(version=3, mode=fields.pop("mode", 4), tx_timestamp=100.0)  # pyright: ignore[reportArgumentType]
+        packet.stratum = 2
+        packet.recv_timestamp = 99.5
+        for key, value in fields.items():
+            setattr(packet, key, value)
+        return packet.to_data()
+
+    def test_parse(self):
+        """Test that offset and delay follow the NTP on-wire equations."""
+        data = bytearray(self.packet())
+        data[24:32] = ntplib.NTPPacket(tx_timestamp=99.0).to_data()[40:48]  # pyright: ignore[reportArgumentType]
+
+        result = parse(bytes(data), 100.5)
+
+        assert result.offset == pytest.approx(0.0)
+        assert result.delay == pytest.approx(1.0)
+        assert result.stratum == 2
+
+    @pytest.mark.parametrize("fields", [{"mode": 3}, {"stratum": 0}, {"leap": 3}])
+    def test_parse_rejects_unusable_replies(self, fields):
+        """Test that client-mode, kiss-of-death and unsynchronized replies are rejected."""
+        with pytest.raises(ntplib.NTPException):
+            parse(self.packet(**fields), 100.5)
+
+
+class TestClockFilter:
+    """Tests for the burst clock filter."""
+
+    def test_keeps_minimum_delay_sample(self):
+        """Test that the least delayed sample is kept, with the RMS jitter of the others."""
+        samples = [(10.0, reply(0.3, delay=0.5)), (10.0, reply(0.1, delay=0.01)), (10.0, reply(0.2, delay=0.2))]
+
+        result = clock_filter(samples, sent=3, now=10.0)
+
+        assert result.offset == 0.1
+        assert result.jitter == pytest.approx(((0.1**2 + 0.2**2) / 2) ** 0.5)
+        assert result.dispersion == pytest.approx(0.0)
+
+    def test_lost_samples_add_dispersion(self):
+        """Test that missing replies are charged MAXDISP in the weighted dispersion."""
+        result = clock_filter([(10.0, reply(0.1))], sent=2, now=10.0)
+
+        assert result.jitter == 0.0
+        assert result.dispersion == pytest.approx(MAXDISP / 4)
+        assert result.distance > reply(0.1).distance
+
+
+class TestSelect:
+    """Tests for Marzullo source selection."""
+
+    def test_single_source(self):
+        """Test that one source is its own consensus."""
+        consensus = select([reply(0.25)])
+
+        assert consensus is not None
+        assert consensus.offset == pytest.approx(0.25)
+        assert consensus.survivors == [0]
+
+    def test_falseticker_is_excluded(self):
+        """Test that a source outside the majority intersection does not survive."""
+        consensus = select([reply(0.10), reply(5.0), reply(0.11), reply(0.105)])
+
+        assert consensus is not None
+        assert consensus.survivors == [0, 2, 3]
+        assert 0.09 <= consensus.low <= consensus.high <= 0.12
+        assert consensus.offset == pytest.approx(0.105, abs=0.005)
+
+    def test_weights_by_root_distance(self):
+        """Test that more accurate sources weigh more in the combined offset."""
+        consensus = select([reply(0.0, delay=0.002), reply(0.01, delay=0.2)])
+
+        assert consensus is not None
+        assert consensus.offset < 0.001
+
+    @pytest.mark.parametrize("replies", [[], [reply(0.0), reply(1.0)], [reply(0.0), reply(1.0), reply(2.0)]])
+    def test_no_majority(self, replies):
+        """Test that disjoint sources produce no consensus."""
+        assert select(replies) is None
+
+
+class TestQueryAll:
+    """Tests for concurrent peer queries."""
+
+    def test_results_follow_peer_order(self, ntp_server):
+        """Test that results line up with the requested peers."""
+        servers = [ntp_server(offset=1.0), ntp_server(respond=False), ntp_server(stratum=0)]
+
+        results = query_all([s.address for s in servers], timeout=0.3)
+
+        assert [r.address for r in results] == [s.address for s in servers]
+        assert results[0].reply is not None
+        assert results[0].reply.offset == pytest.approx(1.0, abs=0.05)
+        assert results[1].reply is None
+        assert results[1].error is not None
+        assert results[1].error.startswith("No response")
+        assert results[2].reply is None
+        assert results[2].error is not None
+        assert "Kiss-of-death" in results[2].error
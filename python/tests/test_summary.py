@@ -0,0 +1,62 @@
+"""Tests for filesystem scan aggregates."""
+
+from pokerops.monitoring.summary import AGE_BUCKETS, SIZE_BUCKETS, Histogram, Summary
+
+
+def test_histogram_inclusive_upper_bounds():
+    """Test that values land in the first bucket whose bound they do not exceed."""
+    histogram = Histogram(SIZE_BUCKETS)
+    for value in (0, 1, 1024, 1025, 10**12):
+        histogram.add(value)
+
+    counts = histogram.to_dict()
+    assert counts["0"] == 1
+    assert counts["1K"] == 2
+    assert counts["10K"] == 1
+    assert counts["inf"] == 1
+    assert sum(counts.values()) == 5
+
+
+def test_summary_totals():
+    """Test count, bytes and age histogram totals."""
+    summary = Summary(now=1000000.0)
+    summary.add("/a", size=10, mtime=1000000.0 - 60)
+    summary.add("/b", size=20, mtime=1000000.0 - 2 * 86400)
+
+    data = summary.to_dict()
+    assert data["count"] == 2
+    assert data["bytes"] == 30
+    assert data["age_histogram"]["1h"] == 1
+    assert data["age_histogram"]["7d"] == 1
+    assert list(data["age_histogram"]) == [label for label, _ in AGE_BUCKETS]
+
+
+def test_summary_top_n_is_bounded():
+    """Test that only the N largest and oldest files are kept, in order."""
+    summary = Summary(now=1000.0, top=3)
+    for index in range(100):
+        summary.add(f"/f{index}", size=index, mtime=float(index))
+
+    assert [f["size"] for f in summary.largest()] == [99, 98, 97]
+    assert [f["path"] for f in summary.oldest()] == ["/f0", "/f1", "/f2"]
+    assert summary.oldest()[0]["age"] == 1000
+    assert len(summary._largest) == 3
+    assert len(summary._oldest) == 3
+
+
+def test_summary_without_top():
+    """Test that top-N lists can be disabled."""
+    summary = Summary(now=0.0, top=0)
+    summary.add("/a", size=1, mtime=0.0)
+
+    assert summary.largest() == []
+    assert summary.oldest() == []
+
+
+def test_summary_count_only():
+    """Test that count-only summaries omit stat based aggregates."""
+    summary = Summary(now=0.0)
+    summary.add("/a")
+    summary.add("/b")
+
+    assert summary.to_dict(stat=False) == {"count": 2}
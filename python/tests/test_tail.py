@@ -0,0 +1,121 @@
+"""Tests for reading logs from where the previous run stopped."""
+
+import os
+
+import pytest
+from pokerops.monitoring.tail import Tail
+
+
+def read(log, state_dir):
+    """Lines a run reads, and the tail once its position is stored."""
+    tail = Tail.open(str(log), state_dir, "test")
+    data = b"".join(tail.chunks())
+    tail.save()
+    return data, tail
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = tmp_path / "mongod.log"
+    log.write_bytes(b"one\ntwo\n")
+    return log
+
+
+class TestTail:
+    """Test incremental reads of one log."""
+
+    def test_appended(self, log, tmp_path):
+        """Test that a second run only reads the appended lines."""
+        assert read(log, tmp_path)[0] == b"one\ntwo\n"
+        with open(log, "ab") as f:
+            f.write(b"three\n")
+
+        data, tail = read(log, tmp_path)
+
+        assert data == b"three\n"
+        assert (tail.bytes, tail.rotated, tail.truncated) == (6, False, False)
+
+    def test_partial_line(self, log, tmp_path):
+        """Test that a line still being written is left for the next run."""
+        with open(log, "ab") as f:
+            f.write(b"thr")
+        assert read(log, tmp_path)[0] == b"one\ntwo\n"
+        with open(log, "ab") as f:
+            f.write(b"ee\n")
+
+        assert read(log, tmp_path)[0] == b"three\n"
+
+    def test_chunks(self, log, tmp_path, monkeypatch):
+        """Test that lines crossing chunk boundaries are yielded whole."""
+        monkeypatch.setattr(Tail, "CHUNK", 3)
+        log.write_bytes(b"a\nlonger line\nb\n")
+
+        chunks = list(Tail.open(str(log), None, "test").chunks())
+
+        assert b"".join(chunks) == b"a\nlonger line\nb\n"
+        assert all(chunk.endswith(b"\n") for chunk in chunks)
+
+    def test_stateless(self, log):
+        """Test that without a state directory the whole log is read every run."""
+        assert read(log, None)[0] == read(log, None)[0] == b"one\ntwo\n"
+
+    def test_per_name(self, log, tmp_path):
+        """Test that every kind of check keeps its own position."""
+        read(log, tmp_path)
+
+        assert b"".join(Tail.open(str(log), tmp_path, "other").chunks()) == b"one\ntwo\n"
+
+    def test_rotated(self, log, tmp_path):
+        """Test that the rest of a log renamed away is read before the new log."""
+        read(log, tmp_path)
+        with open(log, "ab") as f:
+            f.write(b"three")
+        os.rename(log, tmp_path / "mongod.log.1")
+        log.write_bytes(b"four\n")
+
+        data, tail = read(log, tmp_path)
+
+        assert data == b"three\nfour\n"
+        assert tail.rotated
+
+    def test_rotated_away(self, log, tmp_path):
+        """Test that a new log is read from its start when the old one is gone."""
+        read(log, tmp_path)
+        os.rename(log, tmp_path / "elsewhere")
+        log.write_bytes(b"four\n")
+
+        data, tail = read(log, tmp_path)
+
+        assert data == b"four\n"
+        assert tail.rotated
+
+    def test_copytruncate(self, log, tmp_path):
+        """Test that a log truncated in place is read again from its start."""
+        read(log, tmp_path)
+        log.write_bytes(b"new\n")
+
+        data, tail = read(log, tmp_path)
+
+        assert data == b"new\n"
+        assert tail.truncated and not tail.rotated
+
+    def test_copytruncate_refilled(self, log, tmp_path):
+        """Test that a truncated log which grew past the old offset is noticed by its first bytes."""
+        read(log, tmp_path)
+        log.write_bytes(b"fresh line\n")
+
+        data, tail = read(log, tmp_path)
+
+        assert data == b"fresh line\n"
+        assert tail.truncated
+
+    def test_unsaved(self, log, tmp_path):
+        """Test that the position only moves once it is saved."""
+        list(Tail.open(str(log), tmp_path, "test").chunks())
+
+        assert read(log, tmp_path)[0] == b"one\ntwo\n"
+
+    def test_missing(self, tmp_path):
+        """Test that a missing log raises OSError."""
+        with pytest.raises(OSError):
+            list(Tail.open(str(tmp_path / "missing"), tmp_path, "test").chunks())
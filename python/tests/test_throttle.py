@@ -0,0 +1,131 @@
+"""Tests for scan throttling and priorities."""
+
+import os
+import platform
+import time
+
+import pytest
+from pokerops.monitoring import throttle
+from pokerops.monitoring.throttle import Throttle, prioritize
+
+
+class Clock:
+    """Monotonic clock advanced by hand and by the sleeps of the throttle."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestThrottle:
+    """Test the rate limit and time budget."""
+
+    def test_unlimited(self):
+        """Test that a throttle without limits never waits or truncates."""
+        clock = Clock()
+        limit = Throttle(clock=clock, sleep=clock.sleep)
+
+        assert all(limit.acquire() for _ in range(1000))
+        assert limit.truncated is False
+        assert clock.slept == []
+
+    def test_rate(self):
+        """Test that operations beyond the burst are paced at the rate."""
+        clock = Clock()
+        limit = Throttle(rate=100, clock=clock, sleep=clock.sleep)
+
+        for _ in range(30):
+            assert limit.acquire()
+
+        # 10 operations fit the burst, the other 20 take 10ms each
+        assert len(clock.slept) == 20
+        assert sum(clock.slept) == pytest.approx(0.2)
+
+    def test_budget(self):
+        """Test that the throttle truncates once the budget has run out, and stays truncated."""
+        clock = Clock()
+        limit = Throttle(budget=0.05, clock=clock, sleep=clock.sleep)
+
+        assert limit.acquire()
+        clock.now += 0.06
+
+        assert limit.acquire() is False
+        assert limit.truncated is True
+        assert limit.acquire() is False
+
+    def test_budget_refuses_wait_past_deadline(self):
+        """Test that an operation whose wait would overrun the budget is refused without waiting."""
+        clock = Clock()
+        limit = Throttle(rate=1, budget=0.5, clock=clock, sleep=clock.sleep)
+        assert limit.acquire()
+
+        assert limit.acquire() is False
+        assert clock.slept == []
+
+    def test_waits(self):
+        """Test that the default clock paces operations in real time."""
+        limit = Throttle(rate=1000)
+        start = time.monotonic()
+
+        for _ in range(200):
+            assert limit.acquire()
+
+        assert time.monotonic() - start > 0.05
+
+
+class TestPrioritize:
+    """Test I/O and CPU priorities."""
+
+    def test_nothing_requested(self):
+        """Test that no priority is changed by default."""
+        assert prioritize() == []
+
+    def test_nice(self, monkeypatch):
+        """Test that the nice level is set on the calling thread."""
+        calls = []
+        monkeypatch.setattr(os, "setpriority", lambda *args: calls.append(args), raising=False)
+
+        assert prioritize(nice=10) == []
+        assert calls == [(os.PRIO_PROCESS, 0, 10)]
+
+    def test_failures_reported(self, monkeypatch):
+        """Test that priorities that cannot be set are reported instead of raised."""
+
+        def refuse(*_):
+            raise OSError(13, "Permission denied")
+
+        monkeypatch.setattr(os, "setpriority", refuse, raising=False)
+        monkeypatch.setattr(platform, "machine", lambda: "unknown")
+
+        failures = prioritize(idle=True, nice=-5)
+
+        assert len(failures) == 2
+        assert "idle I/O priority" in failures[0]
+        assert "nice level -5" in failures[1]
+
+    @pytest.mark.skipif(platform.machine() not in throttle.IOPRIO_SET or platform.system() != "Linux", reason="ioprio_set is Linux only")
+    def test_io_idle(self):
+        """Test moving a thread to the idle I/O class."""
+        import threading
+
+        errors = []
+
+        def run():
+            try:
+                throttle.io_idle()
+            except OSError as e:
+                errors.append(e)
+
+        # A separate thread, so the rest of the test run keeps its priority
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+        assert errors == []
@@ -0,0 +1,71 @@
+"""Tests for the adjtimex(2) binding."""
+
+import ctypes
+import sys
+
+import pytest
+from pokerops.monitoring import timex
+
+
+def status(**fields):
+    """Build a Timex struct as a synchronized kernel would report it, overridden by fields"""
+    value = timex.Timex(status=timex.STA_PLL, maxerror=1500, esterror=20, offset=-250, freq=655360, jitter=40, constant=7)
+    for name, field in fields.items():
+        setattr(value, name, field)
+    return value
+
+
+class TestTimex:
+    """Test decoding of struct timex."""
+
+    def test_struct_size(self):
+        """Test that the struct matches the kernel layout on 64-bit Linux."""
+        if ctypes.sizeof(ctypes.c_long) != 8:
+            pytest.skip("layout checked on LP64 only")
+        assert ctypes.sizeof(timex.Timex) == 208
+
+    def test_to_dict_units(self):
+        """Test that offsets are converted to seconds and frequency to ppm."""
+        data = timex.to_dict(timex.TIME_OK, status())
+
+        assert data["offset"] == pytest.approx(-250e-6)
+        assert data["frequency"] == pytest.approx(10.0)
+        assert data["maxerror"] == pytest.approx(0.0015)
+        assert data["esterror"] == pytest.approx(0.00002)
+        assert data["jitter"] == pytest.approx(40e-6)
+        assert data["constant"] == 7
+        assert data["flags"] == ["PLL"]
+        assert data["state"] == "ok"
+        assert data["synchronized"] is True
+
+    def test_to_dict_nanoseconds(self):
+        """Test that STA_NANO switches offset and jitter to nanoseconds."""
+        data = timex.to_dict(timex.TIME_OK, status(status=timex.STA_PLL | timex.STA_NANO, offset=-250))
+
+        assert data["offset"] == pytest.approx(-250e-9)
+        assert data["jitter"] == pytest.approx(40e-9)
+        assert data["flags"] == ["PLL", "NANO"]
+
+    @pytest.mark.parametrize(
+        ("state", "fields"),
+        [
+            (timex.TIME_ERROR, {}),
+            (timex.TIME_OK, {"status": timex.STA_UNSYNC}),
+            (timex.TIME_OK, {"maxerror": timex.MAXERROR_LIMIT}),
+        ],
+    )
+    def test_unsynchronized(self, state, fields):
+        """Test each of the kernel's unsynchronized indications."""
+        assert timex.synchronized(state, status(**fields)) is False
+
+    def test_unknown_state(self):
+        """Test that an unknown clock state is reported by number."""
+        assert timex.to_dict(42, status())["state"] == "42"
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="adjtimex is Linux only")
+    def test_read(self):
+        """Test reading the live kernel clock status."""
+        state, value = timex.read()
+
+        assert state in timex.STATES
+        assert isinstance(value.status, int)
@@ -0,0 +1,28 @@
+"""Tests for shared helpers."""
+
+from unittest.mock import patch
+
+import pytest
+from pokerops.monitoring.tools import atomic_write
+
+
+def test_atomic_write_creates_parents(tmp_path):
+    """Test that atomic_write creates missing parent directories."""
+    target = tmp_path / "state" / "file.bin"
+
+    atomic_write(target, b"data")
+
+    assert target.read_bytes() == b"data"
+
+
+def test_atomic_write_keeps_old_contents_on_failure(tmp_path):
+    """Test that a failed write leaves the previous file and no temporary files."""
+    target = tmp_path / "file.bin"
+    atomic_write(target, b"old")
+
+    with patch("pokerops.monitoring.tools.os.replace", side_effect=OSError("boom")):
+        with pytest.raises(OSError):
+            atomic_write(target, b"new")
+
+    assert target.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["file.bin"]
@@ -0,0 +1,68 @@
+"""Tests for du-style usage accounting."""
+
+import os
+import stat
+
+from pokerops.monitoring.usage import Usage
+
+
+def entry(kind: int = stat.S_IFREG, blocks: int = 8, ino: int = 1, nlink: int = 1) -> os.stat_result:
+    """A stat result with the fields usage accounting reads."""
+    result = [kind | 0o644, ino, 1, nlink, 0, 0, blocks * 512, 0, 0, 0]
+    return os.stat_result(result, {"st_blocks": blocks})
+
+
+class TestUsage:
+    """Test rolling usage up to a depth."""
+
+    def test_rollup(self):
+        """Test that entries below the depth count toward their ancestor at the depth."""
+        usage = Usage("/r", depth=1)
+        usage.add("/r", entry(stat.S_IFDIR, blocks=1, ino=1))
+        usage.add("/r/a", entry(stat.S_IFDIR, blocks=1, ino=2))
+        usage.add("/r/a/b", entry(stat.S_IFDIR, blocks=1, ino=3))
+        usage.add("/r/a/b/f", entry(blocks=10, ino=4))
+        usage.add("/r/g", entry(blocks=2, ino=5))
+
+        assert usage.totals == {"": [15 * 512, 2], "a": [12 * 512, 1]}
+        assert usage.to_dict(top=5) == {
+            "depth": 1,
+            "bytes": 15 * 512,
+            "files": 2,
+            "directories": 3,
+            "hardlinks": 0,
+            "top": [{"path": "/r/a", "bytes": 12 * 512, "files": 1}],
+        }
+
+    def test_depth_zero(self):
+        """Test that depth 0 only keeps the totals."""
+        usage = Usage("/r", depth=0)
+        usage.add("/r/a/f", entry())
+
+        assert usage.totals == {"": [8 * 512, 1]}
+        assert usage.heaviest(10) == []
+
+    def test_hardlinks_counted_once(self):
+        """Test that further links to an inode are not counted again."""
+        usage = Usage("/r", depth=1)
+        usage.add("/r/a/f", entry(ino=7, nlink=2))
+        usage.add("/r/b/f", entry(ino=7, nlink=2))
+
+        assert usage.to_dict()["bytes"] == 8 * 512
+        assert usage.hardlinks == 1
+        assert "b" not in usage.totals
+
+    def test_top(self):
+        """Test that only the heaviest directories are listed, heaviest first."""
+        usage = Usage("/r", depth=2)
+        for index, name in enumerate(["a", "b", "c"]):
+            usage.add(f"/r/{name}/f", entry(blocks=index + 1, ino=index))
+
+        assert [d["path"] for d in usage.heaviest(2)] == ["/r/c", "/r/b"]
+
+    def test_root_file(self):
+        """Test that a root which is a file is accounted."""
+        usage = Usage("/r/f", depth=1)
+        usage.add("/r/f", entry())
+
+        assert usage.to_dict()["files"] == 1
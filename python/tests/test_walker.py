@@ -0,0 +1,545 @@
+"""Tests for the native directory walker."""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from pokerops.monitoring.filesystem import scan
+from pokerops.monitoring.throttle import Throttle
+from pokerops.monitoring.walker import DirectoryCache, Matcher, PathEntry, Predicate, Walker
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Create a small tree with files of varying sizes and ages.
+
+    Structure:
+        tmp_path/
+        ├── a.log          (0 bytes)
+        ├── b.txt          (1000 bytes, 3 days old)
+        ├── link -> a.log
+        └── sub/
+            ├── c.log      (2048 bytes)
+            └── deep/
+                └── d.log  (10 bytes, 10 days old)
+    """
+    now = time.time()
+    (tmp_path / "a.log").write_bytes(b"")
+    (tmp_path / "b.txt").write_bytes(b"x" * 1000)
+    os.utime(tmp_path / "b.txt", (now - 3 * 86400 - 60, now - 3 * 86400 - 60))
+    (tmp_path / "link").symlink_to(tmp_path / "a.log")
+    (tmp_path / "sub" / "deep").mkdir(parents=True)
+    (tmp_path / "sub" / "c.log").write_bytes(b"x" * 2048)
+    (tmp_path / "sub" / "deep" / "d.log").write_bytes(b"x" * 10)
+    os.utime(tmp_path / "sub" / "deep" / "d.log", (now - 10 * 86400 - 60, now - 10 * 86400 - 60))
+    return tmp_path
+
+
+def native(root, maxdepth=None, **kwargs):
+    return [entry.path for entry in Walker(root, predicate=Predicate(**kwargs), maxdepth=maxdepth)]
+
+
+def external(root, *args):
+    result = subprocess.run(["find", str(root), *args], capture_output=True, text=True, check=True)
+    return result.stdout.splitlines()
+
+
+requires_find = pytest.mark.skipif(shutil.which("find") is None, reason="find binary not available")
+
+
+class TestPredicate:
+    """Tests for find expression semantics."""
+
+    def test_mtime_truncates_to_days(self):
+        """Test that ages are compared in whole days like find."""
+        now = 10 * 86400.0
+        entry = PathEntry("x", os.stat_result((0o100644, 0, 0, 1, 0, 0, 0, 0, now - 86400 * 1.5, 0)))
+        assert Predicate(mtime="1", now=now).match(entry)
+        assert Predicate(mtime="-2", now=now).match(entry)
+        assert not Predicate(mtime="-1", now=now).match(entry)
+        assert not Predicate(mtime="+1", now=now).match(entry)
+
+    def test_size_rounds_up_to_units(self):
+        """Test that sizes are rounded up to whole units like find."""
+        entry = PathEntry("x", os.stat_result((0o100644, 0, 0, 1, 0, 0, 1, 0, 0, 0)))
+        assert Predicate(size="1k").match(entry)
+        assert not Predicate(size="-1k").match(entry)
+        assert Predicate(size="1").match(entry)
+        assert Predicate(size="+0c").match(entry)
+
+    def test_invalid_arguments(self):
+        """Test that malformed arguments are rejected."""
+        with pytest.raises(ValueError):
+            Predicate(mtime="abc")
+        with pytest.raises(ValueError):
+            Predicate(size="10Q")
+        with pytest.raises(ValueError):
+            Predicate(type="x")
+
+    def test_stat_free_without_time_or_size(self):
+        """Test that name and type tests do not require stat."""
+        assert not Predicate(type="f", name="*.log").needs_stat
+        assert Predicate(size="+1k").needs_stat
+
+    def test_several_names(self):
+        """Test that an entry matches when any name pattern does."""
+        predicate = Predicate(name=["*.log", "*.txt"])
+        assert predicate.match(PathEntry("/var/log/a.log"))
+        assert predicate.match(PathEntry("/var/log/b.txt"))
+        assert not predicate.match(PathEntry("/var/log/c.gz"))
+
+    def test_exclude(self):
+        """Test that excluded names and paths never match."""
+        predicate = Predicate(name="*.log", exclude=["debug*", "/var/log/old/*"])
+        assert predicate.match(PathEntry("/var/log/a.log"))
+        assert not predicate.match(PathEntry("/var/log/debug.log"))
+        assert not predicate.match(PathEntry("/var/log/old/a.log"))
+
+
+class TestMatcher:
+    """Tests for compiled glob patterns."""
+
+    def test_names_and_paths(self):
+        """Test that patterns with a separator match the path and the others the name."""
+        matcher = Matcher([".git", "snap*", "/srv/*/cache"])
+        assert matcher.match(PathEntry("/srv/repo/.git"))
+        assert matcher.match(PathEntry("/var/lib/snapshots"))
+        assert matcher.match(PathEntry("/srv/app/cache"))
+        assert not matcher.match(PathEntry("/srv/app/cache/x"))
+        assert not matcher.match(PathEntry("/srv/app/.github"))
+
+    def test_case_sensitive(self):
+        """Test that patterns are case sensitive like find -name."""
+        assert not Matcher(["*.LOG"]).match(PathEntry("/a.log"))
+
+    def test_of(self):
+        """Test that no patterns compile to no matcher."""
+        assert Matcher.of(None) is None
+        assert Matcher.of([]) is None
+        assert Matcher.of("") is None
+        assert Matcher.of("*.log") is not None
+
+
+@requires_find
+class TestWalkerMatchesFind:
+    """Tests that the walker reports the same entries in the same order as find."""
+
+    @pytest.mark.parametrize(
+        ("kwargs", "args"),
+        [
+            ({}, []),
+            ({"type": "f"}, ["-type", "f"]),
+            ({"type": "l"}, ["-type", "l"]),
+            ({"type": "f", "maxdepth": 1}, ["-maxdepth", "1", "-type", "f"]),
+            ({"type": "f", "maxdepth": 2}, ["-maxdepth", "2", "-type", "f"]),
+            ({"type": "f", "name": "*.log"}, ["-type", "f", "-name", "*.log"]),
+            ({"type": "f", "name": ["*.log", "*.txt"]}, ["-type", "f", "(", "-name", "*.log", "-o", "-name", "*.txt", ")"]),
+            ({"type": "f", "exclude": "c.*"}, ["-type", "f", "!", "-name", "c.*"]),
+            ({"type": "f", "mtime": "+2"}, ["-type", "f", "-mtime", "+2"]),
+            ({"type": "f", "mtime": "-1"}, ["-type", "f", "-mtime", "-1"]),
+            ({"type": "f", "mtime": "3"}, ["-type", "f", "-mtime", "3"]),
+            ({"type": "f", "ctime": "-1"}, ["-type", "f", "-ctime", "-1"]),
+            ({"type": "f", "size": "+1k"}, ["-type", "f", "-size", "+1k"]),
+            ({"type": "f", "size": "-1k"}, ["-type", "f", "-size", "-1k"]),
+            ({"type": "f", "size": "2k"}, ["-type", "f", "-size", "2k"]),
+            ({"type": "f", "size": "+1000c"}, ["-type", "f", "-size", "+1000c"]),
+        ],
+    )
+    def test_same_entries_as_find(self, tree, kwargs, args):
+        """Test that walker output matches find output."""
+        assert native(tree, **kwargs) == external(tree, *args)
+
+
+class TestWalker:
+    """Tests for walker traversal and error handling."""
+
+    def test_missing_root(self, tmp_path):
+        """Test that a missing root is reported in find format."""
+        walker = Walker(tmp_path / "missing")
+        assert list(walker) == []
+        assert walker.errors == [f"find: '{tmp_path / 'missing'}': No such file or directory"]
+
+    def test_root_file(self, tree):
+        """Test that a file root reports itself."""
+        assert native(tree / "b.txt", type="f") == [str(tree / "b.txt")]
+
+    def test_maxdepth_zero(self, tree):
+        """Test that maxdepth 0 only reports the root."""
+        assert native(tree, maxdepth=0) == [str(tree)]
+
+    @pytest.mark.skipif(os.geteuid() == 0, reason="root bypasses directory permissions")
+    def test_unreadable_directory(self, tree):
+        """Test that unreadable directories are reported and skipped."""
+        (tree / "sub").chmod(0)
+        try:
+            walker = Walker(tree, predicate=Predicate(type="f"))
+            paths = [entry.path for entry in walker]
+        finally:
+            (tree / "sub").chmod(0o755)
+        assert str(tree / "b.txt") in paths
+        assert walker.errors == [f"find: '{tree / 'sub'}': Permission denied"]
+
+    def test_matches_are_not_restatted(self, tree, monkeypatch):
+        """Test that matching files reuse the stat cached on their directory entry."""
+        calls = []
+        original = os.lstat
+        monkeypatch.setattr(os, "lstat", lambda p, *a, **kw: calls.append(p) or original(p, *a, **kw))
+        monkeypatch.setattr(Path, "stat", lambda *_a, **_kw: pytest.fail("unexpected Path.stat call"))
+
+        error, result = scan(tree, type="f", size="+0c")
+
+        assert error is None
+        assert result is not None
+        assert {p.name for p, _ in result} == {"b.txt", "c.log", "d.log"}
+        assert calls == [str(tree)]
+
+    def test_counters(self, tree):
+        """Test that directories, entries and stat calls of a walk are counted."""
+        walker = Walker(tree, predicate=Predicate(name="*.log", size="+0c"))
+        list(walker)
+
+        assert walker.directories == 3
+        assert walker.entries == 8
+        # The root and the three entries whose name matched
+        assert walker.stat_calls == 4
+
+    def test_counters_without_stat(self, tree):
+        """Test that a walk without stat tests only stats the root."""
+        walker = Walker(tree, predicate=Predicate(type="f"))
+        list(walker)
+
+        assert walker.stat_calls == 1
+
+    def test_counters_parallel(self, tree):
+        """Test that parallel walks count the same as serial ones."""
+        serial = Walker(tree, predicate=Predicate(size="+0c"))
+        parallel = Walker(tree, predicate=Predicate(size="+0c"), workers=4)
+        list(serial)
+        list(parallel)
+
+        assert (parallel.directories, parallel.entries, parallel.stat_calls) == (serial.directories, serial.entries, serial.stat_calls)
+
+    def test_truncated_by_budget(self, tree):
+        """Test that a walk stops with a partial result once its budget has run out."""
+        walker = Walker(tree, predicate=Predicate(size="+0c"), throttle=Throttle(budget=0.0))
+
+        assert list(walker) == []
+        assert walker.truncated is True
+        assert walker.errors == []
+
+    def test_truncated_parallel(self, tree):
+        """Test that parallel walks stop as well."""
+        walker = Walker(tree, predicate=Predicate(size="+0c"), workers=4, throttle=Throttle(budget=0.0))
+
+        assert list(walker) == []
+        assert walker.truncated is True
+
+    def test_throttle_keeps_result(self, tree):
+        """Test that a rate limited walk reports the same entries."""
+        walker = Walker(tree, throttle=Throttle(rate=1000))
+
+        assert [entry.path for entry in walker] == [entry.path for entry in Walker(tree)]
+        assert walker.truncated is False
+
+    def test_exclude(self, tree):
+        """Test that excluded directories are reported but not entered."""
+        excluded = str(tree / "sub")
+        walker = Walker(tree, exclude={excluded})
+        expected = [entry.path for entry in Walker(tree) if entry.path == excluded or not entry.path.startswith(excluded + os.sep)]
+
+        assert [entry.path for entry in walker] == expected
+        assert excluded in expected
+
+    def test_prune(self, tree):
+        """Test that pruned directories are never read."""
+        walker = Walker(tree, predicate=Predicate(type="f"), prune=Matcher(["sub"]))
+
+        assert sorted(entry.name for entry in walker) == ["a.log", "b.txt"]
+        assert walker.directories == 1
+
+    def test_prune_path(self, tree):
+        """Test that directories can be pruned by path."""
+        walker = Walker(tree, predicate=Predicate(type="f"), prune=Matcher([str(tree / "sub" / "deep")]))
+
+        assert sorted(entry.name for entry in walker) == ["a.log", "b.txt", "c.log"]
+
+    def test_prune_spares_root(self, tree):
+        """Test that the root is read even when its name matches."""
+        assert len(list(Walker(tree / "sub", predicate=Predicate(type="f"), prune=Matcher(["sub"])))) == 2
+
+    def test_one_filesystem(self, tree):
+        """Test that walks on one filesystem are complete and stat each directory once."""
+        walker = Walker(tree, one_filesystem=True)
+
+        assert [entry.path for entry in walker] == [entry.path for entry in Walker(tree)]
+        assert walker.stat_calls == 3
+
+    def test_one_filesystem_skips_other_devices(self, tree, monkeypatch):
+        """Test that directories on another device than the root are not read."""
+        st = os.lstat(tree)
+        other = os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1, *tuple(st)[3:]))
+        monkeypatch.setattr(PathEntry, "stat", lambda self, follow_symlinks=True: other)
+        walker = Walker(tree, predicate=Predicate(type="f"), one_filesystem=True)
+
+        assert sorted(entry.name for entry in walker) == ["a.log", "b.txt"]
+        assert walker.directories == 1
+
+    def test_exclude_root(self, tree):
+        """Test that an excluded root is not even statted."""
+        walker = Walker(tree, exclude={str(tree)})
+
+        assert list(walker) == []
+        assert walker.stat_calls == 0
+
+
+@pytest.fixture
+def wide_tree(tmp_path):
+    """Create a tree with several levels of nested directories."""
+    for a in range(4):
+        for b in range(3):
+            directory = tmp_path / f"d{a}" / f"e{b}"
+            directory.mkdir(parents=True)
+            for c in range(5):
+                (directory / f"f{c}.log").write_bytes(b"x" * c)
+        (tmp_path / f"d{a}" / "top.log").write_text("top")
+    return tmp_path
+
+
+class TestParallelWalker:
+    """Tests for thread pool traversal."""
+
+    @pytest.mark.parametrize("workers", [2, 4, 16])
+    def test_same_order_as_serial(self, wide_tree, workers):
+        """Test that parallel traversal reports entries in serial order."""
+        serial = [entry.path for entry in Walker(wide_tree)]
+        parallel = [entry.path for entry in Walker(wide_tree, workers=workers)]
+        assert parallel == serial
+        assert len(parallel) == 1 + 4 + 12 + 60 + 4
+
+    def test_same_errors_as_serial(self, wide_tree, monkeypatch):
+        """Test that parallel traversal reports errors in serial order."""
+        original = os.scandir
+        denied = {str(wide_tree / "d1" / "e2"), str(wide_tree / "d3")}
+
+        def scandir(path):
+            if str(path) in denied:
+                raise PermissionError(13, "Permission denied")
+            return original(path)
+
+        monkeypatch.setattr(os, "scandir", scandir)
+        serial = Walker(wide_tree)
+        parallel = Walker(wide_tree, workers=4)
+        assert [e.path for e in parallel] == [e.path for e in serial]
+        assert parallel.errors == serial.errors
+        assert len(serial.errors) == 2
+
+    def test_early_close_joins_workers(self, wide_tree):
+        """Test that abandoning a parallel walk does not leave threads behind."""
+        before = threading.active_count()
+        iterator = iter(Walker(wide_tree, workers=8))
+        next(iterator)
+        iterator.close()
+        assert threading.active_count() == before
+
+    def test_bounded_lookahead(self, tmp_path):
+        """Test that workers read at most LOOKAHEAD directories each ahead of a stalled consumer."""
+        for a in range(10):
+            for b in range(20):
+                (tmp_path / f"d{a}" / f"e{b}").mkdir(parents=True)
+        reads = []
+
+        class Counting(Walker):
+            def read(self, path, depth):
+                reads.append(path)
+                return super().read(path, depth)
+
+        walker = Counting(tmp_path, workers=2)
+        iterator = iter(walker)
+        for _ in range(5):
+            next(iterator)
+        time.sleep(0.2)
+        ahead = len(reads) - walker.directories
+        iterator.close()
+
+        assert ahead <= 2 * Walker.LOOKAHEAD
+        assert len(reads) < 211
+
+    def test_scan_workers(self, wide_tree):
+        """Test that scan results do not depend on the number of workers."""
+        assert scan(wide_tree, type="f", workers=4) == scan(wide_tree, type="f")
+
+
+@pytest.fixture
+def hang(monkeypatch):
+    """Make os.scandir block on the given paths until the test ends, like a hung mount."""
+    original = os.scandir
+    hung = set()
+    release = threading.Event()
+
+    def scandir(path):
+        if str(path) in hung:
+            release.wait()
+        return original(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    yield hung
+    release.set()
+
+
+class TestDeadline:
+    """Tests for directory reads under a deadline."""
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_stalled_directory_is_skipped(self, tree, hang, workers):
+        """Test that a directory whose read hangs is skipped and reported while the rest is walked."""
+        hang.add(str(tree / "sub"))
+        stalled = []
+        walker = Walker(tree, predicate=Predicate(type="f"), workers=workers, timeout=0.1, stalled=lambda path, elapsed: stalled.append((path, elapsed)))
+
+        assert sorted(entry.name for entry in walker) == ["a.log", "b.txt"]
+        assert [path for path, _ in stalled] == [str(tree / "sub")]
+        assert stalled[0][1] >= 0.1
+        assert walker.errors == []
+
+    def test_stalled_root_is_an_error(self, tree, hang):
+        """Test that a root whose read hangs is reported as an error rather than an empty tree."""
+        hang.add(str(tree))
+        walker = Walker(tree, timeout=0.1)
+
+        assert [entry.path for entry in walker] == [str(tree)]
+        assert walker.errors == [f"find: '{tree}': directory did not respond within 0.1 seconds"]
+
+    def test_same_result_without_stalls(self, wide_tree):
+        """Test that a deadline nobody hits does not change the walk."""
+        assert [e.path for e in Walker(wide_tree, timeout=10.0)] == [e.path for e in Walker(wide_tree)]
+        assert [e.path for e in Walker(wide_tree, workers=4, timeout=10.0)] == [e.path for e in Walker(wide_tree)]
+
+    def test_errors_pass_through(self, tree, monkeypatch):
+        """Test that errors raised under the deadline are reported as without it."""
+        original = os.scandir
+
+        def scandir(path):
+            if str(path) == str(tree / "sub"):
+                raise PermissionError(13, "Permission denied")
+            return original(path)
+
+        monkeypatch.setattr(os, "scandir", scandir)
+        walker = Walker(tree, timeout=10.0)
+        list(walker)
+
+        assert walker.errors == [f"find: '{tree / 'sub'}': Permission denied"]
+
+    def test_truncated_under_deadline(self, tree):
+        """Test that a throttle still truncates a walk under a deadline."""
+        walker = Walker(tree, throttle=Throttle(budget=0.0), timeout=10.0)
+        list(walker)
+
+        assert walker.truncated is True
+
+
+class TestScan:
+    """Tests for scan function."""
+
+    def test_scan_sizes(self, tree):
+        """Test that scan reports paths and sizes."""
+        error, result = scan(tree, type="f", name="*.log")
+
+        assert error is None
+        assert sorted((p.name, size) for p, size in result or []) == [("a.log", 0), ("c.log", 2048), ("d.log", 10)]
+
+    def test_scan_invalid_argument(self, tree):
+        """Test that scan reports invalid arguments as find failures."""
+        error, result = scan(tree, size="10Q")
+
+        assert result is None
+        assert error is not None
+        assert "find command failed" in error
+
+    def test_scan_nonexistent(self, tmp_path):
+        """Test that scan reports missing paths as find failures."""
+        error, result = scan(Path(tmp_path / "missing"))
+
+        assert result is None
+        assert error is not None
+        assert "No such file or directory" in error
+
+
+def age_directories(root, seconds=60):
+    """Backdate directory mtimes so their listings are eligible for caching."""
+    past = time.time() - seconds
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (past, past))
+
+
+class TestDirectoryCache:
+    """Tests for incremental scans."""
+
+    def count_scandir(self, monkeypatch):
+        calls = []
+        original = os.scandir
+        monkeypatch.setattr(os, "scandir", lambda p: calls.append(p) or original(p))
+        return calls
+
+    def test_warm_scan_skips_unchanged_directories(self, wide_tree, tmp_path_factory, monkeypatch):
+        """Test that unchanged directories are replayed from the cache."""
+        state = tmp_path_factory.mktemp("state")
+        age_directories(wide_tree)
+        cold = scan(wide_tree, type="f", state_dir=str(state))
+
+        calls = self.count_scandir(monkeypatch)
+        warm = scan(wide_tree, type="f", state_dir=str(state))
+
+        assert warm == cold
+        assert calls == []
+
+    def test_changed_directory_is_reread(self, wide_tree, tmp_path_factory, monkeypatch):
+        """Test that created and removed files are picked up."""
+        state = tmp_path_factory.mktemp("state")
+        age_directories(wide_tree)
+        scan(wide_tree, type="f", state_dir=str(state))
+
+        (wide_tree / "d2" / "e0" / "new.log").write_text("new")
+        (wide_tree / "d0" / "top.log").unlink()
+        calls = self.count_scandir(monkeypatch)
+        error, result = scan(wide_tree, type="f", state_dir=str(state))
+
+        assert error is None
+        paths = {p.relative_to(wide_tree).as_posix() for p, _ in result or []}
+        assert "d2/e0/new.log" in paths
+        assert "d0/top.log" not in paths
+        assert sorted(calls) == sorted([str(wide_tree / "d0"), str(wide_tree / "d2" / "e0")])
+
+    def test_predicates_reevaluated_on_cached_entries(self, wide_tree, tmp_path_factory):
+        """Test that size and time filters see current file metadata."""
+        state = tmp_path_factory.mktemp("state")
+        age_directories(wide_tree)
+        scan(wide_tree, type="f", size="+1k", state_dir=str(state))
+
+        (wide_tree / "d1" / "e1" / "f3.log").write_bytes(b"x" * 4096)
+        error, result = scan(wide_tree, type="f", size="+1k", state_dir=str(state))
+
+        assert error is None
+        assert result == [(wide_tree / "d1" / "e1" / "f3.log", 4096)]
+
+    def test_recent_directories_not_recorded(self, wide_tree, tmp_path_factory, monkeypatch):
+        """Test that directories modified at scan start are always reread."""
+        state = tmp_path_factory.mktemp("state")
+        scan(wide_tree, type="f", state_dir=str(state))
+
+        calls = self.count_scandir(monkeypatch)
+        scan(wide_tree, type="f", state_dir=str(state))
+
+        assert len(calls) == 1 + 4 + 12
+
+    def test_corrupt_cache_is_ignored(self, wide_tree, tmp_path_factory):
+        """Test that an unreadable cache falls back to a cold scan."""
+        state = tmp_path_factory.mktemp("state")
+        cache = DirectoryCache.load(state, str(wide_tree))
+        cache.path.write_bytes(b"garbage")
+
+        assert scan(wide_tree, type="f", state_dir=str(state)) == scan(wide_tree, type="f")
+        assert DirectoryCache.load(state, str(wide_tree)).previous == {}
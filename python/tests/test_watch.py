@@ -0,0 +1,122 @@
+"""Tests for the inotify backed file index."""
+
+import json
+import os
+import shutil
+
+import pytest
+from pokerops.monitoring import inotify
+from pokerops.monitoring.filesystem import files, watch
+from pokerops.monitoring.walker import Predicate
+from pokerops.monitoring.watch import FileIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Create an index over a small tree."""
+    (tmp_path / "a.log").write_text("a")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.log").write_text("bb")
+    index = FileIndex(str(tmp_path))
+    index.build()
+    yield index
+    index.close()
+
+
+def indexed(index):
+    index.poll()
+    return {os.path.relpath(path, index.root): size for path, size in index.files()}
+
+
+class TestFileIndex:
+    """Tests for FileIndex."""
+
+    def test_build(self, index):
+        """Test that the initial build indexes regular files recursively."""
+        assert indexed(index) == {"a.log": 1, "sub/b.log": 2}
+        assert len(index) == 2
+
+    def test_file_changes(self, index, tmp_path):
+        """Test that created, modified, renamed and deleted files are tracked."""
+        (tmp_path / "c.log").write_text("ccc")
+        (tmp_path / "a.log").write_text("aaaa")
+        (tmp_path / "sub" / "b.log").rename(tmp_path / "sub" / "moved.log")
+
+        assert indexed(index) == {"a.log": 4, "c.log": 3, "sub/moved.log": 2}
+
+        (tmp_path / "c.log").unlink()
+        assert indexed(index) == {"a.log": 4, "sub/moved.log": 2}
+
+    def test_directory_changes(self, index, tmp_path):
+        """Test that new subtrees are watched and removed subtrees forgotten."""
+        (tmp_path / "new" / "deep").mkdir(parents=True)
+        index.poll()
+        (tmp_path / "new" / "deep" / "d.log").write_text("d")
+        assert indexed(index)["new/deep/d.log"] == 1
+
+        shutil.rmtree(tmp_path / "sub")
+        assert "sub/b.log" not in indexed(index)
+
+        (tmp_path / "new").rename(tmp_path / "renamed")
+        assert indexed(index) == {"a.log": 1, "renamed/deep/d.log": 1}
+
+    def test_slots_are_reused(self, index, tmp_path):
+        """Test that freed metadata slots are reused."""
+        (tmp_path / "a.log").unlink()
+        indexed(index)
+        (tmp_path / "c.log").write_text("c")
+        indexed(index)
+
+        assert len(index.names) == 2
+        assert len(index.sizes) == 2
+
+    def test_overflow_resyncs(self, index, tmp_path):
+        """Test that a queue overflow rebuilds the index from disk."""
+        index.watcher.close()
+        index.watcher = inotify.Inotify()
+        (tmp_path / "missed.log").write_text("m")
+
+        index.handle(inotify.Event(-1, inotify.IN_Q_OVERFLOW, 0, ""))
+
+        assert index.resyncs == 1
+        assert indexed(index) == {"a.log": 1, "missed.log": 1, "sub/b.log": 2}
+
+    def test_predicate(self, index, tmp_path):
+        """Test that predicates are evaluated against indexed metadata."""
+        os.utime(tmp_path / "a.log", (0, 0))
+        index.poll()
+
+        matched = {os.path.basename(p) for p, _ in index.files(Predicate(type="f", mtime="-1"))}
+        assert matched == {"b.log"}
+        matched = {os.path.basename(p) for p, _ in index.files(Predicate(type="f", size="+1c"))}
+        assert matched == {"b.log"}
+
+    def test_non_recursive(self, tmp_path):
+        """Test that non recursive indexes only cover the root."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "b.log").write_text("b")
+        (tmp_path / "a.log").write_text("a")
+        index = FileIndex(str(tmp_path), recursive=False)
+        index.build()
+        try:
+            assert indexed(index) == {"a.log": 1}
+        finally:
+            index.close()
+
+
+def test_watch_matches_files(tmp_path, capsys):
+    """Test that watch reports the same files as files()."""
+    (tmp_path / "sub").mkdir()
+    for name in ("a.log", "b.txt", "sub/c.log"):
+        (tmp_path / name).write_text(name)
+
+    files(path=str(tmp_path), location="", environment="", function="", name="*.log")
+    expected = json.loads(capsys.readouterr().out)
+
+    watch(path=str(tmp_path), location="", environment="", function="", name="*.log", interval=0, iterations=1)
+    output = json.loads(capsys.readouterr().out)
+
+    assert sorted(output["filesystem"]["files"], key=lambda f: f["path"]) == sorted(expected["filesystem"]["files"], key=lambda f: f["path"])
+    assert output["filesystem"]["count"] == 2
+    assert output["filesystem"]["error"] is None
+    assert output["fields"] == expected["fields"]